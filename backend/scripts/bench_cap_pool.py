@@ -0,0 +1,161 @@
+"""bench_cap_pool.py – concurrency benchmark for the CapPool reserve.
+
+Fires N parallel spins at the reserve and compares the old single-document
+read-modify-write (`CapPool.get` → mutate → `save`) with the sharded
+conditional-`$inc` path in `app.services.risk_guard`. For every mode it reports
+throughput, latency percentiles and lost updates: the difference between the
+balance implied by the spins that were accepted and the balance in Mongo.
+
+Runs against a throw-away database on the server in `mongo_uri` (a replica set,
+as the rebalancer uses transactions).
+
+CLI
+---
+```
+python backend/scripts/bench_cap_pool.py                       # 500 parallel spins, both modes
+python backend/scripts/bench_cap_pool.py --spins 5000 --parallel 500 --shards 32
+python backend/scripts/bench_cap_pool.py --mode sharded
+```
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+from typing import Awaitable, Callable, List, Tuple
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR / "backend" / "src"))
+
+from beanie import init_beanie  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+from app.core.config.settings import get_settings  # noqa: E402
+from app.db.init_db import DataBase  # noqa: E402
+from app.db.models.player import CapPool, CapPoolShard  # noqa: E402
+from app.db.mongo_codec import codec_options  # noqa: E402
+from app.services import risk_guard  # noqa: E402
+
+STAKE = Decimal("5")
+PAYOUTS = [Decimal(x) for x in ("0", "0.5", "1", "2.5", "4", "10")]
+START_BALANCE = Decimal("1000000")
+
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO
+)
+log = logging.getLogger("bench_cap_pool")
+
+# ---------------------------------------------------------------------------
+# modes
+# ---------------------------------------------------------------------------
+
+async def legacy_reserve(stake: Decimal, payout: Decimal) -> None:
+    """The pre-sharding implementation, kept here as the baseline."""
+    pool = await CapPool.get("main")
+    if pool.balance < payout:
+        raise HTTPException(503, "reserve_low")
+    if payout > pool.max_payout:
+        raise HTTPException(400, "payout_exceeds_max")
+    if pool.balance < pool.sigma_buffer:
+        raise HTTPException(503, "maintenance")
+    pool.balance += stake * risk_guard.HOUSE_SHARE
+    pool.balance -= payout
+    await pool.save()
+
+
+async def legacy_balance() -> Decimal:
+    return (await CapPool.get("main")).balance
+
+
+async def sharded_balance() -> Decimal:
+    return await risk_guard.cap_reserve.total()
+
+# ---------------------------------------------------------------------------
+# core
+# ---------------------------------------------------------------------------
+
+async def reset(shards: int) -> None:
+    await CapPool.get_motor_collection().delete_many({})
+    await CapPoolShard.get_motor_collection().delete_many({})
+    await CapPool(balance=START_BALANCE, sigma_buffer=Decimal("100"), max_payout=Decimal("250")).insert()
+    risk_guard.case_cache.invalidate()
+    risk_guard.cap_reserve._shard_ids = []
+    await risk_guard.cap_reserve.ensure_shards(shards)
+
+
+async def bench(
+    name: str,
+    reserve: Callable[[Decimal, Decimal], Awaitable[None]],
+    balance: Callable[[], Awaitable[Decimal]],
+    spins: int,
+    parallel: int,
+    shards: int,
+    seed: int,
+) -> None:
+    await reset(shards)
+    rng = random.Random(seed)
+    work: List[Tuple[Decimal, Decimal]] = [(STAKE, rng.choice(PAYOUTS)) for _ in range(spins)]
+    latencies: List[float] = []
+    accepted: List[Decimal] = []
+    errors = 0
+    gate = asyncio.Semaphore(parallel)
+
+    async def one(stake: Decimal, payout: Decimal) -> None:
+        nonlocal errors
+        async with gate:
+            started = time.perf_counter()
+            try:
+                await reserve(stake, payout)
+                accepted.append(stake * risk_guard.HOUSE_SHARE - payout)
+            except HTTPException:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(s, p) for s, p in work))
+    elapsed = time.perf_counter() - started
+
+    expected = START_BALANCE + sum(accepted, Decimal("0"))
+    actual = await balance()
+    q = statistics.quantiles(latencies, n=100)
+    log.info(
+        "%-8s %d spins x%d: %.0f spins/s, p50=%.1fms p99=%.1fms, rejected=%d, lost=%s (expected %s, got %s)",
+        name, spins, parallel, spins / elapsed, q[49] * 1000, q[98] * 1000,
+        errors, expected - actual, expected, actual,
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    settings = get_settings()
+    client = AsyncIOMotorClient(args.uri or settings.mongo_uri)
+    db = client.get_database(args.db, codec_options=codec_options)
+    await init_beanie(database=db, document_models=[CapPool, CapPoolShard])
+    DataBase._client = client
+
+    try:
+        if args.mode in ("legacy", "both"):
+            await bench("legacy", legacy_reserve, legacy_balance, args.spins, args.parallel, args.shards, args.seed)
+        if args.mode in ("sharded", "both"):
+            await bench("sharded", risk_guard.ensure_reserve_and_limits, sharded_balance, args.spins, args.parallel, args.shards, args.seed)
+    finally:
+        await client.drop_database(args.db)
+        client.close()
+
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CapPool reserve concurrency benchmark")
+    parser.add_argument("--spins", type=int, default=5000, help="total spins per mode")
+    parser.add_argument("--parallel", type=int, default=500, help="spins in flight at once")
+    parser.add_argument("--shards", type=int, default=16, help="CapPool shards for the sharded mode")
+    parser.add_argument("--mode", choices=("legacy", "sharded", "both"), default="both")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--uri", default=None, help="mongo uri (default: settings.mongo_uri)")
+    parser.add_argument("--db", default="cap_pool_bench", help="throw-away database name")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,190 @@
+"""bench_money.py – Decimal vs fixed-point Money on the money hot paths.
+
+Times the spin payout computation `app.utils.money.Money` replaced and checks
+that both implementations return identical results: per-branch payouts, rtp
+and loss of a batch open as computed by `spin_controller.branch_totals`,
+against the former per-pick `Decimal(amount) * rate` arithmetic. Payouts and
+loss must be identical (exponents included); rtp is now one division of the
+exact branch payout instead of a 28-digit running sum, so it has to agree to
+27 significant digits.
+
+Reward amounts and rates are converted to `Money` once, as they are at the
+sampler / rate cache boundary; the `+conv` column includes that conversion.
+Implementations are timed in interleaved rounds and the speedup is the median
+of the per-round ratios, so machine noise hits both sides alike. Exits 1 below
+`--min-speedup` (5x).
+
+USD totals stay on `Decimal`: balances arrive from Mongo as `Decimal`, and
+converting each one to `Money` per call holds a 50-coin total to about 3x,
+short of the 5x this gate asks for, so `CoinAmount.to_usd` and the portfolio
+total are not part of this benchmark.
+
+CLI
+---
+```
+python backend/scripts/bench_money.py
+python backend/scripts/bench_money.py --spins 50 --repeat 2000
+```
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import logging
+import random
+import statistics
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR / "backend" / "src"))
+
+from app.models.case_config import OddsVersion, RewardItem, TierConfig  # noqa: E402
+from app.services.spin_controller import SpinPick, branch_totals, hmac_roll, pick_from_roll  # noqa: E402
+from app.services.spin_sampler import PITY_LEVELS, ZERO, sampler_cache  # noqa: E402
+from app.utils.money import Money  # noqa: E402
+
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO
+)
+log = logging.getLogger("bench_money")
+
+# ---------------------------------------------------------------------------
+# legacy implementations
+# ---------------------------------------------------------------------------
+
+def legacy_branch_totals(branches: List[List[SpinPick]], rates: Dict[str, Decimal], price: Decimal):
+    """`apply_player_stat` payout arithmetic before Money."""
+    def payout(pick: SpinPick) -> Decimal:
+        return Decimal(pick.reward.amount) * rates[pick.reward.coin_id]
+
+    reset, tail, rtp, loss = [], [], [], []
+    for picks in branches:
+        resets = any(p.fail_streak == 0 for p in picks)
+        reset.append(resets)
+        tail.append(picks[-1].fail_streak if resets else 0)
+        rtp.append(sum((payout(p) / price for p in picks), ZERO))
+        loss.append(sum((price - payout(p) for p in picks), ZERO))
+    return rtp, loss, [payout(p) for p in branches[0]]
+
+# ---------------------------------------------------------------------------
+# fixtures
+# ---------------------------------------------------------------------------
+
+def random_rate(rng: random.Random) -> Decimal:
+    # CoinGecko prices arrive as floats: Decimal(str(float))
+    return Decimal(str(round(10 ** rng.uniform(-4, 5), rng.randint(2, 8))))
+
+
+def random_amount(rng: random.Random) -> Decimal:
+    return Decimal(rng.randint(1, 10**9)).scaleb(-rng.randint(2, 12))
+
+
+def make_case(rng: random.Random) -> SimpleNamespace:
+    coins = [f"coin-{i}" for i in range(6)]
+    tiers = [
+        TierConfig(name="rare", chance=Decimal("0.1"), rewards=[
+            RewardItem(coin_id=coins[0], amount=random_amount(rng), network=None, sub_chance=Decimal("0.5")),
+            RewardItem(coin_id=coins[1], amount=random_amount(rng), network=None, sub_chance=Decimal("0.5")),
+        ]),
+        TierConfig(name="common", chance=Decimal("0.9"), rewards=[
+            RewardItem(coin_id=coin, amount=random_amount(rng), network=None, sub_chance=Decimal("0.9995") / 4)
+            for coin in coins[2:]
+        ] + [RewardItem(coin_id=coins[0], amount=random_amount(rng), network=None, sub_chance=Decimal("0.0005"))]),
+    ]
+    return SimpleNamespace(
+        case_id="bench", tiers=tiers, pity_after=5, price_usd=Decimal("4.99"),
+        odds_versions=[OddsVersion(version="bench")],
+    )
+
+
+def make_branches(cfg: SimpleNamespace, spins: int) -> List[List[SpinPick]]:
+    seed = hashlib.sha256(b"bench").hexdigest()
+    raws = [hmac_roll(seed, "client", nonce) for nonce in range(spins)]
+    branches = []
+    for state in range(cfg.pity_after + PITY_LEVELS):
+        picks, fail_streak = [], state
+        for raw in raws:
+            pick = pick_from_roll(cfg, raw, fail_streak)
+            fail_streak = pick.fail_streak
+            picks.append(pick)
+        branches.append(picks)
+    return branches
+
+# ---------------------------------------------------------------------------
+# core
+# ---------------------------------------------------------------------------
+
+def timeit(fns: List[Callable[[], object]], repeat: int, rounds: int = 7) -> List[List[float]]:
+    """Per-call time of each of `fns` in us, for every round; the rounds interleave the fns."""
+    times: List[List[float]] = [[] for _ in fns]
+    for _ in range(rounds):
+        for fn, fn_times in zip(fns, times):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                fn()
+            fn_times.append((time.perf_counter() - started) / repeat * 1e6)
+    return times
+
+
+def report(name: str, legacy: Callable[[], object], money: Callable[[], object],
+           conv: Callable[[], object], repeat: int) -> float:
+    legacy_us, money_us, conv_us = timeit([legacy, money, conv], repeat)
+    speedup = statistics.median(a / b for a, b in zip(legacy_us, money_us))
+    log.info(
+        "%-12s decimal=%8.1fus  money=%7.1fus  money+conv=%7.1fus  speedup=%.1fx (%.1fx with conversion)",
+        name, min(legacy_us), min(money_us), min(conv_us), speedup,
+        statistics.median(a / b for a, b in zip(legacy_us, conv_us)),
+    )
+    return speedup
+
+
+def main(args: argparse.Namespace) -> int:
+    rng = random.Random(args.seed)
+
+    # spin payout ------------------------------------------------------
+    cfg = make_case(rng)
+    branches = make_branches(cfg, args.spins)
+    rates = {reward.coin_id: random_rate(rng) for tier in cfg.tiers for reward in tier.rewards}
+    money_rates = {coin: Money.from_decimal(rate) for coin, rate in rates.items()}
+    rewards = sampler_cache.get(cfg).flat_rewards()
+
+    def money_spin(rates_m=money_rates):
+        _, _, rtp, loss, payout = branch_totals(branches, rewards, rates_m, cfg.price_usd)
+        return rtp, loss, [payout(p).to_decimal() for p in branches[0]]
+
+    def money_spin_conv():
+        return money_spin({coin: Money.from_decimal(rate) for coin, rate in rates.items()})
+
+    (exp_rtp, exp_loss, exp_payouts), (rtp, loss, payouts) = legacy_branch_totals(branches, rates, cfg.price_usd), money_spin()
+    if [str(x) for x in payouts + loss] != [str(x) for x in exp_payouts + exp_loss]:
+        log.error("spin payout results differ")
+        return 1
+    if any(abs(a - b) > abs(b) * Decimal("1e-26") for a, b in zip(rtp, exp_rtp)):
+        log.error("spin rtp differs")
+        return 1
+    spin_speedup = report(
+        "spin payout",
+        lambda: legacy_branch_totals(branches, rates, cfg.price_usd),
+        money_spin,
+        money_spin_conv,
+        args.repeat,
+    )
+
+    if spin_speedup < args.min_speedup:
+        log.error("spin payout speedup below %.1fx", args.min_speedup)
+        return 1
+    return 0
+
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decimal vs Money micro-benchmark")
+    parser.add_argument("--spins", type=int, default=50, help="spins per batch open")
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--min-speedup", type=float, default=5.0, help="exit 1 below this spin payout speedup")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,321 @@
+"""collect_stats.py – vectorized Monte Carlo for case odds.
+
+Simulates spins of every case against the latest odds table in
+**data/odds/<case_id>/** and the USD rates in **data/rate_cache.json**,
+using the same compiled thresholds as `spin()` (`SpinSampler`).
+
+* Many independent players are simulated side by side; every step rolls one
+  spin for each of them with NumPy, so the soft-pity `fail_streak` state
+  machine stays exact per player.
+* `--rng pcg` (default) draws 32-bit rolls from NumPy's PCG64 – statistics only.
+  `--rng hmac` derives every roll with HMAC-SHA256 exactly like production.
+* `--workers` shards the players across processes.
+
+Writes into **data/stats_output/**:
+``<case_id>.json`` (RTP, variance, percentiles, hit rates, convergence),
+``<case_id>_tiers.csv`` and ``<case_id>_items.csv``.
+
+CLI
+---
+```
+python backend/scripts/collect_stats.py                          # all cases, 10^6 spins each
+python backend/scripts/collect_stats.py -n 100000000 --workers 8
+python backend/scripts/collect_stats.py --case case_5 --rng hmac -n 1000000
+```
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import hmac
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR / "backend" / "src"))
+
+from app.core.config.start_cases_config import START_CASES  # noqa: E402
+from app.models.case_config import TierConfig  # noqa: E402
+from app.services.spin_sampler import PITY_LEVELS, ROLL_SPACE, SpinSampler  # noqa: E402
+
+ODDS_DIR = BASE_DIR / "data" / "odds"
+RATES_PATH = BASE_DIR / "data" / "rate_cache.json"
+OUTPUT_DIR = BASE_DIR / "data" / "stats_output"
+
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99, 99.9)
+CHECKPOINTS = 20
+
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO
+)
+log = logging.getLogger("collect_stats")
+
+# ---------------------------------------------------------------------------
+# case spec
+# ---------------------------------------------------------------------------
+
+def latest_odds_file(case_id: str) -> Path:
+    files = sorted((ODDS_DIR / case_id).glob("*.json"))
+    if not files:
+        raise FileNotFoundError(f"no odds tables for {case_id} in {ODDS_DIR}")
+    return files[-1]
+
+
+def load_case_spec(case_id: str, rates: Dict[str, Decimal]) -> Dict[str, Any]:
+    """
+    Everything a worker needs, as plain picklable values: thresholds per pity
+    level, payout per item and the "common" flag that extends the fail streak.
+    """
+    case = next((c for c in START_CASES if c["case_id"] == case_id), None)
+    if case is None:
+        raise KeyError(f"unknown case {case_id}")
+    odds_path = latest_odds_file(case_id)
+    odds = json.loads(odds_path.read_text(), parse_float=Decimal)
+    tiers = [TierConfig(**tier) for tier in odds["tiers"]]
+    sampler = SpinSampler(tiers, case_id=case_id, odds_version=odds["version"])
+
+    items: List[Dict[str, Any]] = []
+    for t, tier in enumerate(tiers):
+        for reward in tier.rewards:
+            rate = rates.get(reward.coin_id, Decimal("0"))
+            if not rate:
+                log.warning("%s: no rate for %s, payout counted as 0", case_id, reward.coin_id)
+            items.append({
+                "tier": t,
+                "coin_id": reward.coin_id,
+                "payout_usd": float(Decimal(reward.amount) * rate),
+                "common": reward.sub_chance >= Decimal("0.999"),
+            })
+
+    return {
+        "case_id": case_id,
+        "odds_version": odds["version"],
+        "price_usd": float(Decimal(str(case["price_usd"]))),
+        "pity_after": int(case["pity_after"]),
+        "tier_names": [tier.name for tier in tiers],
+        "tier_bounds": [sampler.tier_bounds(level) for level in range(PITY_LEVELS + 1)],
+        "reward_bounds": [
+            [sampler.reward_bounds(level)[t] for level in range(PITY_LEVELS + 1)]
+            for t in range(len(tiers))
+        ],
+        "items": items,
+    }
+
+# ---------------------------------------------------------------------------
+# worker
+# ---------------------------------------------------------------------------
+
+def _hmac_rolls(key: bytes, client_seed: str, nonces: np.ndarray) -> np.ndarray:
+    prefix = f"{client_seed}:".encode()
+    buf = b"".join(
+        hmac.digest(key, prefix + str(n).encode(), "sha256")[:4] for n in nonces.tolist()
+    )
+    return np.frombuffer(buf, dtype=">u4").astype(np.int64)
+
+
+def simulate_shard(spec: Dict[str, Any], players: int, steps: int, rng_mode: str, seed: int) -> Dict[str, Any]:
+    rng = np.random.default_rng(seed)
+    key = rng.bytes(32)
+    client_seed = f"stats-{seed}"
+
+    n_tiers = len(spec["tier_names"])
+    tier_bounds = np.asarray(spec["tier_bounds"], dtype=np.int64)                  # (levels, tiers)
+    reward_bounds = [np.asarray(b, dtype=np.int64) for b in spec["reward_bounds"]]  # per tier: (levels, rewards)
+    offsets = np.cumsum([0] + [b.shape[1] for b in reward_bounds])
+    payout = np.asarray([i["payout_usd"] for i in spec["items"]], dtype=np.float64)
+    common = np.asarray([i["common"] for i in spec["items"]], dtype=bool)
+    n_items = len(payout)
+    pity_after = spec["pity_after"]
+
+    fail_streak = np.zeros(players, dtype=np.int64)
+    item_counts = np.zeros(n_items, dtype=np.int64)
+    gaps = 0
+    checkpoint_every = max(1, steps // CHECKPOINTS)
+    checkpoints: List[List[float]] = []
+    total = total_sq = 0.0
+
+    for step in range(steps):
+        if rng_mode == "hmac":
+            rolls = _hmac_rolls(key, client_seed, np.arange(players, dtype=np.int64) * steps + step)
+        else:
+            rolls = rng.integers(0, ROLL_SPACE, size=players, dtype=np.int64)
+
+        level = np.where(
+            fail_streak < pity_after,
+            0,
+            np.minimum(fail_streak - pity_after + 1, PITY_LEVELS),
+        )
+        # bisect_right over the level's thresholds == number of thresholds <= roll
+        tier = (rolls[:, None] >= tier_bounds[level]).sum(axis=1)
+        item = np.full(players, -1, dtype=np.int64)
+        for t in range(n_tiers):
+            mask = tier == t
+            if not mask.any():
+                continue
+            local = (rolls[mask, None] >= reward_bounds[t][level[mask]]).sum(axis=1)
+            item[mask] = np.where(local < reward_bounds[t].shape[1], offsets[t] + local, -1)
+
+        valid = item >= 0
+        gaps += int((~valid).sum())
+        hit = item[valid]
+        item_counts += np.bincount(hit, minlength=n_items)
+        won = payout[hit]
+        total += float(won.sum())
+        total_sq += float(np.square(won).sum())
+
+        # a roll outside the odds table makes spin() fail, so the streak is left untouched
+        streak_up = np.zeros(players, dtype=bool)
+        streak_up[valid] = common[hit]
+        fail_streak = np.where(valid, np.where(streak_up, fail_streak + 1, 0), fail_streak)
+
+        if (step + 1) % checkpoint_every == 0 or step + 1 == steps:
+            checkpoints.append([float(players * (step + 1)), total, total_sq])
+
+    return {
+        "spins": players * steps,
+        "gaps": gaps,
+        "item_counts": item_counts.tolist(),
+        "total": total,
+        "total_sq": total_sq,
+        "checkpoints": checkpoints,
+    }
+
+# ---------------------------------------------------------------------------
+# aggregation
+# ---------------------------------------------------------------------------
+
+def _interval(n: float, total: float, total_sq: float, price: float) -> Dict[str, float]:
+    mean = total / n
+    var = max(total_sq / n - mean * mean, 0.0)
+    half = 1.96 * (var / n) ** 0.5
+    return {
+        "N": int(n),
+        "rtp": mean / price,
+        "ci95_low": (mean - half) / price,
+        "ci95_high": (mean + half) / price,
+    }
+
+
+def summarize(spec: Dict[str, Any], shards: List[Dict[str, Any]], rng_mode: str, elapsed: float) -> Dict[str, Any]:
+    price = spec["price_usd"]
+    items = spec["items"]
+    spins = sum(s["spins"] for s in shards)
+    gaps = sum(s["gaps"] for s in shards)
+    counts = np.sum([s["item_counts"] for s in shards], axis=0)
+    total = sum(s["total"] for s in shards)
+    total_sq = sum(s["total_sq"] for s in shards)
+    n = spins - gaps
+    mean = total / n
+    variance = max(total_sq / n - mean * mean, 0.0)
+
+    # payout takes one value per item, so percentiles come straight from the counts
+    order = sorted(range(len(items)), key=lambda i: items[i]["payout_usd"])
+    cum = np.cumsum([counts[i] for i in order]) / n
+    percentiles = {
+        f"p{p:g}": items[order[int(np.searchsorted(cum, p / 100))]]["payout_usd"]
+        for p in PERCENTILES
+    }
+
+    by_tier: Dict[str, int] = {name: 0 for name in spec["tier_names"]}
+    by_item: Dict[str, int] = {}
+    for item, count in zip(items, counts.tolist()):
+        by_tier[spec["tier_names"][item["tier"]]] += count
+        by_item[item["coin_id"]] = by_item.get(item["coin_id"], 0) + count
+
+    convergence = [
+        _interval(*np.sum([s["checkpoints"][i] for s in shards], axis=0).tolist(), price)
+        for i in range(min(len(s["checkpoints"]) for s in shards))
+    ]
+
+    return {
+        "case_id": spec["case_id"],
+        "odds_version": spec["odds_version"],
+        "rng": rng_mode,
+        "N": n,
+        "gaps": gaps,
+        "spent": f"{price * n:.2f}",
+        "received": f"{total:.8f}",
+        "rtp": mean / price,
+        "mean_payout_usd": mean,
+        "variance": variance,
+        "std": variance ** 0.5,
+        "ci95": convergence[-1] if convergence else None,
+        "percentiles_usd": percentiles,
+        "by_tier": by_tier,
+        "by_item": by_item,
+        "tier_hit_rate": {k: v / n for k, v in by_tier.items()},
+        "item_hit_rate": {k: v / n for k, v in by_item.items()},
+        "convergence": convergence,
+        "elapsed_sec": round(elapsed, 3),
+    }
+
+
+def write_output(stats: Dict[str, Any], out_dir: Path) -> None:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    case_id = stats["case_id"]
+    (out_dir / f"{case_id}.json").write_text(json.dumps(stats, indent=2, ensure_ascii=False) + "\n")
+    for kind, key in (("tiers", "by_tier"), ("items", "by_item")):
+        with open(out_dir / f"{case_id}_{kind}.csv", "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["tier" if kind == "tiers" else "item_id", "count", "empirical_chance"])
+            for name, count in stats[key].items():
+                writer.writerow([name, count, count / stats["N"]])
+
+# ---------------------------------------------------------------------------
+# core
+# ---------------------------------------------------------------------------
+
+def run(case_ids: List[str], n: int, players: int, workers: int, rng_mode: str, seed: Optional[int], out_dir: Path) -> None:
+    rates = {k: Decimal(v) for k, v in json.loads(RATES_PATH.read_text()).items()}
+    seeds = np.random.SeedSequence(seed)
+    players = min(players, n)
+    per_worker = max(1, players // workers)
+    steps = max(1, n // (per_worker * workers))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for case_id in case_ids:
+            spec = load_case_spec(case_id, rates)
+            started = time.perf_counter()
+            futures = [
+                pool.submit(simulate_shard, spec, per_worker, steps, rng_mode, int(s.generate_state(1)[0]))
+                for s in seeds.spawn(workers)
+            ]
+            shards = [f.result() for f in futures]
+            stats = summarize(spec, shards, rng_mode, time.perf_counter() - started)
+            write_output(stats, out_dir)
+            ci = stats["ci95"]
+            log.info(
+                "%s: N=%d RTP=%.5f (95%% CI %.5f–%.5f) in %.1fs → %s",
+                case_id, stats["N"], stats["rtp"], ci["ci95_low"], ci["ci95_high"],
+                stats["elapsed_sec"], out_dir / f"{case_id}.json",
+            )
+
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo statistics for case odds")
+    parser.add_argument("--case", action="append", dest="cases", help="case id (repeatable, default: all)")
+    parser.add_argument("-n", "--spins", type=int, default=1_000_000, help="spins per case")
+    parser.add_argument("--players", type=int, default=200_000, help="parallel simulated players (pity streams)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--rng", choices=("pcg", "hmac"), default="pcg", help="roll source")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible runs")
+    parser.add_argument("--out", type=Path, default=OUTPUT_DIR, help="output directory")
+    args = parser.parse_args()
+    run(
+        case_ids=args.cases or [c["case_id"] for c in START_CASES],
+        n=args.spins,
+        players=args.players,
+        workers=max(1, args.workers),
+        rng_mode=args.rng,
+        seed=args.seed,
+        out_dir=args.out,
+    )
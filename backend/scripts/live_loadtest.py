@@ -0,0 +1,289 @@
+"""live_loadtest.py – idle-connection load test for the live WebSocket channel.
+
+Opens `--connections` WebSockets to /api/v1/live/ws, each signed in as its own
+user (created in the spawned server) with a freshly issued access token, holds them idle for `--hold` seconds
+and then publishes one event per user through Redis, timing how long each
+takes to arrive. The server is the real app on uvicorn in a child process
+(stand-in Mongo and fakeredis, nothing leaves the machine), so client and
+server each get their own file-descriptor budget; with `--url` the test runs
+against a server that is already up, publishing through settings.REDIS_URL.
+
+Prints connect latency, server memory before and after connecting (per
+connection), the hub stats and the delivery latency; `--json` writes the same.
+
+CLI
+---
+```
+python backend/scripts/live_loadtest.py                              # 10 000 connections, 30 s idle
+python backend/scripts/live_loadtest.py --connections 2000 --hold 5
+python backend/scripts/live_loadtest.py --url ws://127.0.0.1:8000 --connections 500
+```
+Exit code is 1 when a connection fails or an event is not delivered.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR / "backend" / "src"))
+
+import aiohttp  # noqa: E402
+
+from app.core.auth_jwt import JWTManager  # noqa: E402
+from app.services.live_events import publish  # noqa: E402
+
+PATH = "/api/v1/live/ws"
+
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO
+)
+log = logging.getLogger("live_loadtest")
+logging.getLogger("app.core.auth_jwt").setLevel(logging.WARNING)  # one line per token issued
+
+# ---------------------------------------------------------------------------
+# helpers
+# ---------------------------------------------------------------------------
+
+def raise_fd_limit() -> int:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def rss_mb() -> float:
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50_ms": None, "p99_ms": None, "max_ms": None}
+    ordered = sorted(values)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)  # noqa: E731
+    return {"p50_ms": pick(0.50), "p99_ms": pick(0.99), "max_ms": round(ordered[-1], 2)}
+
+
+async def publish_probes(first_user: int, count: int) -> None:
+    """One `probe` event per user, through Redis like every write path."""
+    sent = time.time()
+    # 50 at a time: fakeredis pools at most 100 connections
+    for start in range(0, count, 50):
+        await asyncio.gather(*(
+            publish(first_user + i, [{"type": "probe", "sent": sent}])
+            for i in range(start, min(count, start + 50))
+        ))
+
+# ---------------------------------------------------------------------------
+# server (child process)
+# ---------------------------------------------------------------------------
+
+async def _serve(port: int, first_user: int, count: int, pipe) -> None:
+    import uvicorn
+
+    from app.db.models.user import User
+    from app.dev.standins import StandIns
+    from app.main import app
+    from app.services.live_events import live_hub
+
+    raise_fd_limit()
+    live_hub.max_connections = 1 << 30  # the test measures the worker, not the cap
+    stand_ins = StandIns(db_name="cryptocases_live")
+    await stand_ins.start()
+    # the endpoint only accepts users that exist
+    await User.insert_many([User(user_id=first_user + i) for i in range(count)])
+    live_hub.start()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, lifespan="off", backlog=4096,
+                                           log_level="warning", access_log=False))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.05)
+
+    loop = asyncio.get_running_loop()
+    pipe.send({"rss_mb": rss_mb()})
+    try:
+        while True:
+            command, *params = await loop.run_in_executor(None, pipe.recv)
+            if command == "stats":
+                pipe.send({"rss_mb": rss_mb(), "hub": live_hub.stats()})
+            elif command == "publish":
+                await publish_probes(*params)
+                pipe.send({"published": params[1]})
+            else:
+                break
+    finally:
+        server.should_exit = True
+        await task
+        await live_hub.stop()
+        await stand_ins.stop()
+
+
+def serve(port: int, first_user: int, count: int, pipe) -> None:
+    asyncio.run(_serve(port, first_user, count, pipe))
+
+# ---------------------------------------------------------------------------
+# client
+# ---------------------------------------------------------------------------
+
+class Probe:
+    def __init__(self):
+        self.connect_ms: List[float] = []
+        self.delivery_ms: List[float] = []
+        self.failed: Dict[str, int] = {}
+        self.delivered = asyncio.Event()
+        self.expected = 0
+
+    def fail(self, reason: str) -> None:
+        self.failed[reason] = self.failed.get(reason, 0) + 1
+
+
+async def hold(session: aiohttp.ClientSession, url: str, user_id: int, gate: asyncio.Semaphore,
+               probe: Probe, stop: asyncio.Event) -> None:
+    token = JWTManager.create_access_token(user_id)
+    async with gate:
+        started = time.perf_counter()
+        try:
+            ws = await session.ws_connect(f"{url}{PATH}?token={token}", heartbeat=None, autoping=True)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            probe.fail(type(e).__name__)
+            return
+        probe.connect_ms.append((time.perf_counter() - started) * 1000)
+    try:
+        reader = asyncio.create_task(ws.receive())
+        stopping = asyncio.create_task(stop.wait())
+        while True:
+            done, _ = await asyncio.wait((reader, stopping), return_when=asyncio.FIRST_COMPLETED)
+            if stopping in done:
+                reader.cancel()
+                break
+            msg = reader.result()
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                probe.fail(f"closed {ws.close_code}")
+                stopping.cancel()
+                break
+            event = json.loads(msg.data)
+            if event["type"] == "probe":
+                probe.delivery_ms.append((time.time() - event["sent"]) * 1000)
+                if len(probe.delivery_ms) == probe.expected:
+                    probe.delivered.set()
+            reader = asyncio.create_task(ws.receive())
+    finally:
+        await ws.close()
+
+# ---------------------------------------------------------------------------
+# core
+# ---------------------------------------------------------------------------
+
+async def main(args: argparse.Namespace) -> int:
+    limit = raise_fd_limit()
+    if args.connections + 100 > limit:
+        log.warning("%d connections with a file limit of %d", args.connections, limit)
+
+    pipe = child = None
+    url = args.url
+    if url is None:
+        parent_end, child_end = multiprocessing.Pipe()
+        child = multiprocessing.get_context("spawn").Process(
+            target=serve, args=(args.port, args.first_user, args.connections, child_end), daemon=True)
+        child.start()
+        pipe = parent_end
+        url = f"ws://127.0.0.1:{args.port}"
+    loop = asyncio.get_running_loop()
+
+    async def ask(*command) -> Dict[str, Any]:
+        if pipe is None:
+            return {}
+        if command:
+            pipe.send(command)
+        return await loop.run_in_executor(None, pipe.recv)
+
+    server_idle = (await ask()).get("rss_mb")
+    client_idle = rss_mb()
+    log.info("%d connections to %s, %d at a time", args.connections, url, args.connect_concurrency)
+
+    probe, stop = Probe(), asyncio.Event()
+    gate = asyncio.Semaphore(args.connect_concurrency)
+    session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0),
+                                    timeout=aiohttp.ClientTimeout(total=None, connect=args.timeout))
+    started = time.monotonic()
+    holders = [asyncio.create_task(hold(session, url, args.first_user + i, gate, probe, stop))
+               for i in range(args.connections)]
+    try:
+        while len(probe.connect_ms) + sum(probe.failed.values()) < args.connections:
+            await asyncio.sleep(0.1)
+        connect_sec = time.monotonic() - started
+        connected = len(probe.connect_ms)
+        log.info("%d connected in %.1fs, holding for %ss", connected, connect_sec, args.hold)
+        await asyncio.sleep(args.hold)
+        server = await ask("stats")
+
+        probe.expected = connected
+        published = time.monotonic()
+        if pipe is not None:
+            await ask("publish", args.first_user, args.connections)
+        else:
+            await publish_probes(args.first_user, args.connections)
+        try:
+            await asyncio.wait_for(probe.delivered.wait(), args.timeout)
+        except asyncio.TimeoutError:
+            pass
+        delivery_sec = time.monotonic() - published
+        server["hub"] = (await ask("stats")).get("hub")
+    finally:
+        stop.set()
+        await asyncio.gather(*holders, return_exceptions=True)
+        await session.close()
+        if pipe is not None:
+            pipe.send(("stop",))
+            child.join(30)
+
+    summary = {
+        "connections": args.connections,
+        "connected": connected,
+        "failed": probe.failed,
+        "connect_sec": round(connect_sec, 2),
+        "connect": percentiles(probe.connect_ms),
+        "hold_sec": args.hold,
+        "server_rss_mb": {"idle": server_idle, "connected": server.get("rss_mb")},
+        "client_rss_mb": {"idle": round(client_idle, 1), "connected": round(rss_mb(), 1)},
+        "hub": server.get("hub"),
+        "delivered": len(probe.delivery_ms),
+        "delivery_sec": round(delivery_sec, 2),
+        "delivery": percentiles(probe.delivery_ms),
+    }
+    if server_idle and server.get("rss_mb") and connected:
+        summary["server_kb_per_connection"] = round((server["rss_mb"] - server_idle) * 1024 / connected, 1)
+    log.info("connect %s, failed %s", summary["connect"], probe.failed or "none")
+    log.info("server RSS %s MB (%s KB per connection), hub %s", summary["server_rss_mb"],
+             summary.get("server_kb_per_connection"), summary["hub"])
+    log.info("delivered %d/%d in %.2fs: %s", summary["delivered"], connected, delivery_sec, summary["delivery"])
+    if args.json:
+        Path(args.json).write_text(json.dumps(summary, indent=2))
+        log.info("results written to %s", args.json)
+    return 0 if connected == args.connections and len(probe.delivery_ms) == connected else 1
+
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Idle-connection load test for the live WebSocket channel")
+    parser.add_argument("--connections", type=int, default=10_000, help="WebSockets held open, one user each")
+    parser.add_argument("--hold", type=float, default=30.0, help="seconds the connections sit idle")
+    parser.add_argument("--connect-concurrency", type=int, default=500, help="handshakes in flight")
+    parser.add_argument("--url", default=None, help="ws://host:port of a running server (default: spawn one)")
+    parser.add_argument("--port", type=int, default=8766, help="port of the spawned server")
+    parser.add_argument("--timeout", type=float, default=60.0, help="connect and delivery timeout, seconds")
+    parser.add_argument("--first-user", type=int, default=8_000_000)
+    parser.add_argument("--json", default=None, help="write the results here")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,345 @@
+"""loadgen.py – end-to-end load generator for the public API.
+
+Drives the real FastAPI app (in-process over ASGI, or through an in-process
+uvicorn on a local port) with `--users` concurrent virtual users. Every user
+logs in with Telegram init_data signed for the configured bot token, gets a
+stand-in deposit, then loops over a weighted mix of actions until `--duration`
+is up:
+
+* open     – POST /fairness/commit, then POST /cases/open with that seed;
+* balance  – GET /balance/usd;
+* quote    – POST /wallet/swap/quote;
+* history  – GET /history/spins.
+
+Mongo is mongomock-motor (or the mongod replica set at `--mongo-url`), Redis is
+fakeredis and rates come from data/rate_cache.json, so nothing leaves the
+process. The security-middleware and slowapi per-IP throttles are off unless
+`--keep-rate-limits`: a virtual user stands in for many real clients. Note
+that mongomock runs every query on the event loop, so with it the numbers
+size the app code, not the database.
+
+Prints throughput, latency percentiles and a histogram per endpoint and the
+errors grouped by endpoint, status and detail; `--json` writes the same.
+
+CLI
+---
+```
+python backend/scripts/loadgen.py                                   # 50 users, 30 s, ASGI
+python backend/scripts/loadgen.py --users 200 --duration 60 --mix open=6,balance=2,history=2
+python backend/scripts/loadgen.py --transport uvicorn --mongo-url mongodb://localhost:27017/?replicaSet=rs0
+python backend/scripts/loadgen.py --think-ms 500 --json load.json
+```
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import bisect
+import json
+import logging
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR / "backend" / "src"))
+
+import httpx  # noqa: E402
+
+from app.core.api_limiter import limiter  # noqa: E402
+from app.core.config.settings import get_settings  # noqa: E402
+from app.core.middlewares.security_middleware import SecurityMiddleware  # noqa: E402
+from app.dev.standins import StandIns, seed_reference_data, sign_init_data  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.internal_balance_service import InternalBalanceService  # noqa: E402
+from app.services.risk_guard import cap_reserve  # noqa: E402
+from app.services.seed_pool import seed_pool  # noqa: E402
+from app.services.spin_log_writer import spin_log_writer  # noqa: E402
+
+API = "/api/v1"
+ACTIONS = ("open", "balance", "quote", "history")
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO
+)
+log = logging.getLogger("loadgen")
+
+# ---------------------------------------------------------------------------
+# stats
+# ---------------------------------------------------------------------------
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies_ms: List[float] = []
+        self.errors: Counter = Counter()
+
+    def record(self, latency_ms: float, error: Optional[Tuple[Any, str]] = None) -> None:
+        self.latencies_ms.append(latency_ms)
+        if error:
+            self.errors[error] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        data = sorted(self.latencies_ms)
+        pct = lambda q: round(data[min(int(q * len(data)), len(data) - 1)], 2) if data else None  # noqa: E731
+        histogram = [0] * (len(BUCKETS_MS) + 1)
+        for value in data:
+            histogram[bisect.bisect_left(BUCKETS_MS, value)] += 1
+        return {
+            "requests": len(data),
+            "errors": sum(self.errors.values()),
+            "rps": round(len(data) / elapsed, 1),
+            "p50_ms": pct(0.5),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": round(data[-1], 2) if data else None,
+            "histogram": {f"<={b}ms" if i < len(BUCKETS_MS) else f">{BUCKETS_MS[-1]}ms": n
+                          for i, (b, n) in enumerate(zip(BUCKETS_MS + [None], histogram))},
+            "error_breakdown": [
+                {"status": status, "detail": detail, "count": n}
+                for (status, detail), n in self.errors.most_common()
+            ],
+        }
+
+# ---------------------------------------------------------------------------
+# virtual users
+# ---------------------------------------------------------------------------
+
+class VirtualUser:
+    def __init__(self, index: int, client: httpx.AsyncClient, stats: Dict[str, EndpointStats], args: argparse.Namespace):
+        self.index = index
+        self.client = client
+        self.stats = stats
+        self.args = args
+        self.rng = random.Random(args.seed * 100_003 + index)
+        self.telegram_id = args.first_telegram_id + index
+        self.headers = {
+            # honoured from the trusted 127.0.0.1: one client IP per virtual user
+            "X-Forwarded-For": f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}",
+            "Accept": "application/json",
+            "User-Agent": "loadgen",
+        }
+        self.nonce = 0
+
+    async def call(self, endpoint: str, method: str, path: str, **kwargs) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            resp = await self.client.request(method, API + path, headers=self.headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.stats[endpoint].record((time.perf_counter() - started) * 1000, ("exception", type(e).__name__))
+            return None
+        latency_ms = (time.perf_counter() - started) * 1000
+        if resp.status_code >= 400:
+            try:
+                detail = str(resp.json().get("detail"))[:80]
+            except ValueError:
+                detail = resp.text[:80]
+            self.stats[endpoint].record(latency_ms, (resp.status_code, detail))
+            return None
+        self.stats[endpoint].record(latency_ms)
+        return resp.json()
+
+    async def login(self) -> bool:
+        init_data = sign_init_data(
+            {"id": self.telegram_id, "first_name": f"Load {self.index}", "username": f"load{self.index}"},
+            get_settings().bot_token,
+            query_id=f"loadgen-{self.index}",
+        )
+        tokens = await self.call("login", "POST", "/auth/telegram", json={"init_data": init_data})
+        if not tokens:
+            return False
+        self.headers["Authorization"] = f"Bearer {tokens['access_token']}"
+        # stand-in deposit: there is no chain to deposit from
+        await InternalBalanceService.adjust_balance(self.telegram_id, "usdt", None, Decimal(self.args.funds))
+        return True
+
+    async def open_case(self) -> None:
+        commit = await self.call("commit", "POST", "/fairness/commit")
+        if not commit:
+            return
+        self.nonce += 1
+        await self.call("open", "POST", "/cases/open", json={
+            "case_id": self.args.case_id,
+            "server_seed_id": commit["server_seed_id"],
+            "client_seed": f"loadgen-{self.index}",
+            "nonce": self.nonce,
+        })
+
+    async def run(self, deadline: float, weights: Dict[str, int]) -> None:
+        if not await self.login():
+            return
+        actions, cum = list(weights), list(weights.values())
+        while time.monotonic() < deadline:
+            action = self.rng.choices(actions, weights=cum)[0]
+            if action == "open":
+                await self.open_case()
+            elif action == "balance":
+                await self.call("balance", "GET", "/balance/usd")
+            elif action == "quote":
+                await self.call("quote", "POST", "/wallet/swap/quote", json=self.args.quote)
+            elif action == "history":
+                await self.call("history", "GET", "/history/spins", params={"limit": 20})
+            if self.args.think_ms:
+                await asyncio.sleep(self.rng.expovariate(1000 / self.args.think_ms))
+
+# ---------------------------------------------------------------------------
+# core
+# ---------------------------------------------------------------------------
+
+def parse_mix(value: str) -> Dict[str, int]:
+    weights = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ACTIONS:
+            raise argparse.ArgumentTypeError(f"unknown action {name!r}, expected one of {', '.join(ACTIONS)}")
+        weights[name] = int(weight or 1)
+    return weights
+
+
+def parse_quote(value: str) -> Dict[str, Any]:
+    """FROM[:NETWORK],TO[:NETWORK],AMOUNT"""
+    pair_from, pair_to, amount = value.split(",")
+    (from_token, _, from_network), (to_token, _, to_network) = pair_from.partition(":"), pair_to.partition(":")
+    return {"from_token": from_token, "from_network": from_network or None,
+            "to_token": to_token, "to_network": to_network or None, "from_amount": amount}
+
+
+def disable_rate_limits() -> None:
+    async def no_limit(self, ip: str, path: str) -> None:
+        return None
+
+    limiter.enabled = False
+    SecurityMiddleware._check_rate_limits = no_limit
+
+
+async def serve_uvicorn(port: int):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, lifespan="off",
+                                           log_level="warning", access_log=False))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.05)
+    return server, task
+
+
+def report(summary: Dict[str, Any]) -> None:
+    log.info(
+        "%d users, %.1fs: %d requests, %.1f req/s, %d errors",
+        summary["users"], summary["elapsed_sec"], summary["requests"], summary["rps"], summary["errors"],
+    )
+    log.info("%-9s %8s %7s %8s %9s %9s %9s %9s", "endpoint", "requests", "errors", "req/s", "p50 ms", "p95 ms", "p99 ms", "max ms")
+    for name, s in summary["endpoints"].items():
+        log.info("%-9s %8d %7d %8.1f %9s %9s %9s %9s", name, s["requests"], s["errors"], s["rps"],
+                 s["p50_ms"], s["p95_ms"], s["p99_ms"], s["max_ms"])
+    for name, s in summary["endpoints"].items():
+        peak = max(s["histogram"].values()) or 1
+        log.info("%s latency histogram", name)
+        for bucket, n in s["histogram"].items():
+            if n:
+                log.info("  %9s %7d %s", bucket, n, "#" * max(1, round(40 * n / peak)))
+    errors = [(name, e) for name, s in summary["endpoints"].items() for e in s["error_breakdown"]]
+    if errors:
+        log.info("errors by endpoint")
+        for name, e in errors:
+            log.info("  %-9s %-9s %6d  %s", name, e["status"], e["count"], e["detail"])
+
+
+async def main(args: argparse.Namespace) -> int:
+    settings = get_settings()
+    settings.bot_token = settings.bot_token or "000000:loadgen"
+    if not args.keep_rate_limits:
+        disable_rate_limits()
+
+    stand_ins = StandIns(mongo_url=args.mongo_url, db_name="cryptocases_load")
+    await stand_ins.start()
+    cases = await seed_reference_data(odds_version="loadgen")
+    args.case_id = args.case_id or cases[0].case_id
+    spool = tempfile.TemporaryDirectory(prefix="loadgen-spool-")
+    spin_log_writer.spool_dir = Path(spool.name)
+    await spin_log_writer.start()
+    cap_reserve.start()
+    seed_pool.start()
+
+    server = task = None
+    if args.transport == "uvicorn":
+        server, task = await serve_uvicorn(args.port)
+        client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=args.timeout,
+                                   limits=httpx.Limits(max_connections=args.users))
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app, client=("127.0.0.1", 50000)),
+                                   base_url="http://loadgen", timeout=args.timeout)
+
+    stats: Dict[str, EndpointStats] = defaultdict(EndpointStats)
+    log.info("%d users for %ss over %s on %s, mix %s", args.users, args.duration, args.transport, stand_ins.backend, args.mix)
+    started = time.monotonic()
+    deadline = started + args.duration
+
+    async def start_user(index: int) -> None:
+        await asyncio.sleep(args.ramp_up * index / args.users)
+        await VirtualUser(index, client, stats, args).run(deadline, args.mix)
+
+    try:
+        await asyncio.gather(*(start_user(i) for i in range(args.users)))
+    finally:
+        elapsed = time.monotonic() - started
+        await client.aclose()
+        if server:
+            server.should_exit = True
+            await task
+        await seed_pool.stop()
+        await cap_reserve.stop()
+        await spin_log_writer.stop()
+        await stand_ins.stop()
+        spool.cleanup()
+
+    endpoints = {name: stats[name].summary(elapsed) for name in ("login", "commit", "open", "balance", "quote", "history") if name in stats}
+    total = sum(s["requests"] for s in endpoints.values())
+    errors = sum(s["errors"] for s in endpoints.values())
+    summary = {
+        "users": args.users,
+        "transport": args.transport,
+        "backend": stand_ins.backend,
+        "mix": args.mix,
+        "elapsed_sec": round(elapsed, 2),
+        "requests": total,
+        "errors": errors,
+        "rps": round(total / elapsed, 1),
+        "endpoints": endpoints,
+    }
+    report(summary)
+    if args.json:
+        Path(args.json).write_text(json.dumps(summary, indent=2))
+        log.info("results written to %s", args.json)
+    return 0 if total and errors <= total * args.max_error_rate else 1
+
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end load generator for the public API")
+    parser.add_argument("--users", type=int, default=50, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="seconds over which users log in")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean pause between a user's actions")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("open=4,balance=3,quote=2,history=1"),
+                        help="action weights, e.g. open=4,balance=3,quote=2,history=1")
+    parser.add_argument("--quote", type=parse_quote, default=parse_quote("USDT,LINK:ERC20,25"),
+                        help="swap quote as FROM[:NETWORK],TO[:NETWORK],AMOUNT")
+    parser.add_argument("--case-id", default=None, help="case to open (default: the first START_CASES case)")
+    parser.add_argument("--funds", default="1000000", help="USDT deposited for every user")
+    parser.add_argument("--transport", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--port", type=int, default=8765, help="uvicorn port")
+    parser.add_argument("--timeout", type=float, default=30.0, help="request timeout, seconds")
+    parser.add_argument("--mongo-url", default=None, help="mongod replica set (default: mongomock-motor)")
+    parser.add_argument("--keep-rate-limits", action="store_true", help="keep the per-IP throttles")
+    parser.add_argument("--first-telegram-id", type=int, default=7_000_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", default=None, help="write the results here")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="exit 1 above this error rate")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,98 @@
+"""rtp_report.py – exact RTP of the case odds tables, for CI.
+
+Evaluates the latest table in **data/odds/<case_id>/** (or an explicit file)
+at the rates in **data/rate_cache.json** with `app.services.rtp_calculator`:
+expected payout, variance, tail probabilities and the soft-pity stationary
+distribution, solved exactly – no sampling.
+
+Exits with status 1 if any case is outside the RTP bounds, has rolls without
+a reward, or references a coin without a rate.
+
+CLI
+---
+```
+python backend/scripts/rtp_report.py                          # all cases
+python backend/scripts/rtp_report.py --case case_5 --json
+python backend/scripts/rtp_report.py --odds new_table.json --case case_10 --max 0.9
+```
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+from decimal import Decimal
+from pathlib import Path
+from typing import List, Optional
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR / "backend" / "src"))
+
+from app.core.config.start_cases_config import START_CASES  # noqa: E402
+from app.models.case_config import TierConfig  # noqa: E402
+from app.services.rtp_calculator import check_rtp_bounds, compute_rtp  # noqa: E402
+
+ODDS_DIR = BASE_DIR / "data" / "odds"
+RATES_PATH = BASE_DIR / "data" / "rate_cache.json"
+
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO
+)
+log = logging.getLogger("rtp_report")
+
+# ---------------------------------------------------------------------------
+# core
+# ---------------------------------------------------------------------------
+
+def report_case(case_id: str, odds_path: Optional[Path], rates_path: Path, rtp_min: Decimal, rtp_max: Decimal, as_json: bool) -> bool:
+    case = next((c for c in START_CASES if c["case_id"] == case_id), None)
+    if case is None:
+        raise KeyError(f"unknown case {case_id}")
+    if odds_path is None:
+        files = sorted((ODDS_DIR / case_id).glob("*.json"))
+        if not files:
+            raise FileNotFoundError(f"no odds tables for {case_id} in {ODDS_DIR}")
+        odds_path = files[-1]
+
+    odds = json.loads(odds_path.read_text(), parse_float=Decimal)
+    rates = {k: Decimal(v) for k, v in json.loads(rates_path.read_text()).items()}
+    report = compute_rtp(
+        tiers=[TierConfig(**tier) for tier in odds["tiers"]],
+        pity_after=int(case["pity_after"]),
+        price_usd=Decimal(str(case["price_usd"])),
+        rates=rates,
+        case_id=case_id,
+        odds_version=odds.get("version", ""),
+    )
+    reason = check_rtp_bounds(report, rtp_min, rtp_max)
+
+    if as_json:
+        print(json.dumps({**report.as_dict(), "gate": reason or "ok"}, indent=2))
+    else:
+        data = report.as_dict()
+        log.info(
+            "%s @ %s: RTP=%.6f std=%.4f P(>=1x)=%.4f pity=%.4f gaps=%.3e",
+            case_id, report.odds_version, data["rtp"], data["std"],
+            data["tails"]["payout>=1x"], data["pity_engaged"], data["gap_probability"],
+        )
+    if reason:
+        log.error("%s: %s", case_id, reason)
+    return reason is None
+
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exact RTP report for case odds")
+    parser.add_argument("--case", action="append", dest="cases", help="case id (repeatable, default: all)")
+    parser.add_argument("--odds", type=Path, default=None, help="odds table to check instead of the latest one")
+    parser.add_argument("--rates", type=Path, default=RATES_PATH, help="rate snapshot json")
+    parser.add_argument("--min", type=Decimal, default=Decimal("0"), help="lowest accepted RTP")
+    parser.add_argument("--max", type=Decimal, default=Decimal("0.95"), help="highest accepted RTP")
+    parser.add_argument("--json", action="store_true", help="print the full report as json")
+    args = parser.parse_args()
+
+    case_ids: List[str] = args.cases or [c["case_id"] for c in START_CASES]
+    if args.odds and len(case_ids) != 1:
+        parser.error("--odds needs exactly one --case")
+    ok = [report_case(c, args.odds, args.rates, args.min, args.max, args.json) for c in case_ids]
+    sys.exit(0 if all(ok) else 1)
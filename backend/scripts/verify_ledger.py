@@ -0,0 +1,102 @@
+"""verify_ledger.py – recompute internal balances from the balance ledger.
+
+Replays the ledger of every user (or only `--user`) from the first entry, in
+parallel across users, and checks that the sequence numbers have no gaps, that
+the replay matches the live `internal_balances` documents and that the latest
+snapshot plus the ledger tail matches the replay. Prints one NDJSON line per
+user (or only failures) and a summary with throughput to stderr.
+
+Balances older than the ledger replay to zero; `--open` journals them as
+`opening` entries first (once per user, run it when the ledger is deployed).
+
+CLI
+---
+```
+python backend/scripts/verify_ledger.py
+python backend/scripts/verify_ledger.py --user 42 --user 43
+python backend/scripts/verify_ledger.py --open
+python backend/scripts/verify_ledger.py --compact --failed-only --concurrency 32
+```
+Exit code is 1 when any user fails verification.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR / "backend" / "src"))
+
+from beanie import init_beanie  # noqa: E402
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+from app.core.config.settings import get_settings  # noqa: E402
+from app.db.init_db import DataBase  # noqa: E402
+from app.db.models.balance_ledger import BalanceEntry, BalanceSnapshot, LedgerHead  # noqa: E402
+from app.db.models.internal_balance import InternalBalance  # noqa: E402
+from app.db.mongo_codec import codec_options  # noqa: E402
+from app.services.balance_ledger import BalanceLedger  # noqa: E402
+
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO, stream=sys.stderr
+)
+log = logging.getLogger("verify_ledger")
+
+# ---------------------------------------------------------------------------
+# core
+# ---------------------------------------------------------------------------
+
+async def main(args: argparse.Namespace) -> int:
+    settings = get_settings()
+    client = AsyncIOMotorClient(args.uri or settings.mongo_uri)
+    db = client.get_database(args.db or settings.mongo_db_name, codec_options=codec_options)
+    await init_beanie(database=db, document_models=[InternalBalance, LedgerHead, BalanceEntry, BalanceSnapshot])
+
+    # opening entries are written in transactions on this client
+    DataBase._client, DataBase._db = client, db
+
+    ledger = BalanceLedger(compact_every=args.compact_every, concurrency=args.concurrency)
+    started = time.perf_counter()
+    try:
+        if args.open:
+            log.info("journaled %d opening entries", await ledger.open_missing())
+        if args.compact:
+            log.info("compacted %d users", await ledger.compact_due())
+        checks = await ledger.verify(args.user or None)
+    finally:
+        client.close()
+    elapsed = time.perf_counter() - started
+
+    passed = 0
+    for check in checks:
+        passed += check.ok
+        if not args.quiet and not (args.failed_only and check.ok):
+            sys.stdout.write(json.dumps(check.as_dict()) + "\n")
+    log.info(
+        "verified %d users in %.2fs (%.0f users/s): %d passed, %d failed",
+        len(checks), elapsed, len(checks) / elapsed if elapsed else 0, passed, len(checks) - passed,
+    )
+    return 0 if passed == len(checks) else 1
+
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Recompute internal balances from the balance ledger")
+    parser.add_argument("--user", type=int, action="append", help="user_id to verify (repeatable; default: all)")
+    parser.add_argument("--concurrency", type=int, default=settings.LEDGER_VERIFY_CONCURRENCY,
+                        help="users verified at once")
+    parser.add_argument("--open", action="store_true",
+                        help="journal balances older than the ledger as opening entries before verifying")
+    parser.add_argument("--compact", action="store_true", help="run the compactor before verifying")
+    parser.add_argument("--compact-every", type=int, default=settings.LEDGER_COMPACT_EVERY,
+                        help="entries since the last snapshot that make a user due for compaction")
+    parser.add_argument("--failed-only", action="store_true", help="print failing users only")
+    parser.add_argument("--quiet", action="store_true", help="print the summary only")
+    parser.add_argument("--uri", default=None, help="mongo uri (default: settings.mongo_uri)")
+    parser.add_argument("--db", default=None, help="database name (default: settings.mongo_db_name)")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,92 @@
+"""verify_spins.py – bulk provably-fair verification of SpinLogs.
+
+Runs the same checks as `GET /fairness/verify` directly against Mongo: walks the
+spin logs of a user and/or time window with a server-side cursor, joins their
+revealed seeds in batches and recomputes the HMAC roll, tier and reward against
+the odds version every spin was played with. Prints one NDJSON line per spin
+(or only failures) and a summary with throughput to stderr.
+
+CLI
+---
+```
+python backend/scripts/verify_spins.py --user 42
+python backend/scripts/verify_spins.py --since 2025-06-01 --until 2025-06-02 --failed-only
+python backend/scripts/verify_spins.py --user 42 --quiet          # summary only
+```
+Exit code is 1 when any spin fails verification.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR / "backend" / "src"))
+
+from beanie import init_beanie  # noqa: E402
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+from app.core.config.settings import get_settings  # noqa: E402
+from app.db.models.case_config import CaseConfig  # noqa: E402
+from app.db.models.player import ServerSeed, SpinLog  # noqa: E402
+from app.db.mongo_codec import codec_options  # noqa: E402
+from app.services.fairness_verifier import FairnessVerifier, build_query  # noqa: E402
+
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO, stream=sys.stderr
+)
+log = logging.getLogger("verify_spins")
+
+
+def parse_time(value: str) -> datetime:
+    dt = datetime.fromisoformat(value)
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+# ---------------------------------------------------------------------------
+# core
+# ---------------------------------------------------------------------------
+
+async def main(args: argparse.Namespace) -> int:
+    settings = get_settings()
+    client = AsyncIOMotorClient(args.uri or settings.mongo_uri)
+    db = client.get_database(args.db or settings.mongo_db_name, codec_options=codec_options)
+    await init_beanie(database=db, document_models=[SpinLog, ServerSeed, CaseConfig])
+
+    verifier = FairnessVerifier(odds_dir=args.odds_dir, batch_size=args.batch)
+    query = build_query(args.user, args.since, args.until)
+    total = passed = 0
+    started = time.perf_counter()
+    try:
+        async for result in verifier.stream(query):
+            total += 1
+            passed += result["ok"]
+            if not args.quiet and not (args.failed_only and result["ok"]):
+                sys.stdout.write(json.dumps(result) + "\n")
+    finally:
+        client.close()
+    elapsed = time.perf_counter() - started
+    log.info(
+        "verified %d spins in %.2fs (%.0f spins/s): %d passed, %d failed",
+        total, elapsed, total / elapsed if elapsed else 0, passed, total - passed,
+    )
+    return 0 if passed == total else 1
+
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk provably-fair verification of spin logs")
+    parser.add_argument("--user", type=int, default=None, help="user_id whose spins to verify")
+    parser.add_argument("--since", type=parse_time, default=None, help="ISO time, inclusive")
+    parser.add_argument("--until", type=parse_time, default=None, help="ISO time, exclusive")
+    parser.add_argument("--failed-only", action="store_true", help="print failing spins only")
+    parser.add_argument("--quiet", action="store_true", help="print the summary only")
+    parser.add_argument("--batch", type=int, default=2000, help="logs per cursor batch / seed join")
+    parser.add_argument("--odds-dir", type=Path, default=BASE_DIR / "data" / "odds")
+    parser.add_argument("--uri", default=None, help="mongo uri (default: settings.mongo_uri)")
+    parser.add_argument("--db", default=None, help="database name (default: settings.mongo_db_name)")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -14,7 +14,12 @@ def register_routers(app: FastAPI) -> None:
     from app.api.routers.rates import router as rate_router
     from app.api.routers.wallet import router as wallet_router
     from app.api.routers.history import router as history_router
+    from app.api.routers.health import router as health_router
+    from app.api.routers.live import router as live_router
     from app.api.routers.admin import history
+    from app.api.routers.admin import cache
+    from app.api.routers.admin import odds
+    from app.api.routers.admin import metrics
     
     app.include_router(user_router)
     app.include_router(auth_router)
@@ -24,10 +29,15 @@ def register_routers(app: FastAPI) -> None:
     app.include_router(rate_router)
     app.include_router(wallet_router)
     app.include_router(history_router)
+    app.include_router(health_router)
+    app.include_router(live_router)
     
     #----------------------
     # Admin routers
     
     app.include_router(history.router)
+    app.include_router(cache.router)
+    app.include_router(odds.router)
+    app.include_router(metrics.router)
     
     #--------------------
\ No newline at end of file
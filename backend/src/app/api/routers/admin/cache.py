@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends
+
+from app.services.case_cache import case_cache
+from app.services.wallet_view import wallet_views
+from app.api.deps import require_role
+from .. import API_V1
+router = APIRouter(prefix=f"{API_V1}/admin/cache", tags=["admin"])
+
+
+@router.get("/cases")
+async def get_case_cache_stats(
+    current_admin=Depends(require_role("admin")),
+):
+    """
+    Hit/miss counters of the in-process CaseConfig cache.
+    """
+    return case_cache.stats()
+
+
+@router.get("/wallets")
+async def get_wallet_view_stats(
+    current_admin=Depends(require_role("admin")),
+):
+    """
+    How /wallet/all was answered: 304, this worker's bodies, stored views, rebuilds.
+    """
+    return wallet_views.stats()
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends
+
+from app.services.spin_log_writer import spin_log_writer
+from app.services.seed_pool import seed_pool
+from app.services.hash_chain import hash_chains
+from app.api.deps import require_role
+from .. import API_V1
+router = APIRouter(prefix=f"{API_V1}/admin/metrics", tags=["admin"])
+
+
+@router.get("/spin_logs")
+async def get_spin_log_writer_stats(
+    current_admin=Depends(require_role("admin")),
+):
+    """
+    Queue depth, spool backlog and flush latency of the SpinLog write-behind writer.
+    """
+    return spin_log_writer.stats()
+
+
+@router.get("/seed_pool")
+async def get_seed_pool_stats(
+    current_admin=Depends(require_role("admin")),
+):
+    """
+    Hit rate and refill counters of the server-seed commitment pool.
+    """
+    return seed_pool.stats()
+
+
+@router.get("/hash_chains")
+async def get_hash_chain_stats(
+    current_admin=Depends(require_role("admin")),
+):
+    """
+    Chain length, spare target and generation counters of the hash-chain fairness mode.
+    """
+    return hash_chains.stats()
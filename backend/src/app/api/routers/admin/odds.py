@@ -0,0 +1,34 @@
+from decimal import Decimal
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.services.case_cache import case_cache
+from app.services.rate_cache import rate_cache
+from app.services.rtp_calculator import compute_case_rtp, check_rtp_bounds
+from app.api.deps import require_role
+from app.core.config.settings import get_settings
+from .. import API_V1
+router = APIRouter(prefix=f"{API_V1}/admin/odds", tags=["admin"])
+settings = get_settings()
+
+
+@router.get("/{case_id}/rtp")
+async def get_case_rtp(
+    case_id: str,
+    current_admin=Depends(require_role("admin")),
+):
+    """
+    Exact RTP, variance and tail probabilities of the current odds table at live rates.
+    """
+    cfg = await case_cache.get_case(case_id)
+    if not cfg:
+        raise HTTPException(404, "invalid_case")
+    rates = {k: Decimal(v) for k, v in rate_cache.get_all_rates().items()}
+    try:
+        report = compute_case_rtp(cfg, rates)
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+    return {
+        **report.as_dict(),
+        "gate": check_rtp_bounds(report, settings.ODDS_RTP_MIN, settings.ODDS_RTP_MAX) or "ok",
+    }
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 
 from app.api.deps import require_role
 from app.db.models.user import User
+from app.schemas.balance import LedgerPage
+from app.services.balance_ledger import balance_ledger
 from app.services.internal_balance_service import InternalBalanceService
 from . import API_V1
 
@@ -10,4 +12,17 @@ router = APIRouter(prefix=f"{API_V1}/balance", tags=["Balance"])
 
 @router.get("/usd", response_model=str)
 async def get_usd_balance(user: User = Depends(require_role("user"))):
-    return await InternalBalanceService.get_overall_balance_by_usd(user.user_id)
\ No newline at end of file
+    return await InternalBalanceService.get_overall_balance_by_usd(user.user_id)
+
+@router.get("/ledger", response_model=LedgerPage)
+async def get_ledger(
+    after_seq: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    user: User = Depends(require_role("user")),
+):
+    """Every change to the user's balances, oldest first."""
+    entries = await balance_ledger.entries(user.user_id, after_seq=after_seq, limit=limit)
+    return LedgerPage(
+        entries=entries,
+        next_after_seq=entries[-1]["seq"] if len(entries) == limit else None,
+    )
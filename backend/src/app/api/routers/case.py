@@ -1,16 +1,23 @@
 from decimal import Decimal
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from app.db.models.user import User
 from app.api.deps import require_role
-from app.exceptions.balance import BalanceTooLow
-from app.schemas.case import CaseOpenRequest, CaseOpenResponse, CaseOut
-from app.services.spin_controller import spin
+from app.schemas.case import (
+    CaseOpenRequest,
+    CaseOpenResponse,
+    CaseOpenBatchRequest,
+    CaseOpenBatchResponse,
+    CaseOut
+)
+from app.services.spin_controller import open_case, spin_batch
 from app.services.case_service import CaseService
-from app.services.internal_balance_service import InternalBalanceService
+from app.services.case_cache import case_cache
+from app.services.risk_guard import cap_reserve
 from app.db.models.player import ServerSeed, CapPool
 from app.db.models.case_config import CaseConfig
+from app.utils.timing import StageTimer
 from . import API_V1
 
 router = APIRouter(prefix=f"{API_V1}/cases", tags=["Cases"])
@@ -19,11 +26,13 @@ router = APIRouter(prefix=f"{API_V1}/cases", tags=["Cases"])
 @router.get("/precheck")
 async def precheck(case_id: str):
  
-    pool = await CapPool.get("main")
-    case_config = await CaseConfig.find_one(CaseConfig.case_id==case_id)
+    pool = await case_cache.get_cap_pool()
+    case_config = await case_cache.get_case(case_id)
     assert pool is not None
     assert case_config is not None
-    is_ok = pool.balance >= case_config.global_pool_usd * Decimal.from_float(0.05)
+    # the cached CapPool.balance is only as fresh as the last rebalance; the shards are live
+    balance = await cap_reserve.total()
+    is_ok = balance >= case_config.global_pool_usd * Decimal.from_float(0.05)
     return {"spin": is_ok, "reason": "reserve_low" if not is_ok else None}
    
 
@@ -31,26 +40,27 @@ async def precheck(case_id: str):
 @router.post("/open", response_model=CaseOpenResponse)
 async def open_case_endpoint(
     data: CaseOpenRequest,
+    response: Response,
     user: User = Depends(require_role("user"))
-    ): 
-    if await InternalBalanceService.try_charge_user_for_case(
+    ):
+    timer = StageTimer()
+    result = await open_case(
         user_id=user.user_id,
-        case_id=data.case_id):
-        
-        result = await spin(
-            user_id=user.user_id,
-            data_for_spin=data
-            )
-        ca = result.prize.coin_amount
-        await InternalBalanceService.adjust_balance(
-            user_id=user.user_id,
-            coin=ca[0],
-            network=ca[1],
-            delta=ca[2]
+        data=data,
+        timer=timer
+        )
+    response.headers["Server-Timing"] = timer.server_timing()
+    return result
+
+@router.post("/open_batch", response_model=CaseOpenBatchResponse)
+async def open_case_batch_endpoint(
+    data: CaseOpenBatchRequest,
+    user: User = Depends(require_role("user"))
+    ):
+    return await spin_batch(
+        user_id=user.user_id,
+        data=data
         )
-        return result
-    else:
-        raise BalanceTooLow(None)
 
 @router.get("/list", response_model=List[CaseOut])
 async def get_cases_list(
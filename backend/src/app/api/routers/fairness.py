@@ -1,13 +1,17 @@
 # routers/fairness.py
-import os
 import hashlib
+from datetime import datetime
+from typing import List, Optional
 
-from fastapi import APIRouter, Path, HTTPException, Depends
-from fastapi.responses import RedirectResponse
+from fastapi import APIRouter, Path, Query, HTTPException, Depends
+from fastapi.responses import RedirectResponse, StreamingResponse
 from beanie import PydanticObjectId
 from app.services.odds_service import export_odds
+from app.services.seed_pool import seed_pool
+from app.services.hash_chain import hash_chains
+from app.services.fairness_verifier import build_query, fairness_verifier
 from app.db.models.player import ServerSeed, SpinLog
-from app.schemas.case import CommitOut, RevealOut
+from app.schemas.case import ChainCommitOut, CommitOut, RevealOut
 from app.api.deps import require_role
 from . import API_V1
 
@@ -25,32 +29,46 @@ async def get_odds(case_id: str, version: str):
 
 @router.post("/commit", response_model=CommitOut)
 async def commit_seed(user=Depends(require_role("user")))-> CommitOut:
-    
-    not_used_seed = await ServerSeed.find_one({"user_id": str(user.user_id), "used": False})
-    if not not_used_seed:
-    # generate new seed
-        raw = os.urandom(32)
-        hex_seed = raw.hex()
-        hash_digest = hashlib.sha256(raw).hexdigest()
-        
-        # save seed to DB
-        server_seed =  ServerSeed(
-            seed=hex_seed,
-            hash=hash_digest,
-            owner_id=str(user.user_id)
-            )
-        await server_seed.insert()
-        server_seed = str(server_seed.id)
-    else:
-        server_seed = str(not_used_seed.id)
-        hash_digest = not_used_seed.hash
-    #return the hash, document id
+    """
+    Return the oldest unused commitment of the user (pre-generated by the seed pool).
+    """
+    server_seed, = await seed_pool.take(user.user_id)
     return CommitOut(
-        server_seed_id=server_seed,
-        hash=hash_digest,
-
+        server_seed_id=str(server_seed.id),
+        hash=server_seed.hash,
         )
-    
+
+
+@router.post("/commit/batch", response_model=List[CommitOut])
+async def commit_seeds(
+    count: int = Query(..., ge=1, le=100),
+    user=Depends(require_role("user"))
+) -> List[CommitOut]:
+    """
+    `count` distinct commitments, one per spin of a batch open.
+    """
+    return [
+        CommitOut(server_seed_id=str(seed.id), hash=seed.hash)
+        for seed in await seed_pool.take(user.user_id, count)
+    ]
+
+@router.post("/chain/commit", response_model=ChainCommitOut)
+async def commit_chain(user=Depends(require_role("user"))) -> ChainCommitOut:
+    """
+    Commitment of the "chain" fairness mode: the terminal hash of the user's
+    hash chain and the current head. Spins reveal the links backwards, each
+    one hashing to the head before it.
+    """
+    chain = await hash_chains.commit(user.user_id)
+    return ChainCommitOut(
+        chain_id=str(chain.id),
+        terminal_hash=chain.terminal_hash,
+        head=chain.head,
+        cursor=chain.cursor,
+        length=chain.length,
+    )
+
+
 @router.get(
     "/reveal/{spin_log_id}",
     response_model=RevealOut,
@@ -73,13 +91,22 @@ async def reveal_pf(
     if spin.user_id != user.id:
         raise HTTPException(status_code=403, detail="forbidden")
 
+    # chain mode: the link is already in the log and hashes to the previous head
+    if spin.fairness_mode == "chain":
+        if hashlib.sha256(bytes.fromhex(spin.server_seed_seed)).hexdigest() != spin.server_seed_hash:
+            raise HTTPException(status_code=500, detail="server_seed_hash_mismatch")
+        return RevealOut(
+            server_seed=spin.server_seed_seed,
+            table_id=spin.table_id,
+            odds_version=spin.odds_version or spin.table_id
+        )
+
     # 2. Retrieve the committed server seed document
     seed_doc = await ServerSeed.get(spin.server_seed_id)
     if not seed_doc:
         raise HTTPException(status_code=404, detail="server_seed_not_found")
 
     # 3. Optional integrity check
-    import hashlib
     expected_hash = hashlib.sha256(bytes.fromhex(seed_doc.seed)).hexdigest()
     if expected_hash != seed_doc.hash:
         raise HTTPException(status_code=500, detail="server_seed_hash_mismatch")
@@ -89,4 +116,29 @@ async def reveal_pf(
         server_seed=seed_doc.seed,
         table_id=spin.table_id,
         odds_version=spin.odds_version or spin.table_id
-    )
\ No newline at end of file
+    )
+
+@router.get(
+    "/verify",
+    summary="Re-verify many spins as NDJSON",
+    description=(
+        "Streams one JSON line per spin of the user (or time window) with the result of "
+        "recomputing its seed commitment, HMAC roll, tier and reward, then a summary line. "
+        "Users verify their own spins; admins may pass any `user_id` or none."
+    ),
+)
+async def verify_spins(
+    user_id: Optional[int] = Query(None),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    failed_only: bool = Query(False),
+    user=Depends(require_role("user"))
+) -> StreamingResponse:
+    if user.role != "admin":
+        if user_id not in (None, user.user_id):
+            raise HTTPException(status_code=403, detail="forbidden")
+        user_id = user.user_id
+    return StreamingResponse(
+        fairness_verifier.stream_ndjson(build_query(user_id, since, until), failed_only=failed_only),
+        media_type="application/x-ndjson",
+    )
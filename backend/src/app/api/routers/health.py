@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Response, status
+
+from app.core.config.settings import get_settings
+from app.services.rate_cache import rate_cache
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+def _rates() -> dict:
+    rates = rate_cache.stats()
+    rates["ready"] = rate_cache.is_ready(get_settings().RATE_READY_MAX_AGE_SECONDS)
+    return rates
+
+
+@router.get("")
+async def health():
+    """
+    Liveness, with the age and source of the rate snapshot.
+    """
+    rates = _rates()
+    return {"status": "ok" if rates["ready"] else "degraded", "rates": rates}
+
+
+@router.get("/ready")
+async def ready(response: Response):
+    """
+    503 until a rate snapshot younger than RATE_READY_MAX_AGE_SECONDS is loaded.
+    """
+    rates = _rates()
+    if not rates["ready"]:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"ready": rates["ready"], "rates": rates}
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, WebSocket, status
+
+from app.api.deps import SecurityDependencies
+
+from app.core.auth_jwt import JWTManager
+from app.core.config.settings import get_settings
+from app.services.live_events import HubFull, LiveConnection, live_hub
+from . import API_V1
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix=f"{API_V1}/live", tags=["Live"])
+
+PING = json.dumps({"type": "ping"})
+
+
+def _token(websocket: WebSocket, token: Optional[str]) -> str:
+    # browsers cannot set headers on a WebSocket, so the query parameter comes first
+    if token:
+        return token
+    scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+    return credentials if scheme.lower() == "bearer" else ""
+
+
+async def _send(websocket: WebSocket, conn: LiveConnection) -> None:
+    settings = get_settings()
+    while True:
+        try:
+            message = await asyncio.wait_for(conn.queue.get(), settings.LIVE_PING_SECONDS)
+        except asyncio.TimeoutError:
+            message = PING
+        # a client that stops reading is dropped instead of holding the worker
+        await asyncio.wait_for(websocket.send_text(message), settings.LIVE_SEND_TIMEOUT_SECONDS)
+
+
+async def _receive(websocket: WebSocket) -> None:
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass  # nothing is expected from the client; this only notices it leaving
+
+
+@router.websocket("/ws")
+async def live(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """
+    Balance changes, spin results and deposit status of the signed-in user, as
+    JSON messages with a `type`. On `resync` the client has missed messages and
+    should refetch its state; `ping` arrives after LIVE_PING_SECONDS of silence.
+    The user is checked like on every HTTP endpoint before the handshake is
+    accepted: unknown or disabled users are closed with 1008.
+    """
+    try:
+        payload = JWTManager.verify_access_token(_token(websocket, token))
+        user = await SecurityDependencies.get_current_user(websocket, payload)
+    except ValueError:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    except HTTPException as e:
+        code = status.WS_1011_INTERNAL_ERROR if e.status_code >= 500 else status.WS_1008_POLICY_VIOLATION
+        await websocket.close(code=code)
+        return
+    try:
+        conn = await live_hub.connect(user.user_id)
+    except HubFull:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+
+    tasks = []
+    try:
+        await websocket.accept()
+        tasks = [asyncio.create_task(_send(websocket, conn)), asyncio.create_task(_receive(websocket))]
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        if any(isinstance(task.exception(), asyncio.TimeoutError) for task in done):
+            logger.info("Live client of user %s too slow, closing", conn.user_id)
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+    except Exception as e:
+        logger.debug("Live connection of user %s ended: %s", conn.user_id, e)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await live_hub.disconnect(conn)
@@ -1,15 +1,101 @@
-from fastapi import APIRouter
+from datetime import datetime, timezone
+from typing import Any, Optional
 
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query, status
+
+from app.core.config.coin_registry import CoinRegistry
+from app.schemas.rates import (
+    CandleOut,
+    RateOHLCResponse,
+    RatePointResponse,
+    RateQuoteOut,
+    RateQuoteRequest,
+    RateQuoteResponse,
+)
 from app.services.rate_cache import rate_cache
+from app.services.rate_history import rate_history
 from . import API_V1
 
 router = APIRouter(prefix=f"{API_V1}/rates", tags=["Rates"])
 
+MAX_CANDLES = 5000
+
+def _utc(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, timezone.utc)
+
+def _ts(dt: datetime) -> float:
+    # naive query timestamps are UTC
+    return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+
 @router.get(path="/", response_model=dict[str,str],
     )
 async def list_rates():
-    return await rate_cache.get_all_rates()
+    return rate_cache.get_all_rates()
+
+@router.get("/meta", response_model=dict[str, Any])
+async def rates_meta():
+    """Snapshot version and age, for staleness checks."""
+    return rate_cache.stats()
+
+def _coin_id(token: str) -> str:
+    meta = CoinRegistry.get(token)
+    if meta is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unsupported token: {token}")
+    return meta.coingecko_id.lower()
+
+@router.post("/quote", response_model=RateQuoteResponse)
+async def quote_pairs(body: RateQuoteRequest):
+    """Price many pairs at once from the cross-rate matrix of one snapshot."""
+    table = rate_cache.table
+    from_ids = [_coin_id(pair.from_token) for pair in body.pairs]
+    to_ids = [_coin_id(pair.to_token) for pair in body.pairs]
+    rates = table.cross_rates(from_ids, to_ids)
+    missing = sorted({f"{pair.from_token}/{pair.to_token}" for pair, rate in zip(body.pairs, rates) if rate == 0})
+    if missing:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail=f"Rates unavailable for {', '.join(missing)}")
+    to_amounts = np.array([float(pair.amount) for pair in body.pairs]) * rates
+    return RateQuoteResponse(
+        version=rate_cache.version,
+        quotes=[
+            RateQuoteOut(from_token=pair.from_token, to_token=pair.to_token, amount=pair.amount,
+                         rate=float(rate), to_amount=float(to_amount))
+            for pair, rate, to_amount in zip(body.pairs, rates, to_amounts)
+        ],
+    )
 
 @router.get("/{symbol}", response_model=str)
 async def get_rate(symbol: str):
-    return str(await rate_cache.get_rate(symbol))
\ No newline at end of file
+    return str(rate_cache.get_rate(symbol))
+
+@router.get("/{symbol}/at", response_model=RatePointResponse)
+async def get_rate_at(symbol: str, at: datetime = Query(..., description="ISO 8601 timestamp")):
+    """The rate that was in force at `at`."""
+    point = await rate_history.rate_at(symbol, _ts(at))
+    if point is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No rate recorded before this time")
+    return RatePointResponse(coin=symbol, ts=_utc(point.ts), rate=point.rate, version=point.version)
+
+@router.get("/{symbol}/ohlc", response_model=RateOHLCResponse)
+async def get_rate_ohlc(
+    symbol: str,
+    start: datetime = Query(...),
+    end: Optional[datetime] = Query(None, description="Defaults to now"),
+    step: int = Query(3600, ge=300, description="Candle size, seconds"),
+):
+    start_ts = _ts(start)
+    end_ts = _ts(end) if end else datetime.now(timezone.utc).timestamp()
+    if end_ts <= start_ts:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="`end` must be after `start`")
+    if (end_ts - start_ts) / step > MAX_CANDLES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"More than {MAX_CANDLES} candles, increase `step`")
+    candles = await rate_history.ohlc(symbol, start_ts, end_ts, step)
+    return RateOHLCResponse(
+        coin=symbol,
+        step_seconds=step,
+        candles=[
+            CandleOut(start=_utc(c.start), open=c.open, high=c.high, low=c.low, close=c.close, samples=c.samples)
+            for c in candles
+        ],
+    )
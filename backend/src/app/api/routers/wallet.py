@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from typing import Optional
 from decimal import Decimal
 
 from app.schemas.wallet import(
@@ -11,18 +12,33 @@ from app.schemas.wallet import(
 from app.services.exchange_service import ExchangeService
 from app.api.deps import require_role
 from app.db.models.user import User
-from app.utils.user import group_wallets_by_coin
+from app.services.wallet_view import wallet_views
 from . import API_V1
 
 
 router = APIRouter(prefix=f"{API_V1}/wallet", tags=["Wallets"])
 
 
-@router.get('/all', response_model=UserWalletsGrouped)
+@router.get(
+    '/all',
+    response_model=UserWalletsGrouped,
+    responses={304: {"description": "Unchanged since the ETag sent in If-None-Match"}},
+)
 async def get_wallets(
+    if_none_match: Optional[str] = Header(None),
     user: User = Depends(require_role("user"))
 ):
-    return await group_wallets_by_coin(user_id=user.user_id)
+    """
+    Balances grouped by coin, with an ETag that changes with every balance write.
+    """
+    seq = await wallet_views.seq(user.user_id)
+    etag = wallet_views.etag(user.user_id, seq)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if wallet_views.not_modified(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    seq, body = await wallet_views.body(user.user_id, seq)
+    headers["ETag"] = wallet_views.etag(user.user_id, seq)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.post('/swap/quote', response_model=ExchangeQuoteResponse)
 async def check_swap_quote(
@@ -1,4 +1,6 @@
 import asyncio
+import logging
+import time
 
 from decimal import Decimal
 
@@ -10,22 +12,52 @@ from app.core.config.settings import Settings
 from app.core.config.coin_registry import CoinRegistry
 from app.core.config.asset_registry import AssetRegistry
 from app.services.rate_cache import rate_cache  
+from app.services.rate_history import rate_history
 from app.services.case_service import CaseService
+from app.services.case_cache import case_cache
+from app.services.risk_guard import cap_reserve
+from app.services.spin_log_writer import spin_log_writer
+from app.services.seed_pool import seed_pool
+from app.services.hash_chain import hash_chains
+from app.services.balance_ledger import balance_ledger
+from app.services.live_events import live_hub
 from app.core.config.settings import get_settings
 
+logger = logging.getLogger(__name__)
 
 
 async def run():
     settings: Settings = get_settings()
     CoinRegistry.load_from_file(path=settings.coin_registry_path)
     AssetRegistry.load_from_file(path=settings.asset_registry_path)
-    asyncio.create_task(rate_cache.rate_updater())
     await DataBase.init_db()
+    await rate_history.load(since=time.time() - settings.RATE_HISTORY_CAPACITY * settings.RATE_UPDATE_SECONDS)
+    # serve the last known rates, not zeros, until the first fetch
+    age = await rate_cache.warm_start()
+    if not rate_cache.is_ready(settings.RATE_READY_MAX_AGE_SECONDS):
+        logger.warning("Rate snapshot missing or too old (age %s sec); not ready until the first fetch", age)
+    rate_cache.start()
     await init_cap_pool()
+    await cap_reserve.ensure_shards()
+    await spin_log_writer.start()
     if not await CaseService.check_cases_init():
         await CaseService.init_cases()
+    await case_cache.load()
+    case_cache.start()
+    cap_reserve.start()
+    seed_pool.start()
+    hash_chains.start()
+    balance_ledger.start()
+    live_hub.start()
     
 async def stop():
+    await live_hub.stop()
+    await balance_ledger.stop()
+    await hash_chains.stop()
+    await seed_pool.stop()
+    await spin_log_writer.stop()
+    await cap_reserve.stop()
+    await case_cache.stop()
     await rate_cache.close()
     
     
@@ -1,4 +1,5 @@
 from functools import lru_cache
+from decimal import Decimal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field, field_validator
@@ -42,6 +43,53 @@ class Settings(BaseSettings):
         "admin": 3
     }
     local_odds_dir: Path = BASE_DIR / "data" / "odds"
+    # Межі RTP, поза якими export_odds відмовляє
+    ODDS_RTP_MIN: Decimal = Decimal("0")
+    ODDS_RTP_MAX: Decimal = Decimal("0.95")
+    # Резерв CapPool: кількість шардів і період ребалансування
+    CAP_POOL_SHARDS: int = 16
+    CAP_POOL_REBALANCE_SECONDS: float = 5.0
+    # Write-behind SpinLog: локальний spool і пороги скидання в Mongo
+    SPIN_LOG_SPOOL_DIR: Path = BASE_DIR / "data" / "spool" / "spin_logs"
+    SPIN_LOG_BATCH_SIZE: int = 500
+    SPIN_LOG_FLUSH_SECONDS: float = 0.2
+    SPIN_LOG_QUEUE_MAX: int = 20000
+    # Пул заздалегідь згенерованих server seed на активного користувача
+    SEED_POOL_SIZE: int = 5
+    SEED_POOL_REFILL_SECONDS: float = 2.0
+    SEED_POOL_ACTIVE_SECONDS: float = 900
+    # Режим hash chain: довжина ланцюжка, крок контрольних точок у Mongo і запас згенерованих ланцюжків
+    HASH_CHAIN_LENGTH: int = 1_000_000
+    HASH_CHAIN_CHECKPOINT_EVERY: int = 1024
+    HASH_CHAIN_SPARES: int = 2
+    # Спільний кеш курсів у Redis: період оновлення і вік, після якого курси застарілі
+    RATE_UPDATE_SECONDS: float = 300
+    RATE_STALE_SECONDS: float = 900
+    RATE_SNAPSHOT_PATH: Path = BASE_DIR / "data" / "rate_cache.json"
+    # Сервіс готовий (health/ready), лише коли знімок курсів молодший за цей вік
+    RATE_READY_MAX_AGE_SECONDS: float = 3600
+    # CoinGecko: ліміт запитів за планом API, паралельні батчі і повтори
+    COINGECKO_RATE_PER_MINUTE: float = 30
+    COINGECKO_CONCURRENCY: int = 4
+    COINGECKO_RETRIES: int = 3
+    # Історія курсів: семплів на монету в пам'яті (тиждень по 5 хв) і розмір бакета в Mongo
+    RATE_HISTORY_CAPACITY: int = 2016
+    RATE_BUCKET_SECONDS: int = 86400
+    # Кеш USD-вартості портфеля: користувачів у пам'яті воркера і TTL копії в Redis
+    PORTFOLIO_CACHE_SIZE: int = 10_000
+    PORTFOLIO_CACHE_TTL_SECONDS: int = 3600
+    # Журнал балансів: знімок після стількох нових записів, період компактора, паралельність перевірки
+    LEDGER_COMPACT_EVERY: int = 500
+    LEDGER_COMPACT_SECONDS: float = 300
+    LEDGER_VERIFY_CONCURRENCY: int = 16
+    # Live-канал (WebSocket): з'єднань на воркер, черга повідомлень на з'єднання,
+    # період ping і скільки чекати на повільного клієнта, перш ніж закрити з'єднання
+    LIVE_MAX_CONNECTIONS: int = 10_000
+    LIVE_QUEUE_SIZE: int = 64
+    LIVE_PING_SECONDS: float = 25
+    LIVE_SEND_TIMEOUT_SECONDS: float = 10
+    # Скільки відрендерених /wallet/all тримати в пам'яті воркера
+    WALLET_VIEW_CACHE_SIZE: int = 10_000
     
     # Шляхи до реєстрів
     coin_registry_path: Path = BASE_DIR / "data" / "coin_registry.json"
@@ -1,13 +1,18 @@
+import asyncio
+
 from contextlib import asynccontextmanager
-from typing import AsyncIterator
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, TypeVar
 
 from fastapi import Depends
 from beanie import init_beanie
+from pymongo.errors import PyMongoError
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorClientSession
 from .mongo_codec import codec_options
 
 from app.core.config.settings import Settings, get_settings
 
+T = TypeVar("T")
+
 
 from app.db.models import (
     user,
@@ -17,9 +22,34 @@ from app.db.models import (
     withdrawal_log,
     internal_balance,
     deposit_log,
-    external_wallet
+    external_wallet,
+    rate_history,
+    balance_ledger,
+    wallet_view,
 )
 
+DOCUMENT_MODELS = [
+    user.User,
+    player.CapPool,
+    player.CapPoolShard,
+    player.HashChain,
+    player.HashChainLinks,
+    player.PlayerStat,
+    player.ServerSeed,
+    player.SpinLog,
+    case_config.CaseConfig,
+    case_log.CaseLog,
+    external_wallet.ExternalWallet,
+    deposit_log.DepositLog,
+    internal_balance.InternalBalance,
+    withdrawal_log.WithdrawalLog,
+    rate_history.RateBucket,
+    balance_ledger.LedgerHead,
+    balance_ledger.BalanceEntry,
+    balance_ledger.BalanceSnapshot,
+    wallet_view.WalletView,
+]
+
 class DataBase:
     _client: AsyncIOMotorClient
     _db: AsyncIOMotorDatabase
@@ -30,19 +60,7 @@ class DataBase:
         cls._client = AsyncIOMotorClient(cls._settings.mongo_uri)
         cls._db = cls._client.get_database(cls._settings.mongo_db_name, codec_options=codec_options)
         
-        await init_beanie(database=cls._db, document_models=[
-            user.User,
-            player.CapPool,
-            player.PlayerStat,
-            player.ServerSeed,
-            player.SpinLog,
-            case_config.CaseConfig,
-            case_log.CaseLog,
-            external_wallet.ExternalWallet,
-            deposit_log.DepositLog,
-            internal_balance.InternalBalance,
-            withdrawal_log.WithdrawalLog
-            ])
+        await init_beanie(database=cls._db, document_models=DOCUMENT_MODELS)
     @classmethod
     def get_client(cls) -> AsyncIOMotorClient:
         """
@@ -59,11 +77,59 @@ class DataBase:
         """
         Async context manager that yields a MongoDB session in a transaction.
         Usage:
-            async with InternalBalanceService.start_transaction() as session:
-                await InternalBalanceService.adjust_balance(..., session=session)
-                await InternalBalanceService.adjust_balance(..., session=session)
+            async with DataBase.start_transaction() as session:
+                await collection.update_one(..., session=session)
+        Writes that publish after commit go through `run_transaction` instead.
         """
         client = cls.get_client()
         async with await client.start_session() as session:
             async with session.start_transaction():
-                yield session
\ No newline at end of file
+                yield session
+
+    @classmethod
+    async def run_transaction(
+        cls,
+        callback: Callable[["Transaction"], Awaitable[T]],
+        max_attempts: int = 3,
+    ) -> T:
+        """
+        Run `callback(tx)` inside `start_transaction()` and run it again from
+        scratch on TransientTransactionError (write conflicts, elections).
+        Every attempt gets a fresh `Transaction`; the callbacks registered on
+        it with `tx.after_commit` run once that attempt commits, and are
+        dropped with an aborted one. The callback must be safe to repeat:
+        keep side effects outside Mongo in `after_commit`.
+        """
+        for attempt in range(1, max_attempts + 1):
+            try:
+                async with cls.start_transaction() as session:
+                    tx = Transaction(session)
+                    result = await callback(tx)
+            except PyMongoError as e:
+                if attempt == max_attempts or not e.has_error_label("TransientTransactionError"):
+                    raise
+                await asyncio.sleep(0.01 * attempt)
+                continue
+            await tx.committed()
+            return result
+        raise RuntimeError("unreachable")
+
+
+class Transaction:
+    """
+    One attempt of `DataBase.run_transaction`: the Motor `session` every write
+    in it passes on, and the callbacks to run once it has committed.
+    """
+    __slots__ = ("session", "_after_commit")
+
+    def __init__(self, session: Optional[AsyncIOMotorClientSession]):
+        self.session = session
+        self._after_commit: List[Callable[[], Awaitable[None]]] = []
+
+    def after_commit(self, callback: Callable[[], Awaitable[None]]) -> None:
+        self._after_commit.append(callback)
+
+    async def committed(self) -> None:
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            await callback()
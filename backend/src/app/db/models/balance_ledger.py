@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import List, Optional
+
+from beanie import Document
+from pydantic import BaseModel, Field
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+
+class LedgerHead(Document):
+    """Per-user ledger cursor: the last sequence number handed out and the last one compacted."""
+    id: int = Field(..., description="User identifier")
+    seq: int = 0
+    compacted_seq: int = 0
+
+    class Settings:
+        name = "balance_ledger_heads"
+
+
+class BalanceEntry(Document):
+    """One balance change, never updated or deleted. `seq` is gap-free per user."""
+    user_id: int
+    seq: int
+    coin: str
+    network: Optional[str] = None
+    delta: Decimal
+    reason: str
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "balance_ledger"
+        indexes = [
+            IndexModel([("user_id", ASCENDING), ("seq", ASCENDING)], unique=True),
+        ]
+
+
+class WalletBalance(BaseModel):
+    coin: str
+    network: Optional[str] = None
+    balance: Decimal
+
+
+class BalanceSnapshot(Document):
+    """Every wallet of a user folded from the ledger up to and including `seq`."""
+    user_id: int
+    seq: int
+    balances: List[WalletBalance] = Field(default_factory=list)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "balance_snapshots"
+        indexes = [
+            IndexModel([("user_id", ASCENDING), ("seq", DESCENDING)], unique=True),
+        ]
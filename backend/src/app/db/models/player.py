@@ -1,7 +1,11 @@
-from beanie import Document, Indexed
+from beanie import Document, Indexed, PydanticObjectId
 from pydantic import Field, ConfigDict
 from datetime import datetime, timezone
 from decimal import Decimal
+from typing import Optional
+from pymongo import ASCENDING, IndexModel
+
+SEED_TTL_SECONDS = 7 * 24 * 3600
 
 class PlayerStat(Document):
     """
@@ -18,13 +22,14 @@ class PlayerStat(Document):
 class CapPool(Document):
     """
     Payout reserve, statistical buffer and payout limit.
-    Single document with _id="main".
+    Single document with _id="main". The live reserve is held in CapPoolShard
+    documents; `balance` is their total as of the last rebalance.
     """
     id: str = Field(
         default="main",
         alias="_id",
         description="Fixed ID of the single reserve")       # always "main"
-    balance: Decimal = Field(Decimal("0"),  description="Current Reserve Balance (USDT)")
+    balance: Decimal = Field(Decimal("0"),  description="Reserve balance at the last shard rebalance (USDT)")
     sigma_buffer: Decimal = Field(Decimal("0"), description="Recommended statistical buffer (4σ)")
     max_payout: Decimal = Field(Decimal("0"), description="Maximum one-time payout (USDT)")
     
@@ -32,7 +37,24 @@ class CapPool(Document):
 
     class Settings:
         name = "cap_pool"
-    
+
+
+class CapPoolShard(Document):
+    """
+    One slice of the CapPool reserve. Spins debit shards with conditional $inc,
+    the rebalancer evens them out; the sum of all shards is the live reserve.
+    """
+    id: str = Field(..., alias="_id", description="<pool_id>:<index>")
+    pool_id: str = Field(default="main", description="CapPool this shard belongs to")
+    index: int = Field(..., description="Shard number")
+    balance: Decimal = Field(Decimal("0"), description="Reserve held by this shard (USDT)")
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    class Settings:
+        name = "cap_pool_shards"
+        indexes = [[("pool_id", ASCENDING), ("index", ASCENDING)]]
+
 
 class ServerSeed(Document):
     """
@@ -46,6 +68,61 @@ class ServerSeed(Document):
 
     class Settings:
         name = "server_seeds"
+        indexes = [
+            # commit: oldest unused seed of a user
+            IndexModel([("owner_id", ASCENDING), ("used", ASCENDING), ("created_at", ASCENDING)]),
+            # unused commitments expire; revealed seeds stay for verification
+            IndexModel(
+                [("created_at", ASCENDING)],
+                name="unused_seed_ttl",
+                expireAfterSeconds=SEED_TTL_SECONDS,
+                partialFilterExpression={"used": False},
+            ),
+        ]
+
+class HashChain(Document):
+    """
+    Provably-Fair hash chain: the server commits to `terminal_hash`, the last of
+    `length` SHA-256 links, and reveals the links backwards, one per spin.
+    The links are recomputed from the checkpoints in `HashChainLinks`; the
+    document keeps the head (the last revealed link, `terminal_hash` before
+    the first spin) and the cursor.
+    """
+    owner_id: Optional[str] = Field(default=None, description="None while the chain is a spare")
+    terminal_hash: str
+    head: str
+    cursor: int = 0
+    length: int
+    checkpoint_every: int = Field(description="Links per checkpoint block")
+    status: str = Field(default="spare", description="spare | active | exhausted")
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "hash_chains"
+        indexes = [
+            # one active chain per user
+            IndexModel(
+                [("owner_id", ASCENDING)],
+                name="active_chain_owner",
+                unique=True,
+                partialFilterExpression={"status": "active"},
+            ),
+            IndexModel([("status", ASCENDING), ("created_at", ASCENDING)]),
+        ]
+
+
+class HashChainLinks(Document):
+    """
+    Checkpoints of a HashChain (same id): the links revealed by spins
+    `checkpoint_every - 1`, `2 * checkpoint_every - 1`, ... and the last one,
+    32 bytes each. A link is the sha256 of the one revealed after it, so every
+    link of a block is recomputed from the block's checkpoint.
+    """
+    id: PydanticObjectId
+    links: bytes
+
+    class Settings:
+        name = "hash_chain_links"
 
 class SpinLog(Document):
     """
@@ -58,6 +135,8 @@ class SpinLog(Document):
     server_seed_seed: str
     client_seed: str
     nonce: int
+    fairness_mode: str = "hmac"
+    chain_index: Optional[int] = None
     hmac_value: bytes
     raw_roll: Decimal
     table_id: str
@@ -67,10 +146,21 @@ class SpinLog(Document):
     stake: Decimal
     payout: Decimal
     payout_usd: Decimal
+    rate_snapshot_id: Optional[int] = Field(default=None, description="rate_cache version payout_usd was priced at")
+    rate_snapshot_at: Optional[datetime] = Field(default=None, description="updated_at of that snapshot, unique with the version")
     pity_before: Decimal
     pity_after: Decimal
     rtp_session: Decimal
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
     class Settings:
-        name = "spin_logs"
\ No newline at end of file
+        name = "spin_logs"
+        indexes = [
+            # bulk verification walks one user's logs in _id order
+            IndexModel([("user_id", ASCENDING), ("_id", ASCENDING)]),
+            # chain spins are checked against the spin that revealed the link before
+            IndexModel(
+                [("server_seed_id", ASCENDING), ("chain_index", ASCENDING)],
+                partialFilterExpression={"fairness_mode": "chain"},
+            ),
+        ]
\ No newline at end of file
@@ -0,0 +1,27 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import List
+
+from beanie import Document
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+
+class RateBucket(Document):
+    """
+    USD rate samples of one coin within one time bucket (a day by default),
+    as parallel arrays in sample order: epoch seconds, rate and the
+    `rate_cache` snapshot version the sample came from.
+    """
+    coin: str
+    start: datetime
+    ts: List[float] = Field(default_factory=list)
+    rates: List[Decimal] = Field(default_factory=list)
+    versions: List[int] = Field(default_factory=list)
+    samples: int = 0
+
+    class Settings:
+        name = "rate_buckets"
+        indexes = [
+            IndexModel([("coin", ASCENDING), ("start", ASCENDING)], unique=True),
+        ]
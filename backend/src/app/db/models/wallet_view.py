@@ -0,0 +1,16 @@
+from decimal import Decimal
+from typing import Dict
+
+from beanie import Document
+from pydantic import Field
+
+
+class WalletView(Document):
+    """Per-user projection of internal balances for /wallet/all, current as of ledger `seq`."""
+    id: int = Field(..., description="User identifier")
+    seq: int = 0
+    # "coin|network" -> balance; the network part is empty for network-less balances
+    rows: Dict[str, Decimal] = Field(default_factory=dict)
+
+    class Settings:
+        name = "wallet_views"
@@ -18,6 +18,8 @@ class WithdrawalLog(Document):
     amount_coin: Decimal             # сума у native-одиницях токена
     amount_usdt: Decimal             # USDT-еквівалент для бухобліку
     conversion_rate: Decimal         # курс, за яким розраховано amount_usdt
+    rate_snapshot_id: Optional[int] = None  # версія знімка курсів (rate_cache), з якого взято conversion_rate
+    rate_snapshot_at: Optional[datetime] = None  # час цього знімка: разом із версією однозначно його визначає
     fee_coin: Optional[Decimal] = None
     fee_usdt: Optional[Decimal] = None
     tx_hash: Optional[str] = None
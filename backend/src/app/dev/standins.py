@@ -0,0 +1,182 @@
+# app/dev/standins.py
+"""
+In-process stand-ins for Mongo and Redis, used by the hot-path benchmarks and
+the load generator. Needs the dev requirements (mongomock-motor, fakeredis).
+"""
+import hashlib
+import hmac
+import inspect
+import json
+import time
+import urllib.parse
+
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import bson
+from beanie import init_beanie
+
+from app.core import redis_client
+from app.core.config.asset_registry import AssetRegistry
+from app.core.config.coin_registry import CoinRegistry
+from app.core.config.settings import BASE_DIR, get_settings
+from app.core.config.start_cases_config import START_CASES
+from app.db.init_db import DOCUMENT_MODELS, DataBase
+from app.db.models.case_config import CaseConfig, OddsVersion
+from app.db.models.player import CapPool
+from app.db.mongo_codec import codec_options
+from app.services.case_cache import case_cache
+from app.services.case_service import CaseService
+from app.services.rate_cache import rate_cache
+from app.services.risk_guard import cap_reserve
+
+_MISSING = object()
+
+
+class CodecBSON:
+    """
+    mongomock validates documents with plain BSON; validate them with the
+    app's codec options instead, like the driver encodes them.
+    """
+    @staticmethod
+    def encode(document, check_keys=False):
+        return bson.encode(document, check_keys, codec_options)
+
+
+def unset_stage(in_collection, database, fields):
+    """`$unset` pipeline stage (used by the PlayerStat update): a `$project` exclusion."""
+    import mongomock.aggregate
+    fields = [fields] if isinstance(fields, str) else fields
+    return mongomock.aggregate._handle_project_stage(in_collection, database, {f: 0 for f in fields})
+
+
+def _without_sort(add):
+    """pymongo >= 4.11 passes `sort` to the bulk builder; mongomock does not know it."""
+    def wrapper(self, *args, sort=None, **kwargs):
+        return add(self, *args, **kwargs)
+    return wrapper
+
+
+@asynccontextmanager
+async def _no_transaction(cls):
+    yield None
+
+
+class StandIns:
+    """
+    Beanie on mongomock-motor (or the mongod at `mongo_url`) and fakeredis,
+    wired into `DataBase` and `redis_client`; `stop()` undoes every patch.
+
+    mongomock cannot compare or $inc Decimal128, so there amounts stay
+    `Decimal` end to end: Beanie does not pre-encode them and mongomock
+    validates with the codec the real driver uses. It has no sessions either:
+    `DataBase` transactions run as plain writes without rollback. A mongod
+    needs to be a replica set for the transactions.
+    """
+    def __init__(self, mongo_url: Optional[str] = None, db_name: str = "cryptocases_standin"):
+        self.mongo_url = mongo_url
+        self.db_name = db_name
+        self.client = None
+        self._patches: List[tuple] = []
+
+    @property
+    def backend(self) -> str:
+        return "mongod" if self.mongo_url else "mongomock"
+
+    async def start(self):
+        import fakeredis
+
+        if self.mongo_url:
+            from motor.motor_asyncio import AsyncIOMotorClient
+            self.client = AsyncIOMotorClient(self.mongo_url)
+            db = self.client.get_database(self.db_name, codec_options=codec_options)
+            await self.client.drop_database(self.db_name)
+        else:
+            import mongomock.aggregate
+            import mongomock.collection
+            from beanie.odm.utils import encoder
+            from mongomock_motor import AsyncMongoMockClient
+
+            self._patch(mongomock.collection, "BSON", CodecBSON)
+            builder = mongomock.collection.BulkOperationBuilder
+            self._patch(builder, "add_update", _without_sort(builder.add_update))
+            self._patch(builder, "add_replace", _without_sort(builder.add_replace))
+            self._patch_item(mongomock.aggregate._PIPELINE_HANDLERS, "$unset", unset_stage)
+            self._patch_item(encoder.DEFAULT_CUSTOM_ENCODERS, Decimal, lambda value: value)
+            self._patch(DataBase, "start_transaction", classmethod(_no_transaction))
+            self.client = AsyncMongoMockClient()
+            db = self.client.get_database(self.db_name)
+
+        self._patch(DataBase, "_client", self.client)
+        self._patch(DataBase, "_db", db)
+        self._patch(redis_client, "_redis", fakeredis.FakeAsyncRedis(decode_responses=True))
+        await init_beanie(database=db, document_models=DOCUMENT_MODELS)
+        return db
+
+    async def stop(self) -> None:
+        if self.mongo_url:
+            await self.client.drop_database(self.db_name)
+        self.client.close()
+        for undo in reversed(self._patches):
+            undo()
+        self._patches.clear()
+
+    def _patch(self, target: Any, name: str, value: Any) -> None:
+        old = inspect.getattr_static(target, name, _MISSING)
+        setattr(target, name, value)
+        self._patches.append(lambda: delattr(target, name) if old is _MISSING else setattr(target, name, old))
+
+    def _patch_item(self, target: Dict, key: Any, value: Any) -> None:
+        old = target.get(key, _MISSING)
+        target[key] = value
+        self._patches.append(lambda: target.pop(key) if old is _MISSING else target.__setitem__(key, old))
+
+
+def data_dir() -> Path:
+    """/app/data in the container, the repo's data/ in a checkout."""
+    return next(d for d in (get_settings().project_root_path / "data", BASE_DIR.parent / "data") if d.exists())
+
+
+async def seed_reference_data(odds_version: str = "standin") -> List[CaseConfig]:
+    """
+    Registries, the offline rate snapshot (data/rate_cache.json), the START_CASES
+    configs and a CapPool big enough not to throttle spins.
+    """
+    root = data_dir()
+    CoinRegistry.load_from_file(path=root / "coin_registry.json")
+    AssetRegistry.load_from_file(path=root / "asset_registry.json")
+    rates = json.loads((root / "rate_cache.json").read_text())
+    await rate_cache.publish({coin: Decimal(rate) for coin, rate in rates.items()})
+
+    cases = [CaseService.build_case(case, OddsVersion(version=odds_version)) for case in START_CASES]
+    for cfg in cases:
+        await cfg.insert()
+    await CapPool(id="main", balance=Decimal("1000000000"), sigma_buffer=Decimal("1000"),
+                  max_payout=Decimal("1000000")).insert()
+    cap_reserve._shard_ids = []
+    await cap_reserve.ensure_shards()
+    await case_cache.load()
+    return cases
+
+
+def sign_init_data(
+    user: Dict[str, Any],
+    bot_token: str,
+    auth_date: Optional[int] = None,
+    query_id: str = "standin",
+) -> str:
+    """
+    Telegram WebApp init_data for `user`, signed with `bot_token` the way
+    Telegram does, so it passes `TelegramAuthValidator`.
+    """
+    fields = {
+        "query_id": query_id,
+        "user": json.dumps(user, separators=(",", ":")),
+        "auth_date": str(auth_date or int(time.time())),
+    }
+    data_check_string = "\n".join(f"{key}={value}" for key, value in sorted(fields.items()))
+    secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+    fields["hash"] = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    return urllib.parse.urlencode(fields)
@@ -126,6 +126,7 @@ from app.core.config.asset_registry import AssetRegistry
 from app.utils import coin_keys
 
 TARGET_SCALE = Decimal("0.000001")
+TARGET_PLACES = 6
 
 @dataclass(slots=True)
 class Coin:
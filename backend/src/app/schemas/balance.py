@@ -0,0 +1,19 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class LedgerEntryOut(BaseModel):
+    seq: int
+    coin: str
+    network: Optional[str] = None
+    delta: Decimal
+    reason: str
+    created_at: datetime
+
+
+class LedgerPage(BaseModel):
+    entries: List[LedgerEntryOut]
+    next_after_seq: Optional[int] = Field(None, description="Pass as `after_seq` for the next page; null on the last one")
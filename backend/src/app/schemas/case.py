@@ -1,14 +1,50 @@
 from decimal import Decimal
-from pydantic import BaseModel
-from typing import Tuple, List, Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Tuple, List, Literal, Optional
 
 from beanie import PydanticObjectId
 
+FairnessMode = Literal["hmac", "chain"]
+
 class CaseOpenRequest(BaseModel):
     case_id: str
     client_seed: str
     nonce: int
-    server_seed_id:str
+    # "hmac": one committed ServerSeed per spin; "chain": next link of the committed hash chain
+    fairness_mode: FairnessMode = "hmac"
+    server_seed_id: Optional[str] = None
+    chain_id: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_commitment(self) -> "CaseOpenRequest":
+        if self.fairness_mode == "hmac" and not self.server_seed_id:
+            raise ValueError("`server_seed_id` is required in hmac mode")
+        if self.fairness_mode == "chain" and not self.chain_id:
+            raise ValueError("`chain_id` is required in chain mode")
+        return self
+
+class SpinSeed(BaseModel):
+    server_seed_id: Optional[str] = None
+    nonce: int
+
+class CaseOpenBatchRequest(BaseModel):
+    case_id: str
+    client_seed: str
+    count: int = Field(..., ge=1, le=50)
+    seeds: List[SpinSeed]
+    fairness_mode: FairnessMode = "hmac"
+    chain_id: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_seeds(self) -> "CaseOpenBatchRequest":
+        if len(self.seeds) != self.count:
+            raise ValueError("`seeds` must contain exactly `count` entries")
+        if self.fairness_mode == "chain":
+            if not self.chain_id:
+                raise ValueError("`chain_id` is required in chain mode")
+        elif len({s.server_seed_id for s in self.seeds} - {None}) != len(self.seeds):
+            raise ValueError("every spin needs its own `server_seed_id`")
+        return self
 
 class PrizeItem(BaseModel):
     coin_amount: Tuple[str,str | None,Decimal]
@@ -26,10 +62,24 @@ class CaseOpenResponse(BaseModel):
     spin_log_id: Optional[PydanticObjectId] = None
     # + будь-які деталі для фронту
     
+class CaseOpenBatchResponse(BaseModel):
+    case_id: str
+    count: int
+    total_price: Decimal
+    results: List[CaseOpenResponse]
+    
 class CommitOut(BaseModel):
     server_seed_id: str
     hash: str
 
+class ChainCommitOut(BaseModel):
+    chain_id: str
+    terminal_hash: str
+    # last revealed link; the next spin reveals the link hashing to it
+    head: str
+    cursor: int
+    length: int
+
 class RevealOut(BaseModel):
     server_seed: str
     table_id: str
@@ -0,0 +1,50 @@
+from typing import List
+from datetime import datetime
+from decimal import Decimal
+
+from pydantic import BaseModel, Field
+
+
+class RatePointResponse(BaseModel):
+    coin: str
+    ts: datetime = Field(..., description="When the sample in force at the requested time was taken")
+    rate: Decimal
+    version: int = Field(..., description="Rate snapshot version, as stored in `rate_snapshot_id`; 0 for a local one")
+
+
+class CandleOut(BaseModel):
+    start: datetime
+    open: Decimal
+    high: Decimal
+    low: Decimal
+    close: Decimal
+    samples: int
+
+
+class RateOHLCResponse(BaseModel):
+    coin: str
+    step_seconds: int
+    candles: List[CandleOut]
+
+
+class RateQuotePair(BaseModel):
+    from_token: str = Field(..., description="Symbol, alias or CoinGecko id")
+    to_token: str
+    amount: Decimal = Field(Decimal("1"), gt=0)
+
+
+class RateQuoteRequest(BaseModel):
+    pairs: List[RateQuotePair] = Field(..., min_length=1, max_length=500)
+
+
+class RateQuoteOut(BaseModel):
+    from_token: str
+    to_token: str
+    amount: Decimal
+    rate: float = Field(..., description="Units of `to_token` per unit of `from_token`")
+    to_amount: float = Field(..., description="Indicative; swaps are priced exactly by /wallet/swap/quote")
+
+
+class RateQuoteResponse(BaseModel):
+    version: int = Field(..., description="Rate snapshot every pair was priced from")
+    quotes: List[RateQuoteOut]
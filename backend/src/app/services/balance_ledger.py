@@ -0,0 +1,329 @@
+# services/balance_ledger.py
+import asyncio
+import logging
+
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from app.core.config.settings import Settings, get_settings
+from app.db.models.balance_ledger import BalanceEntry, BalanceSnapshot, LedgerHead
+from app.db.init_db import DataBase, Transaction
+from app.db.models.internal_balance import InternalBalance
+from app.services.live_events import publish
+from app.services.wallet_view import wallet_views
+
+logger = logging.getLogger(__name__)
+settings: Settings = get_settings()
+
+Wallet = Tuple[str, Optional[str]]  # (coin, network)
+ZERO = Decimal("0")
+
+
+def fold(balances: Dict[Wallet, Decimal], entries: Iterable[Dict[str, Any]]) -> Dict[Wallet, Decimal]:
+    """Apply ledger entries (raw `coin`/`network`/`delta` docs) on top of `balances`."""
+    folded = dict(balances)
+    for e in entries:
+        key = (e["coin"], e.get("network"))
+        folded[key] = folded.get(key, ZERO) + Decimal(e["delta"])
+    return folded
+
+
+def non_zero(balances: Dict[Wallet, Decimal]) -> Dict[Wallet, Decimal]:
+    return {key: value for key, value in balances.items() if value != 0}
+
+
+@dataclass(slots=True)
+class LedgerCheck:
+    user_id: int
+    seq: int
+    ok: bool
+    # wallet -> (ledger, live); only wallets that differ
+    mismatches: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+    problems: List[str] = field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"user_id": self.user_id, "seq": self.seq, "ok": self.ok,
+                "mismatches": self.mismatches, "problems": self.problems}
+
+
+class BalanceLedger:
+    """
+    Append-only journal of internal balance changes.
+
+    Every balance write appends its deltas in the same transaction, numbered
+    from the user's `LedgerHead`: the `$inc` on the head hands out a gap-free
+    range of sequence numbers and serialises concurrent writers of one user.
+    The compactor folds the ledger into `BalanceSnapshot`s once a user has
+    `compact_every` new entries, so `balances` is the latest snapshot plus a
+    short tail. Balance reads stay on `InternalBalance`, written in the same
+    transaction: one document per wallet, where the ledger would be a
+    snapshot plus a tail to fold. `open_missing` journals the balances that
+    predate the ledger as `opening` entries, once per user. `verify` replays
+    the whole ledger of each user and compares it with the live
+    `InternalBalance` documents and the latest snapshot.
+    """
+    def __init__(
+        self,
+        compact_every: int = 500,
+        compact_interval_seconds: float = 300,
+        concurrency: int = 16,
+    ):
+        self.compact_every = compact_every
+        self.compact_interval_seconds = compact_interval_seconds
+        self.concurrency = concurrency
+        self.compacted = 0
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    async def append(
+        self,
+        user_id: int,
+        reason: str,
+        deltas: List[Tuple[str, Optional[str], Decimal]],
+        tx: Optional[Transaction] = None,
+    ) -> int:
+        """
+        Journal (coin, network, delta) changes and apply them to the user's
+        wallet view; returns the last sequence number used. Live clients get
+        the entries once `tx` commits, or right away without one.
+        """
+        if not deltas:
+            return 0
+        session = tx.session if tx is not None else None
+        head = await LedgerHead.get_motor_collection().find_one_and_update(
+            {"_id": user_id},
+            {"$inc": {"seq": len(deltas)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+            session=session,
+        )
+        last = head["seq"]
+        first = last - len(deltas) + 1
+        await BalanceEntry.get_motor_collection().insert_many(
+            [
+                BalanceEntry(user_id=user_id, seq=first + i, coin=coin, network=network,
+                             delta=delta, reason=reason).model_dump(by_alias=True, exclude={"id"})
+                for i, (coin, network, delta) in enumerate(deltas)
+            ],
+            session=session,
+        )
+        await wallet_views.apply(user_id, first, deltas, session=session)
+        events = [
+            {"type": "balance", "seq": first + i, "coin": coin, "network": network, "delta": str(delta), "reason": reason}
+            for i, (coin, network, delta) in enumerate(deltas)
+        ]
+        if tx is None:
+            await publish(user_id, events)
+        else:
+            tx.after_commit(lambda: publish(user_id, events))
+        return last
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    async def latest_snapshot(self, user_id: int) -> Tuple[int, Dict[Wallet, Decimal]]:
+        doc = await BalanceSnapshot.get_motor_collection().find_one(
+            {"user_id": user_id}, sort=[("seq", DESCENDING)]
+        )
+        if doc is None:
+            return 0, {}
+        return doc["seq"], {(b["coin"], b.get("network")): Decimal(b["balance"]) for b in doc["balances"]}
+
+    async def entries(self, user_id: int, after_seq: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        cursor = BalanceEntry.get_motor_collection().find(
+            {"user_id": user_id, "seq": {"$gt": after_seq}},
+            {"_id": 0, "user_id": 0},
+        ).sort("seq", ASCENDING)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(None)
+
+    async def balances(self, user_id: int) -> Tuple[int, Dict[Wallet, Decimal]]:
+        """(last sequence number, balances): the latest snapshot plus the ledger tail."""
+        seq, balances = await self.latest_snapshot(user_id)
+        tail = await self.entries(user_id, after_seq=seq)
+        return (tail[-1]["seq"] if tail else seq), non_zero(fold(balances, tail))
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+    async def compact(self, user_id: int) -> Optional[int]:
+        """Snapshot the user's balances at the last entry; returns its seq, None if nothing to fold."""
+        snapshot_seq, _ = await self.latest_snapshot(user_id)
+        seq, balances = await self.balances(user_id)
+        if seq <= snapshot_seq:
+            return None
+        try:
+            await BalanceSnapshot(
+                user_id=user_id,
+                seq=seq,
+                balances=[{"coin": coin, "network": network, "balance": value}
+                          for (coin, network), value in balances.items()],
+            ).insert()
+        except DuplicateKeyError:
+            pass  # another compactor got there first with the same fold
+        await LedgerHead.get_motor_collection().update_one(
+            {"_id": user_id}, {"$max": {"compacted_seq": seq}}
+        )
+        self.compacted += 1
+        return seq
+
+    async def compact_due(self) -> int:
+        """Compact every user with at least `compact_every` entries since the last snapshot."""
+        due = [
+            head["_id"]
+            async for head in LedgerHead.get_motor_collection().find({}, {"seq": 1, "compacted_seq": 1})
+            if head["seq"] - head.get("compacted_seq", 0) >= self.compact_every
+        ]
+        done = await self._map(self.compact, due)
+        return sum(seq is not None for seq in done)
+
+    # ------------------------------------------------------------------
+    # Opening entries
+    # ------------------------------------------------------------------
+    async def open_user(self, user_id: int) -> int:
+        """
+        Journal what the user's live balances hold beyond their ledger as one
+        `opening` entry per wallet, numbered from the user's `LedgerHead` in
+        one transaction with the reads. Returns the entries appended; users
+        that already have opening entries are left alone.
+        """
+        async def open_balances(tx: Transaction) -> int:
+            entries = BalanceEntry.get_motor_collection()
+            if await entries.find_one({"user_id": user_id, "reason": "opening"}, {"_id": 1}, session=tx.session):
+                return 0
+            live = {
+                (b["coin"], b.get("network")): Decimal(b["balance"])
+                async for b in InternalBalance.get_motor_collection().find(
+                    {"user_id": user_id}, {"_id": 0, "coin": 1, "network": 1, "balance": 1}, session=tx.session)
+            }
+            replayed = fold({}, await entries.find(
+                {"user_id": user_id}, {"_id": 0, "coin": 1, "network": 1, "delta": 1}, session=tx.session
+            ).to_list(None))
+            deltas = [
+                (coin, network, live[coin, network] - replayed.get((coin, network), ZERO))
+                for coin, network in sorted(live, key=str)
+                if live[coin, network] != replayed.get((coin, network), ZERO)
+            ]
+            if not deltas:
+                return 0
+            head = await LedgerHead.get_motor_collection().find_one_and_update(
+                {"_id": user_id},
+                {"$inc": {"seq": len(deltas)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+                session=tx.session,
+            )
+            first = head["seq"] - len(deltas) + 1
+            # the balances do not change: no live events, and the wallet view,
+            # now behind the head, is rebuilt from them on the next read
+            await entries.insert_many(
+                [
+                    BalanceEntry(user_id=user_id, seq=first + i, coin=coin, network=network,
+                                 delta=delta, reason="opening").model_dump(by_alias=True, exclude={"id"})
+                    for i, (coin, network, delta) in enumerate(deltas)
+                ],
+                session=tx.session,
+            )
+            return len(deltas)
+
+        return await DataBase.run_transaction(open_balances)
+
+    async def open_missing(self) -> int:
+        """`open_user` for every user with a balance; returns the entries appended. Run once, at deploy."""
+        user_ids = await InternalBalance.get_motor_collection().distinct("user_id")
+        return sum(await self._map(self.open_user, sorted(user_ids)))
+
+    # ------------------------------------------------------------------
+    # Verification
+    # ------------------------------------------------------------------
+    async def verify_user(self, user_id: int, attempts: int = 3) -> LedgerCheck:
+        """
+        Replay the user's ledger from the first entry and compare it with the
+        live balances and with the latest snapshot plus tail. The head is read
+        before and after; a write in between means another attempt.
+        """
+        heads = LedgerHead.get_motor_collection()
+        for _ in range(attempts):
+            head = await heads.find_one({"_id": user_id}) or {"seq": 0}
+            live = {
+                (b["coin"], b.get("network")): Decimal(b["balance"])
+                async for b in InternalBalance.get_motor_collection().find(
+                    {"user_id": user_id}, {"_id": 0, "coin": 1, "network": 1, "balance": 1})
+            }
+            entries = [e for e in await self.entries(user_id) if e["seq"] <= head["seq"]]
+            compacted = await self.balances(user_id)
+            after = await heads.find_one({"_id": user_id}) or {"seq": 0}
+            if after["seq"] == head["seq"]:
+                break
+        else:
+            return LedgerCheck(user_id, after["seq"], False, problems=["balances kept changing"])
+
+        check = LedgerCheck(user_id, head["seq"], True)
+        if [e["seq"] for e in entries] != list(range(1, head["seq"] + 1)):
+            check.problems.append("sequence has gaps")
+        replayed = non_zero(fold({}, entries))
+        live = non_zero(live)
+        for key in sorted(replayed.keys() | live.keys(), key=str):
+            ledger_value, live_value = replayed.get(key, ZERO), live.get(key, ZERO)
+            if ledger_value != live_value:
+                check.mismatches[f"{key[0]}@{key[1]}"] = (str(ledger_value), str(live_value))
+        if compacted[1] != replayed:
+            check.problems.append("latest snapshot plus tail differs from the full replay")
+        check.ok = not check.mismatches and not check.problems
+        return check
+
+    async def verify(self, user_ids: Optional[Iterable[int]] = None) -> List[LedgerCheck]:
+        """`verify_user` for `user_ids` (default: every user with a ledger or a balance), in parallel."""
+        if user_ids is None:
+            user_ids = set(await LedgerHead.get_motor_collection().distinct("_id"))
+            user_ids |= set(await InternalBalance.get_motor_collection().distinct("user_id"))
+        return await self._map(self.verify_user, sorted(user_ids))
+
+    async def _map(self, fn, user_ids: List[int]) -> List[Any]:
+        gate = asyncio.Semaphore(self.concurrency)
+
+        async def one(user_id: int) -> Any:
+            async with gate:
+                return await fn(user_id)
+
+        return await asyncio.gather(*(one(user_id) for user_id in user_ids))
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._compactor())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _compactor(self) -> None:
+        while True:
+            await asyncio.sleep(self.compact_interval_seconds)
+            try:
+                compacted = await self.compact_due()
+                if compacted:
+                    logger.info("Compacted the balance ledger of %d users", compacted)
+            except PyMongoError as e:
+                logger.error("Balance ledger compaction failed: %s", e)
+
+
+balance_ledger = BalanceLedger(
+    compact_every=settings.LEDGER_COMPACT_EVERY,
+    compact_interval_seconds=settings.LEDGER_COMPACT_SECONDS,
+    concurrency=settings.LEDGER_VERIFY_CONCURRENCY,
+)
@@ -0,0 +1,160 @@
+# services/case_cache.py
+import asyncio
+import logging
+
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.db.models.case_config import CaseConfig
+from app.db.models.player import CapPool
+
+
+logger = logging.getLogger(__name__)
+
+# "The $changeStream stage is only supported on replica sets"
+CHANGE_STREAM_UNSUPPORTED = 40573
+
+
+class CaseConfigCache:
+    """
+    Read-through cache of CaseConfig documents and the "main" CapPool.
+    Populated at bootstrap and kept fresh by a change stream; on a standalone
+    mongod it falls back to polling the odds versions.
+    Cached documents are shared between requests and must not be mutated.
+    """
+    def __init__(self, poll_interval_seconds: float = 5.0):
+        self.poll_interval_seconds = poll_interval_seconds
+        self._cases: Dict[str, CaseConfig] = {}
+        self._cap_pool: Optional[CapPool] = None
+        self._task: Optional[asyncio.Task] = None
+        self._mode = "idle"
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    async def get_case(self, case_id: str) -> Optional[CaseConfig]:
+        cfg = self._cases.get(case_id)
+        if cfg is not None:
+            self.hits += 1
+            return cfg
+        self.misses += 1
+        cfg = await CaseConfig.find_one(CaseConfig.case_id == case_id)
+        if cfg is not None:
+            self._cases[case_id] = cfg
+        return cfg
+
+    async def get_cap_pool(self) -> Optional[CapPool]:
+        if self._cap_pool is not None:
+            self.hits += 1
+            return self._cap_pool
+        self.misses += 1
+        self._cap_pool = await CapPool.get("main")
+        return self._cap_pool
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "cases": len(self._cases),
+            "mode": self._mode,
+        }
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    async def load(self) -> None:
+        cases = await CaseConfig.find_all().to_list()
+        self._cases = {cfg.case_id: cfg for cfg in cases}
+        self._cap_pool = await CapPool.get("main")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._mode = "idle"
+
+    def invalidate(self, case_id: Optional[str] = None) -> None:
+        if case_id is None:
+            self._cases.clear()
+            self._cap_pool = None
+        else:
+            self._cases.pop(case_id, None)
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+    async def _watch(self) -> None:
+        db = CaseConfig.get_motor_collection().database
+        case_coll = CaseConfig.get_motor_collection().name
+        pool_coll = CapPool.get_motor_collection().name
+        pipeline = [{"$match": {"ns.coll": {"$in": [case_coll, pool_coll]}}}]
+        while True:
+            try:
+                async with db.watch(pipeline, full_document="updateLookup") as stream:
+                    self._mode = "change_stream"
+                    # anything changed between load() and the stream opening
+                    await self.load()
+                    async for change in stream:
+                        self._apply_change(change, case_coll)
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAM_UNSUPPORTED:
+                    logger.info("Change streams unavailable, polling case configs every %s sec", self.poll_interval_seconds)
+                    await self._poll()
+                    return
+                logger.error("Case config change stream failed: %s", e)
+            except PyMongoError as e:
+                logger.error("Case config change stream failed: %s", e)
+            # stream died: drop everything and let reads refill it
+            self.invalidate()
+            await asyncio.sleep(self.poll_interval_seconds)
+
+    def _apply_change(self, change: Dict[str, Any], case_coll: str) -> None:
+        doc = change.get("fullDocument")
+        if change["ns"]["coll"] == case_coll:
+            if doc is None:
+                # delete, or the doc is already gone: drop by _id
+                doc_id = change["documentKey"]["_id"]
+                self._cases = {k: v for k, v in self._cases.items() if v.id != doc_id}
+                return
+            cfg = CaseConfig.model_validate(doc)
+            self._cases[cfg.case_id] = cfg
+        elif change["documentKey"]["_id"] == "main":
+            self._cap_pool = CapPool.model_validate(doc) if doc is not None else None
+
+    async def _poll(self) -> None:
+        self._mode = "polling"
+        seen: Dict[str, Tuple] = {}
+        collection = CaseConfig.get_motor_collection()
+        while True:
+            try:
+                cursor = collection.find({}, {"case_id": 1, "updated_at": 1, "odds_versions": 1})
+                current: Dict[str, Tuple] = {}
+                async for raw in cursor:
+                    versions = tuple((v.get("version"), v.get("sha256")) for v in raw.get("odds_versions", []))
+                    current[raw["case_id"]] = (raw.get("updated_at"), versions)
+                for case_id, fingerprint in current.items():
+                    if seen.get(case_id) != fingerprint:
+                        self._cases.pop(case_id, None)
+                for case_id in seen.keys() - current.keys():
+                    self._cases.pop(case_id, None)
+                seen = current
+                self._cap_pool = await CapPool.get("main")
+            except PyMongoError as e:
+                logger.error("Case config polling failed: %s", e)
+            await asyncio.sleep(self.poll_interval_seconds)
+
+
+case_cache = CaseConfigCache()
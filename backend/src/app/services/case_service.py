@@ -12,6 +12,7 @@ from app.db.models.user import User
 from app.services.wallet_service import  WalletService
 from app.db.models.case_log import CaseLog
 from app.services.odds_service import export_odds
+from app.services.case_cache import case_cache
 from app.core.config.settings import get_settings
 from app.core.config.start_cases_config import START_CASES
 from app.db.models.case_config import CaseConfig, TierConfig, RewardItem, OddsVersion
@@ -28,38 +29,44 @@ class CaseService:
         
         return table_data
 
+    @staticmethod
+    def build_case(case: Mapping[str, Any], odds_version: OddsVersion) -> CaseConfig:
+        """CaseConfig from a START_CASES entry."""
+        return CaseConfig(
+            case_id=case["case_id"],
+            price_usd=case["price_usd"],
+            tiers=[
+                TierConfig(
+                    name=tier["name"],
+                    chance=tier["chance"],
+                    rewards=[
+                        RewardItem(
+                            coin_id=reward["coin_amount"]["coin"]["id"],
+                            amount=reward["coin_amount"]["amount"],
+                            network=reward["coin_amount"]["network"],
+                            sub_chance=reward["sub_chance"]
+                        )
+                        for reward in tier["rewards"]
+                    ]
+                )
+                for tier in case["tiers"]
+                ],
+            pity_after=case["pity_after"],
+            pity_bonus_tier=case["pity_bonus_tier"],
+            global_pool_usd=Decimal(case["global_pool_usd"]),
+            pool_reset_interval=case["pool_reset_interval"],
+            odds_versions=[odds_version]
+        )
+
     @staticmethod
     async def init_cases():
         now = datetime.now(timezone.utc).isoformat()
         odds_version = OddsVersion(version=now)
         for case in START_CASES:
-            new_case = CaseConfig(
-                case_id=case["case_id"],
-                price_usd=case["price_usd"],
-                tiers=[
-                    TierConfig(
-                        name=tier["name"],
-                        chance=tier["chance"],
-                        rewards=[
-                            RewardItem(
-                                coin_id=reward["coin_amount"]["coin"]["id"],
-                                amount=reward["coin_amount"]["amount"],
-                                network=reward["coin_amount"]["network"],
-                                sub_chance=reward["sub_chance"]
-                            )
-                            for reward in tier["rewards"]
-                        ]
-                    )
-                    for tier in case["tiers"]
-                    ],
-                pity_after=case["pity_after"],
-                pity_bonus_tier=case["pity_bonus_tier"],
-                global_pool_usd=Decimal(case["global_pool_usd"]),
-                pool_reset_interval=case["pool_reset_interval"],
-                odds_versions=[odds_version]
-            )
+            new_case = CaseService.build_case(case, odds_version)
             await new_case.insert()
-            await export_odds(new_case.case_id, to_bucket=False)
+            # rates are not fetched yet at bootstrap, and START_CASES is the reviewed baseline
+            await export_odds(new_case.case_id, to_bucket=False, enforce_rtp=False)
             
     @staticmethod
     async def check_cases_init():
@@ -71,7 +78,7 @@ class CaseService:
     
     @staticmethod
     async def get_case_by_id(case_id: str):
-        current_case = await CaseConfig.find_one(CaseConfig.case_id==case_id)
+        current_case = await case_cache.get_case(case_id)
         if not current_case:
             raise HTTPException(status.HTTP_400_BAD_REQUEST, "case id mismatched")
         nonce = random.randint(1, 100)
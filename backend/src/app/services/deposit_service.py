@@ -14,10 +14,24 @@ from app.db.models.deposit_log import DepositLog
 from app.schemas.deposit import GenerateAddressResponse
 from app.services.internal_balance_service import InternalBalanceService
 from app.services.external_wallet_service import ExternalWalletService
+from app.services.live_events import publish
 from app.services.rate_cache import rate_cache
 from app.models.coin import Coin, CoinAmount
 from app.utils import coin_keys
 
+async def publish_status(user_id: int, deposit: DepositLog) -> None:
+    """Tell the user's live connections about the deposit's current status."""
+    await publish(user_id, [{
+        "type": "deposit",
+        "id": str(deposit.id),
+        "tx_hash": deposit.tx_hash,
+        "coin": deposit.coin,
+        "network": deposit.network,
+        "amount": str(deposit.amount),
+        "status": deposit.status,
+    }])
+
+
 class DepositService:
     """
     Service for handling on-chain deposits and adjusting internal user balances.
@@ -88,8 +102,11 @@ class DepositService:
         await InternalBalanceService.adjust_balance(
             wallet.user_id,
             coin,
-            amount
+            network,
+            amount,
+            reason="deposit"
         )
+        await publish_status(wallet.user_id, deposit)
 
         return deposit
 
@@ -148,7 +165,7 @@ class DepositService:
         
         # calculate minimum amount
         token_id = coin_keys.to_id(token)
-        token_rate = await rate_cache.get_rate(coin_id=token_id)
+        token_rate = rate_cache.get_rate(coin_id=token_id)
         minimum_amount = CoinAmount.amount_from_usd(
             coin_id=token_id,
             network=network,
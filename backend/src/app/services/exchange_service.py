@@ -7,7 +7,7 @@ from fastapi import HTTPException, status
 from app.core.config.coin_registry import CoinRegistry
 from app.core.config.asset_registry import AssetRegistry
 from app.core.config.settings import get_settings
-from app.db.transaction import TransactionManager
+from app.db.init_db import DataBase, Transaction
 from app.services.rate_cache import rate_cache
 from app.services.internal_balance_service import InternalBalanceService
 from app.models.coin import Coin, CoinAmount
@@ -121,9 +121,10 @@ class ExchangeService:
         from_id = from_meta.coingecko_id.lower()
         to_id = to_meta.coingecko_id.lower()
 
-        # 3. Запитуємо курси в кеша
-        rate_from: Decimal = await rate_cache.get_rate(from_id)
-        rate_to: Decimal = await rate_cache.get_rate(to_id)
+        # 3. Запитуємо обидва курси з одного знімка кешу
+        rates = rate_cache.get_rates((from_id, to_id))
+        rate_from: Decimal = rates[from_id]
+        rate_to: Decimal = rates[to_id]
 
         # 4. Якщо будь-який курс ≡ 0 → 503 Service Unavailable
         if rate_from == 0 or rate_to == 0:
@@ -259,15 +260,14 @@ class ExchangeService:
 
         # 4) Perform balance updates (atomicity depends on DB capabilities)
         # Deduct from “from_token”
-        tx = TransactionManager()
-        async with tx() as session:
-            
+        async def swap(tx: Transaction) -> None:
             await InternalBalanceService.adjust_balance(
                 user_id=user_id,
                 coin=from_token, 
                 network=from_network, 
                 delta=-from_amount,
-                session=session
+                tx=tx,
+                reason="swap"
             )
             # Credit “to_token”
             await InternalBalanceService.adjust_balance(
@@ -275,7 +275,9 @@ class ExchangeService:
                 coin=to_token,
                 network=to_network,
                 delta=to_amount,
-                session=session
+                tx=tx,
+                reason="swap"
             )
 
+        await DataBase.run_transaction(swap)
         return from_amount, to_amount
\ No newline at end of file
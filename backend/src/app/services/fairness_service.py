@@ -1,7 +1,10 @@
 
 import hashlib
 
+from typing import List, Optional
+
 from beanie import PydanticObjectId
+from motor.motor_asyncio import AsyncIOMotorClientSession
 from pymongo import ReturnDocument
 from fastapi import HTTPException
 
@@ -11,7 +14,12 @@ from app.db.models.player import ServerSeed
 class FairnessService:
     
     @classmethod
-    async def reveal_and_verify(cls, commit_id: PydanticObjectId, user_id: int):
+    async def reveal_and_verify(
+        cls,
+        commit_id: PydanticObjectId,
+        user_id: int,
+        session: Optional[AsyncIOMotorClientSession] = None
+    ):
         """
         1. Atomically find and mark seed as used
         2. Verify that it belongs to this user
@@ -25,6 +33,7 @@ class FairnessService:
             },
             {"$set": {"used": True}},
             return_document=ReturnDocument.AFTER,
+            session=session,
         )
         
         if not raw:
@@ -42,4 +51,47 @@ class FairnessService:
                 detail="server_seed hash mismatch",
             )
 
-        return seed_doc
\ No newline at end of file
+        return seed_doc
+
+    @classmethod
+    async def reveal_many(
+        cls,
+        commit_ids: List[PydanticObjectId],
+        user_id: int,
+        session: Optional[AsyncIOMotorClientSession] = None
+    ) -> List[ServerSeed]:
+        """
+        Batch version of `reveal_and_verify`: marks all seeds as used with one
+        update and returns them in the order of `commit_ids`.
+        Meant to run inside a transaction, so a partial match leaves nothing consumed.
+        """
+        collection = ServerSeed.get_motor_collection()
+        query = {
+            "_id": {"$in": commit_ids},
+            "owner_id": str(user_id),
+            "used": False,
+        }
+        raws = await collection.find(query, session=session).to_list(None)
+        if len(raws) != len(commit_ids):
+            raise HTTPException(
+                status_code=400,
+                detail="invalid or already used commit_id",
+            )
+        result = await collection.update_many(query, {"$set": {"used": True}}, session=session)
+        if result.modified_count != len(commit_ids):
+            raise HTTPException(
+                status_code=400,
+                detail="invalid or already used commit_id",
+            )
+
+        by_id = {}
+        for raw in raws:
+            seed_doc = ServerSeed.model_validate({**raw, "used": True})
+            expected_hash = hashlib.sha256(bytes.fromhex(seed_doc.seed)).hexdigest()
+            if expected_hash != seed_doc.hash:
+                raise HTTPException(
+                    status_code=500,
+                    detail="server_seed hash mismatch",
+                )
+            by_id[seed_doc.id] = seed_doc
+        return [by_id[commit_id] for commit_id in commit_ids]
@@ -0,0 +1,282 @@
+# services/fairness_verifier.py
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+from app.db.models.player import HashChain, ServerSeed, SpinLog
+from app.models.case_config import TierConfig
+from app.services.case_cache import case_cache
+from app.services.spin_sampler import STEP, SpinSampler
+from app.core.config.settings import Settings
+from app.core.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+settings: Settings = get_settings()
+
+SPIN_PROJECTION = {
+    "user_id": 1, "case_id": 1, "server_seed_id": 1, "server_seed_hash": 1, "server_seed_seed": 1,
+    "client_seed": 1, "nonce": 1, "fairness_mode": 1, "chain_index": 1, "hmac_value": 1, "raw_roll": 1,
+    "odds_version": 1, "case_tier": 1, "prize_id": 1, "payout": 1, "pity_before": 1,
+}
+SEED_PROJECTION = {"seed": 1, "hash": 1, "owner_id": 1, "used": 1}
+CHAIN_PROJECTION = {"terminal_hash": 1, "owner_id": 1, "cursor": 1}
+
+ChainKey = Tuple[str, int]  # (chain id, link index)
+
+
+@dataclass(slots=True)
+class OddsTable:
+    tiers: List[TierConfig]
+    sampler: SpinSampler
+
+
+def build_query(
+    user_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    SpinLog filter for a user and/or a time window. Log ids are allocated at
+    spin time, so the window is also expressed as an `_id` range the cursor
+    can walk by index.
+    """
+    query: Dict[str, Any] = {}
+    if user_id is not None:
+        query["user_id"] = user_id
+    id_range: Dict[str, Any] = {}
+    created: Dict[str, Any] = {}
+    if since is not None:
+        id_range["$gte"] = ObjectId.from_datetime(since)
+        created["$gte"] = since
+    if until is not None:
+        id_range["$lt"] = ObjectId.from_datetime(until)
+        created["$lt"] = until
+    if id_range:
+        query["_id"] = id_range
+        query["created_at"] = created
+    return query
+
+
+def chain_key(doc: Dict[str, Any]) -> ChainKey:
+    return doc["server_seed_id"], doc["chain_index"]
+
+
+def verify_spin(
+    doc: Dict[str, Any],
+    seed: Optional[Dict[str, Any]],
+    table: Optional[OddsTable],
+    chain: Optional[Dict[str, Any]] = None,
+    previous: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Recompute one spin from its log: seed commitment, HMAC roll, tier and reward
+    against the odds version it was played with. Returns the NDJSON record.
+
+    A chain spin is committed by its `chain`: link 0 must hash to the chain's
+    `terminal_hash`, every later link to `previous`, the link logged by the
+    spin at `chain_index - 1`.
+    """
+    failed: List[str] = []
+    server_seed = doc["server_seed_seed"]
+    if hashlib.sha256(bytes.fromhex(server_seed)).hexdigest() != doc["server_seed_hash"]:
+        failed.append("seed_hash")
+    if doc.get("fairness_mode", "hmac") == "hmac":
+        # the committed ServerSeed must be the one logged, revealed to the same user
+        if (
+            seed is None
+            or seed["seed"] != server_seed
+            or seed["hash"] != doc["server_seed_hash"]
+            or seed["owner_id"] != str(doc["user_id"])
+            or not seed["used"]
+        ):
+            failed.append("seed_commitment")
+    else:
+        index = doc.get("chain_index")
+        expected = chain["terminal_hash"] if chain is not None and index == 0 else previous
+        if (
+            chain is None
+            or index is None
+            or index >= chain["cursor"]
+            or chain["owner_id"] != str(doc["user_id"])
+            or expected is None
+            or doc["server_seed_hash"] != expected
+        ):
+            failed.append("seed_commitment")
+
+    raw = hmac.new(bytes.fromhex(server_seed), f"{doc['client_seed']}:{doc['nonce']}".encode(), hashlib.sha256).digest()
+    if raw != doc["hmac_value"]:
+        failed.append("hmac")
+    roll_int = int.from_bytes(raw[:4], "big")
+    if Decimal.from_float(roll_int / 2**32) != doc["raw_roll"]:
+        failed.append("roll")
+
+    if table is None:
+        failed.append("odds_unavailable")
+    else:
+        try:
+            idx_t, idx_r = table.sampler.sample(roll_int, int(doc["pity_before"] / STEP))
+        except (ValueError, IndexError):
+            failed.append("tier")
+        else:
+            tier = table.tiers[idx_t]
+            reward = tier.rewards[idx_r]
+            if tier.name != doc["case_tier"]:
+                failed.append("tier")
+            elif reward.coin_id != doc["prize_id"]:
+                failed.append("reward")
+            elif Decimal(reward.amount) != doc["payout"]:
+                failed.append("payout")
+
+    return {
+        "spin_log_id": str(doc["_id"]),
+        "user_id": doc["user_id"],
+        "case_id": doc["case_id"],
+        "nonce": doc["nonce"],
+        "ok": not failed,
+        "failed": failed,
+    }
+
+
+def verify_many(
+    docs: List[Dict[str, Any]],
+    seeds: Dict[Any, Dict[str, Any]],
+    tables: Dict[Tuple[str, str], Optional[OddsTable]],
+    chains: Optional[Dict[str, Dict[str, Any]]] = None,
+    links: Optional[Dict[ChainKey, str]] = None,
+) -> List[Dict[str, Any]]:
+    """`chains` by id and `links`: the seed logged for each (chain, index) the chain spins follow."""
+    chains, links = chains or {}, links or {}
+    results = []
+    for doc in docs:
+        table = tables.get((doc["case_id"], doc["odds_version"]))
+        if doc.get("fairness_mode", "hmac") == "hmac":
+            results.append(verify_spin(doc, seeds.get(doc["server_seed_id"]), table))
+        else:
+            chain_id, index = chain_key(doc)
+            previous = links.get((chain_id, index - 1)) if index else None
+            results.append(verify_spin(doc, None, table, chains.get(chain_id), previous))
+    return results
+
+
+class FairnessVerifier:
+    """
+    Bulk re-verification of SpinLogs for auditors.
+
+    Walks SpinLog with one server-side cursor in `_id` order, `batch_size` logs
+    at a time: the ServerSeeds and HashChains of a batch are joined with one
+    `$in` query each, the chain links the batch follows but does not hold with
+    one more, and the batch is recomputed in a worker thread. Odds tables are loaded once per
+    (case, version) from the exported odds files, falling back to the live case
+    config when it is still on that version. Memory is bounded by one batch.
+    """
+    def __init__(self, odds_dir: Path, batch_size: int = 2000):
+        self.odds_dir = Path(odds_dir)
+        self.batch_size = batch_size
+        self._tables: Dict[Tuple[str, str], Optional[OddsTable]] = {}
+
+    async def stream(self, query: Dict[str, Any], failed_only: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        cursor = SpinLog.get_motor_collection().find(
+            query, projection=SPIN_PROJECTION, sort=[("_id", 1)], batch_size=self.batch_size
+        )
+        batch: List[Dict[str, Any]] = []
+        async for doc in cursor:
+            batch.append(doc)
+            if len(batch) == self.batch_size:
+                for result in await self.verify_batch(batch):
+                    if not (failed_only and result["ok"]):
+                        yield result
+                batch = []
+        if batch:
+            for result in await self.verify_batch(batch):
+                if not (failed_only and result["ok"]):
+                    yield result
+
+    async def stream_ndjson(self, query: Dict[str, Any], failed_only: bool = False) -> AsyncIterator[bytes]:
+        """
+        One JSON line per spin, then a summary line.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        total = passed = 0
+        async for result in self.stream(query):
+            total += 1
+            passed += result["ok"]
+            if not (failed_only and result["ok"]):
+                yield (json.dumps(result) + "\n").encode()
+        elapsed = loop.time() - started
+        summary = {
+            "total": total,
+            "passed": passed,
+            "failed": total - passed,
+            "spins_per_sec": round(total / elapsed) if elapsed > 0 else None,
+        }
+        yield (json.dumps({"summary": summary}) + "\n").encode()
+
+    async def verify_batch(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        seed_ids = [
+            ObjectId(doc["server_seed_id"])
+            for doc in docs
+            if doc.get("fairness_mode", "hmac") == "hmac" and ObjectId.is_valid(doc["server_seed_id"])
+        ]
+        seeds = {
+            str(seed["_id"]): seed
+            async for seed in ServerSeed.get_motor_collection().find({"_id": {"$in": seed_ids}}, projection=SEED_PROJECTION)
+        } if seed_ids else {}
+        chains, links = await self.load_chains(docs)
+        for key in {(doc["case_id"], doc["odds_version"]) for doc in docs} - self._tables.keys():
+            self._tables[key] = await self.load_table(*key)
+        return await asyncio.to_thread(verify_many, docs, seeds, self._tables, chains, links)
+
+    @staticmethod
+    async def load_chains(docs: List[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], Dict[ChainKey, str]]:
+        """The HashChains of the batch's chain spins and the links they follow."""
+        chain_docs = [
+            doc for doc in docs
+            if doc.get("fairness_mode") == "chain" and doc.get("chain_index") is not None
+            and ObjectId.is_valid(doc["server_seed_id"])
+        ]
+        if not chain_docs:
+            return {}, {}
+        chains = {
+            str(chain["_id"]): chain
+            async for chain in HashChain.get_motor_collection().find(
+                {"_id": {"$in": list({ObjectId(doc["server_seed_id"]) for doc in chain_docs})}},
+                projection=CHAIN_PROJECTION,
+            )
+        }
+        links = {chain_key(doc): doc["server_seed_seed"] for doc in chain_docs}
+        missing = {(chain_id, index - 1) for chain_id, index in links if index > 0} - links.keys()
+        if missing:
+            async for doc in SpinLog.get_motor_collection().find(
+                {"fairness_mode": "chain",
+                 "$or": [{"server_seed_id": chain_id, "chain_index": index} for chain_id, index in missing]},
+                projection={"server_seed_id": 1, "chain_index": 1, "server_seed_seed": 1},
+            ):
+                links[chain_key(doc)] = doc["server_seed_seed"]
+        return chains, links
+
+    async def load_table(self, case_id: str, odds_version: str) -> Optional[OddsTable]:
+        path = self.odds_dir / case_id / f"{odds_version}.json"
+        if path.exists():
+            odds = json.loads(path.read_text(), parse_float=Decimal)
+            tiers = [TierConfig(**tier) for tier in odds["tiers"]]
+        else:
+            cfg = await case_cache.get_case(case_id)
+            if not cfg or not cfg.odds_versions or cfg.odds_versions[-1].version != odds_version:
+                logger.warning("Odds %s/%s not found, its spins cannot be verified", case_id, odds_version)
+                return None
+            tiers = cfg.tiers
+        return OddsTable(tiers=tiers, sampler=SpinSampler(tiers, case_id, odds_version))
+
+
+fairness_verifier = FairnessVerifier(odds_dir=settings.local_odds_dir)
@@ -0,0 +1,343 @@
+# services/hash_chain.py
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from beanie import PydanticObjectId
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorClientSession
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from redis.exceptions import RedisError, WatchError
+
+from app.core import redis_client
+from app.db.models.player import HashChain, HashChainLinks
+from app.core.config.settings import Settings
+from app.core.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+settings: Settings = get_settings()
+
+LINK_BYTES = 32
+REFILL_LEASE_KEY = "hash_chains:refill"
+
+
+@dataclass(slots=True)
+class ChainLink:
+    """
+    One revealed link; quacks like `ServerSeed` for the spin log.
+    `hash` is the link it hashes to (the chain head before the spin).
+    """
+    id: PydanticObjectId
+    hash: str
+    seed: str
+    index: int
+
+
+def generate_chain(length: int, every: int) -> Tuple[str, bytes]:
+    """
+    Build a chain of `length` links from 32 random bytes, numbered in reveal
+    order: link i is revealed by the i-th spin, so sha256(link i) == link i-1
+    and sha256(link 0) is the terminal hash. Returns the terminal hash and
+    the checkpoints: links `every - 1`, `2 * every - 1`, ... and the last
+    one, concatenated. Blocking; run it in a thread.
+    """
+    checkpoints = bytearray(-(-length // every) * LINK_BYTES)
+    link = os.urandom(LINK_BYTES)
+    for i in range(length - 1, -1, -1):
+        if (i + 1) % every == 0 or i == length - 1:
+            offset = i // every * LINK_BYTES
+            checkpoints[offset:offset + LINK_BYTES] = link
+        link = hashlib.sha256(link).digest()
+    return link.hex(), bytes(checkpoints)
+
+
+def block_links(checkpoints: bytes, every: int, length: int, block: int) -> bytes:
+    """
+    Links `block * every`.. of a chain (up to `every` of them, concatenated in
+    reveal order), recomputed from the block's checkpoint.
+    """
+    first = block * every
+    last = min(first + every, length) - 1
+    link = checkpoints[block * LINK_BYTES:(block + 1) * LINK_BYTES]
+    if first > last or len(link) != LINK_BYTES:
+        raise ValueError(f"chain of {length} links has no block {block}")
+    links = [link]
+    for _ in range(last - first):
+        link = hashlib.sha256(link).digest()
+        links.append(link)
+    return b"".join(reversed(links))
+
+
+def verify_links(head: bytes, links: List[bytes]) -> bool:
+    """
+    Check that every link hashes to the one revealed before it, starting from `head`.
+    """
+    for link in links:
+        if hashlib.sha256(link).digest() != head:
+            return False
+        head = link
+    return True
+
+
+class HashChainService:
+    """
+    Per-user hash chains for the "chain" fairness mode.
+
+    A chain is stored in Mongo as one checkpoint per `checkpoint_every` links
+    (`HashChainLinks`, 32 bytes each), so every host can serve every chain.
+    A spin takes the link under the user's cursor from the checkpoint block,
+    recomputed once and kept in this worker's LRU of `cache_blocks` blocks,
+    checks it against the stored head with one sha256, and moves head and
+    cursor with one conditional update; no seed document is written or
+    consumed. A background task keeps `spares` unassigned chains generated,
+    under a Redis lease so one worker at a time refills; a commit only claims
+    one. A unique partial index allows one active chain per user.
+    """
+    def __init__(
+        self,
+        length: int = 1_000_000,
+        checkpoint_every: int = 1024,
+        spares: int = 2,
+        refill_interval_seconds: float = 30.0,
+        cache_blocks: int = 256,
+    ):
+        self.length = length
+        self.checkpoint_every = checkpoint_every
+        self.spares = spares
+        self.refill_interval_seconds = refill_interval_seconds
+        self.cache_blocks = cache_blocks
+        # long enough for a refill; released as soon as it is done
+        self.lease_seconds = max(refill_interval_seconds * 2, 60)
+        self._token = uuid.uuid4().hex
+        self._blocks: "OrderedDict[Tuple[PydanticObjectId, int], bytes]" = OrderedDict()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.generated = 0
+        self.generated_inline = 0
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    async def commit(self, user_id: int) -> HashChain:
+        """
+        The user's active chain, claiming a spare one if there is none.
+        """
+        owner_id = str(user_id)
+        chain = await HashChain.find_one({"owner_id": owner_id, "status": "active"})
+        if chain and chain.cursor < chain.length:
+            return chain
+        if chain:
+            await self._retire(chain)
+        self._wake.set()
+        try:
+            raw = await HashChain.get_motor_collection().find_one_and_update(
+                {"status": "spare"},
+                {"$set": {"owner_id": owner_id, "status": "active"}},
+                sort=[("created_at", ASCENDING)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if raw:
+                return HashChain.model_validate(raw)
+            # no spare left: generate on the request path
+            self.generated_inline += 1
+            chain = await self._generate(owner_id=owner_id, status="active")
+            try:
+                await chain.insert()
+                return chain
+            except DuplicateKeyError:
+                await HashChainLinks.get_motor_collection().delete_one({"_id": chain.id})
+                raise
+        except DuplicateKeyError:
+            # a concurrent commit of the same user won
+            return await HashChain.find_one({"owner_id": owner_id, "status": "active"})
+
+    async def advance(
+        self,
+        user_id: int,
+        chain_id: str,
+        count: int = 1,
+        session: Optional[AsyncIOMotorClientSession] = None,
+    ) -> List[ChainLink]:
+        """
+        Reveal the next `count` links of the user's chain `chain_id`.
+        A chain that cannot cover the spins is retired and the client has to
+        commit to the next one.
+        """
+        collection = HashChain.get_motor_collection()
+        for _ in range(5):
+            raw = await collection.find_one(
+                {"_id": PydanticObjectId(chain_id), "owner_id": str(user_id), "status": "active"},
+                session=session,
+            )
+            if not raw:
+                raise HTTPException(status_code=409, detail="hash_chain_not_committed")
+            chain = HashChain.model_validate(raw)
+            if chain.cursor + count > chain.length:
+                # outside the session: the spin's transaction is aborted by the error
+                await self._retire(chain)
+                raise HTTPException(status_code=409, detail="hash_chain_exhausted")
+
+            links = await self._read_links(chain, chain.cursor, count)
+            if links is None:
+                continue  # retired meanwhile; the next read says so
+            if not verify_links(bytes.fromhex(chain.head), links):
+                logger.error("Hash chain %s is corrupt at link %s", chain.id, chain.cursor)
+                raise HTTPException(status_code=500, detail="hash_chain_mismatch")
+
+            result = await collection.update_one(
+                {"_id": chain.id, "cursor": chain.cursor, "status": "active"},
+                {"$set": {"cursor": chain.cursor + count, "head": links[-1].hex()}},
+                session=session,
+            )
+            if result.modified_count == 1:
+                heads = [chain.head] + [link.hex() for link in links[:-1]]
+                return [
+                    ChainLink(id=chain.id, hash=head, seed=link.hex(), index=chain.cursor + i)
+                    for i, (head, link) in enumerate(zip(heads, links))
+                ]
+            # a concurrent spin moved the cursor first, or the chain was retired
+        raise HTTPException(status_code=409, detail="hash_chain_busy")
+
+    async def refill(self) -> int:
+        """
+        Generate spare chains up to `spares` while holding the refill lease.
+        Returns the number generated; 0 when another worker holds the lease.
+        Without Redis every worker refills for itself.
+        """
+        redis = redis_client.get_redis()
+        try:
+            if not await redis.set(REFILL_LEASE_KEY, self._token, nx=True, px=int(self.lease_seconds * 1000)):
+                return 0
+        except RedisError as e:
+            logger.warning("Hash chain refill lease unavailable: %s", e)
+            redis = None
+        try:
+            missing = self.spares - await HashChain.find({"status": "spare"}).count()
+            for _ in range(max(missing, 0)):
+                chain = await self._generate(owner_id=None, status="spare")
+                await chain.insert()
+                self.generated += 1
+            return max(missing, 0)
+        finally:
+            if redis is not None:
+                await self._release_lease(redis)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "length": self.length,
+            "checkpoint_every": self.checkpoint_every,
+            "spares": self.spares,
+            "generated": self.generated,
+            "generated_inline": self.generated_inline,
+            "cached_blocks": len(self._blocks),
+        }
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._refiller())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _refiller(self) -> None:
+        while True:
+            try:
+                await self.refill()
+            except (PyMongoError, RedisError) as e:
+                logger.error("Hash chain refill failed: %s", e)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.refill_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    async def _generate(self, owner_id: Optional[str], status: str) -> HashChain:
+        """A new chain; its checkpoints are stored before the chain can be claimed."""
+        chain_id = PydanticObjectId()
+        terminal, checkpoints = await asyncio.to_thread(generate_chain, self.length, self.checkpoint_every)
+        await HashChainLinks(id=chain_id, links=checkpoints).insert()
+        return HashChain(
+            id=chain_id,
+            owner_id=owner_id,
+            terminal_hash=terminal,
+            head=terminal,
+            length=self.length,
+            checkpoint_every=self.checkpoint_every,
+            status=status,
+        )
+
+    async def _read_links(self, chain: HashChain, start: int, count: int) -> Optional[List[bytes]]:
+        """Links `start`..`start + count - 1` of `chain`; None once its checkpoints are gone."""
+        every = chain.checkpoint_every
+        checkpoints: Optional[bytes] = None
+        data = b""
+        for block in range(start // every, (start + count - 1) // every + 1):
+            key = (chain.id, block)
+            links = self._blocks.get(key)
+            if links is None:
+                if checkpoints is None:
+                    doc = await HashChainLinks.get_motor_collection().find_one({"_id": chain.id})
+                    if doc is None:
+                        return None
+                    checkpoints = doc["links"]
+                links = self._blocks[key] = block_links(checkpoints, every, chain.length, block)
+                while len(self._blocks) > self.cache_blocks:
+                    self._blocks.popitem(last=False)
+            else:
+                self._blocks.move_to_end(key)
+            data += links
+        offset = start % every * LINK_BYTES
+        data = data[offset:offset + count * LINK_BYTES]
+        return [data[i:i + LINK_BYTES] for i in range(0, len(data), LINK_BYTES)]
+
+    async def _retire(self, chain: HashChain) -> None:
+        """
+        Every link a spin used is in its SpinLog, so the checkpoints can go.
+        An advance racing this either finds them gone or fails its cursor
+        update, and answers 409 like for any retired chain.
+        """
+        result = await HashChain.get_motor_collection().update_one(
+            {"_id": chain.id, "status": "active"},
+            {"$set": {"status": "exhausted"}},
+        )
+        if result.modified_count:
+            await HashChainLinks.get_motor_collection().delete_one({"_id": chain.id})
+        self._wake.set()
+
+    async def _release_lease(self, redis) -> None:
+        async with redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(REFILL_LEASE_KEY)
+                if await pipe.get(REFILL_LEASE_KEY) == self._token:
+                    pipe.multi()
+                    pipe.delete(REFILL_LEASE_KEY)
+                    await pipe.execute()
+            except (WatchError, RedisError):
+                pass  # expires on its own
+
+
+hash_chains = HashChainService(
+    length=settings.HASH_CHAIN_LENGTH,
+    checkpoint_every=settings.HASH_CHAIN_CHECKPOINT_EVERY,
+    spares=settings.HASH_CHAIN_SPARES,
+)
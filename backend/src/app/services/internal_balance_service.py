@@ -1,20 +1,72 @@
+from dataclasses import dataclass
 from decimal import Decimal, ROUND_DOWN
 from datetime import datetime, timezone
-from typing import List, Tuple, Optional
-from motor.motor_asyncio import AsyncIOMotorClientSession
+from typing import Any, Awaitable, Callable, Dict, List, Tuple, Optional, TypeVar
+from pymongo import UpdateOne
 
 from beanie import PydanticObjectId
 
 from app.db.models.internal_balance import InternalBalance
-from app.db.init_db import DataBase
+from app.db.init_db import DataBase, Transaction
 from app.core.config.settings import get_settings
 from app.core.config.settings import Settings
 from app.services.rate_cache import rate_cache
+from app.services.portfolio_cache import portfolio_cache
+from app.services.balance_ledger import balance_ledger
 from app.services.case_service import CaseService
-from app.core.config.coin_registry import CoinRegistry
-from app.models.coin import CoinAmount
+from app.models.coin import Coin, TARGET_PLACES
 from app.exceptions.balance import BalanceTooLow
 from app.utils import coin_keys
+from app.utils.money import Money
+
+T = TypeVar("T")
+
+
+@dataclass(slots=True)
+class UsdDebit:
+    balance_id: Any
+    coin: str
+    network: Optional[str]
+    amount: Decimal
+    usd: Decimal
+
+
+def allocate_usd_debit(
+    balances: List[Dict[str, Any]],
+    rates: Dict[str, Decimal],
+    amount_usd: Decimal,
+) -> List[UsdDebit]:
+    """
+    Cover `amount_usd` from `balances` (raw `coin`/`network`/`balance` docs),
+    largest USD value first: whole balances while they fit, then part of the
+    next one, rounded down to the coin's precision.
+    """
+    needed = Money.from_decimal(amount_usd, TARGET_PLACES)
+    priced = []
+    for b in balances:
+        rate = Money.from_decimal(rates.get(b["coin"], Decimal("0")))
+        value = Money.from_decimal(b["balance"]).mul(rate, TARGET_PLACES)
+        if value.units > 0:
+            priced.append((value, rate, b))
+    if sum((value for value, _, _ in priced), Money(0, TARGET_PLACES)) < needed:
+        raise BalanceTooLow(f"Not enough balance to cover {amount_usd} USD")
+    priced.sort(key=lambda entry: entry[0].units, reverse=True)
+
+    debits: List[UsdDebit] = []
+    remaining = needed
+    for value, rate, b in priced:
+        if remaining.units <= 0:
+            break
+        if value <= remaining:
+            amount, usd = Decimal(b["balance"]), value
+        else:
+            coin = Coin.from_id(b["coin"])
+            precision = coin.get_precision(b["network"] or coin.native_network or "NATIVE")
+            amount, usd = remaining.div(rate, precision, ROUND_DOWN).to_decimal(), remaining
+        debits.append(UsdDebit(b["_id"], b["coin"], b["network"], amount, usd.to_decimal()))
+        remaining = remaining - usd
+    return debits
+
 
 class InternalBalanceService:
     """
@@ -40,6 +92,16 @@ class InternalBalanceService:
     async def list_wallets(user_id: int) -> list[InternalBalance]:
         return await InternalBalance.find(InternalBalance.user_id == user_id).to_list()
 
+    @staticmethod
+    async def _journaled(
+        tx: Optional[Transaction],
+        write: Callable[[Transaction], Awaitable[T]],
+    ) -> T:
+        """Run `write` in the caller's transaction or a new one, so balances and ledger commit together."""
+        if tx is not None:
+            return await write(tx)
+        return await DataBase.run_transaction(write)
+
     @classmethod
     async def adjust_balance(
         cls,
@@ -47,13 +109,15 @@ class InternalBalanceService:
         coin: str,
         network: Optional[str],
         delta: Decimal,
-        session: Optional[AsyncIOMotorClientSession] = None
+        tx: Optional[Transaction] = None,
+        reason: str = "adjust"
     ) -> None:
         """
         Increment (delta > 0) or decrement (delta < 0) the internal balance.
         If `delta < 0`, only deduct if the existing balance >= |delta|.
         If `delta > 0`, just add (upsert creates a doc if needed).
-        In both cases, if `session` is given, run inside that transaction.
+        The change is journaled under `reason` in the same transaction: the
+        caller's `tx`, or a new one.
         """
         coin = coin_keys.to_id(coin)
         base_filter = {
@@ -62,114 +126,77 @@ class InternalBalanceService:
             "network": network
         }
 
-        if delta < 0:
-            # For a debit, require existing balance >= |delta|. No upsert.
-            debit_filter = {
-                **base_filter,
-                "$expr": {"$gte": ["$balance", abs(delta)]}
-            }
-            result = await InternalBalance.get_motor_collection().update_one(
-                debit_filter,
-                {"$inc": {"balance": delta}},
-                upsert=False,
-                session=session
-            )
-            if result.matched_count == 0:
-                raise BalanceTooLow(f"Not enough {coin} balance to deduct {abs(delta)}")
-        else:
-            # For a credit (delta > 0), upsert if no document exists.
-            await InternalBalance.get_motor_collection().update_one(
-                base_filter,
-                {"$inc": {"balance": delta}},
-                upsert=True,
-                session=session
-            )
+        async def write(tx: Transaction) -> None:
+            if delta < 0:
+                # For a debit, require existing balance >= |delta|. No upsert.
+                debit_filter = {
+                    **base_filter,
+                    "$expr": {"$gte": ["$balance", abs(delta)]}
+                }
+                result = await InternalBalance.get_motor_collection().update_one(
+                    debit_filter,
+                    {"$inc": {"balance": delta}},
+                    upsert=False,
+                    session=tx.session
+                )
+                if result.matched_count == 0:
+                    raise BalanceTooLow(f"Not enough {coin} balance to deduct {abs(delta)}")
+            else:
+                # For a credit (delta > 0), upsert if no document exists.
+                await InternalBalance.get_motor_collection().update_one(
+                    base_filter,
+                    {"$inc": {"balance": delta}},
+                    upsert=True,
+                    session=tx.session
+                )
+            await balance_ledger.append(user_id, reason, [(coin, network, delta)], tx)
+            await portfolio_cache.bump(user_id, tx)
+
+        await cls._journaled(tx, write)
     
     @staticmethod
-    async def deduct_usd_amount(user_id: str, amount_usd: Decimal) -> None:
+    async def deduct_usd_amount(user_id: int, amount_usd: Decimal, reason: str = "withdrawal") -> List[UsdDebit]:
         """
-        Deducts the specified USD amount from the user's internal balances across all coins.
-        Withdraws from balances starting with the highest USD equivalent until amount_usd is covered.
+        Deduct `amount_usd` from the user's balances, highest USD value first.
+        One projected read, an allocation priced from one rate snapshot and one
+        bulk write of conditional debits, all in a transaction: if any balance
+        dropped below its debit since the read, nothing is deducted and
+        BalanceTooLow is raised. Returns the debits.
         """
         collection = InternalBalance.get_motor_collection()
-        client = collection.database.client
-        async with await client.start_session() as session:
-            async with session.start_transaction():
-                
-                # Load all balances
-                balances: List[InternalBalance] = await collection.find(
-                    {"user_id" == user_id},
-                    session=session).to_list(None)
-                # Compute USD equivalents
-                usd_entries: List[Tuple[InternalBalance, Decimal]] = []
-                total_usd = Decimal('0')
-                for b in balances:
-                    # Get rate
-                    rate = await rate_cache.get_rate(b.coin)
-                    # get CoinAmount instance
-                    coin_amount = CoinAmount.from_str(
-                        coin_id=b.coin,
-                        network=b.network,
-                        amount_str=str(b.balance)
-                    )
-                    # Convert entire balance to USD
-                    bal_usd = coin_amount.to_usd(rate)
-                    if bal_usd > 0:
-                        usd_entries.append((b, bal_usd))
-                        total_usd += bal_usd
-                if total_usd < amount_usd:
-                    raise BalanceTooLow()
-                # Sort descending by USD value
-                usd_entries.sort(key=lambda x: x[1], reverse=True)
-
-                remaining = amount_usd
-                # Deduct from highest USD equivalent balances
-                for b, bal_usd in usd_entries:
-                    if remaining <= 0:
-                        break
-                    rate = await rate_cache.get_rate(b.coin)
-                    if bal_usd <= remaining:
-                        # Deduct entire coin balance
-                        deduct_usd = bal_usd
-                        deduct_coin = b.balance
-                        b.balance = Decimal('0')
-                    else:
-                        # Partial deduction
-                        deduct_usd = remaining
-                        # Convert USD back to coin amount
-                        deduct_coin = CoinAmount.amount_from_usd(
-                            coin_id=b.coin,
-                            network=b.network,
-                            value_in_usd=remaining,
-                            rate=rate
-                            )
-                        b.balance -= deduct_coin
-                    remaining -= deduct_usd
-                    # Save updated balance
-                    await collection.update_one(
-                        {"_id": b.id},
-                        {"$set": {"balance":b.balance, "updated_at": datetime.now(timezone.utc)}},
-                        session=session
+        rates = rate_cache.table
+
+        async def debit(tx: Transaction) -> List[UsdDebit]:
+            balances = await collection.find(
+                {"user_id": user_id, "balance": {"$gt": 0}},
+                {"coin": 1, "network": 1, "balance": 1},
+                session=tx.session
+            ).to_list(None)
+            debits = allocate_usd_debit(balances, rates.get_many({b["coin"] for b in balances}), amount_usd)
+            now = datetime.now(timezone.utc)
+            result = await collection.bulk_write(
+                [
+                    UpdateOne(
+                        {"_id": d.balance_id, "balance": {"$gte": d.amount}},
+                        {"$inc": {"balance": -d.amount}, "$set": {"updated_at": now}}
                     )
+                    for d in debits
+                ],
+                ordered=True,
+                session=tx.session
+            )
+            if result.modified_count != len(debits):
+                # aborts the transaction, so the debits that did apply roll back
+                raise BalanceTooLow("Balance changed during the deduction, try again")
+            await balance_ledger.append(user_id, reason, [(d.coin, d.network, -d.amount) for d in debits], tx)
+            await portfolio_cache.bump(user_id, tx)
+            return debits
 
-                # Ensure no rounding issues remain
-                if remaining > Decimal('0'):
-                    raise RuntimeError('Помилка при списанні: залишок не обнулено')
+        return await DataBase.run_transaction(debit)
     
     @staticmethod
     async def get_overall_balance_by_usd(user_id: int) -> str:
-        user_wallets = await InternalBalanceService.list_wallets(user_id=user_id)
-        total = Decimal("0")
-        
-        for curr_wallet in user_wallets:
-            coin = (CoinRegistry.get(coin_keys.to_symbol(curr_wallet.coin)))
-            if not coin:
-                continue
-            
-            rate = await rate_cache.get_rate(coin.coingecko_id)
-            amount_in_usd = curr_wallet.balance * rate
-            total += amount_in_usd
-        
+        total = await portfolio_cache.usd_total(user_id)
         return str(total.quantize(Decimal("1.00"), rounding=ROUND_DOWN))
     
 
@@ -190,15 +217,71 @@ class InternalBalanceService:
     async def try_charge_user_for_case(user_id: int, case_id: str) -> bool:
         case = await CaseService.get_case_by_id(case_id)
         case_price = case["price_usd"]
-        user_wallets = await InternalBalanceService.list_wallets(user_id)
-        for wallet in user_wallets:
-            if wallet.coin in InternalBalanceService._settings.GLOBAL_USD_WALLET_ALIAS \
-            and wallet.balance >= case_price:
-                
-                await InternalBalanceService.adjust_balance(
-                    user_id=user_id,
-                    coin=wallet.coin,
-                    network=wallet.network,
-                    delta=-case_price)
-                return True
-        return False
\ No newline at end of file
+        return await InternalBalanceService.charge_usd(user_id, case_price)
+
+    @staticmethod
+    async def charge_usd(
+        user_id: int,
+        amount: Decimal,
+        tx: Optional[Transaction] = None,
+        reason: str = "case_open"
+    ) -> bool:
+        """
+        Debit `amount` from the first USD-alias wallet that can cover it,
+        with one conditional update. Returns False if none can.
+        """
+        async def write(tx: Transaction) -> bool:
+            wallet = await InternalBalance.get_motor_collection().find_one_and_update(
+                {
+                    "user_id": user_id,
+                    "coin": {"$in": InternalBalanceService._settings.GLOBAL_USD_WALLET_ALIAS},
+                    "balance": {"$gte": amount},
+                },
+                {"$inc": {"balance": -amount}},
+                projection={"_id": 0, "coin": 1, "network": 1},
+                session=tx.session
+            )
+            if wallet is None:
+                return False
+            await balance_ledger.append(user_id, reason, [(wallet["coin"], wallet.get("network"), -amount)], tx)
+            await portfolio_cache.bump(user_id, tx)
+            return True
+
+        return await InternalBalanceService._journaled(tx, write)
+
+    @staticmethod
+    async def credit_many(
+        user_id: int,
+        credits: List[Tuple[str, Optional[str], Decimal]],
+        tx: Optional[Transaction] = None,
+        reason: str = "case_reward"
+    ) -> None:
+        """
+        Credit several (coin, network, amount) entries with a single bulk write.
+        Amounts for the same wallet are summed first.
+        """
+        totals: dict[Tuple[str, Optional[str]], Decimal] = {}
+        for coin, network, amount in credits:
+            key = (coin_keys.to_id(coin), network)
+            totals[key] = totals.get(key, Decimal("0")) + amount
+        if not totals:
+            return
+
+        async def write(tx: Transaction) -> None:
+            await InternalBalance.get_motor_collection().bulk_write(
+                [
+                    UpdateOne(
+                        {"user_id": user_id, "coin": coin, "network": network},
+                        {"$inc": {"balance": amount}},
+                        upsert=True
+                    )
+                    for (coin, network), amount in totals.items()
+                ],
+                session=tx.session
+            )
+            await balance_ledger.append(
+                user_id, reason, [(coin, network, amount) for (coin, network), amount in totals.items()], tx
+            )
+            await portfolio_cache.bump(user_id, tx)
+
+        await InternalBalanceService._journaled(tx, write)
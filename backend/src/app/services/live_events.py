@@ -0,0 +1,185 @@
+# services/live_events.py
+import asyncio
+import json
+import logging
+
+from typing import Any, Dict, List, Optional, Set
+
+from redis.exceptions import RedisError
+
+from app.core import redis_client
+from app.core.config.settings import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+settings: Settings = get_settings()
+
+USER_CHANNEL = "live:user:{user_id}"
+BROADCAST_CHANNEL = "live:all"
+RESYNC = json.dumps({"type": "resync"})
+
+
+async def publish(user_id: int, events: List[Dict[str, Any]]) -> None:
+    """
+    Push `events` to every live connection of `user_id`, in whichever process
+    holds them. Best effort: a lost event is recovered by the client's resync.
+    """
+    if not events:
+        return
+    channel = USER_CHANNEL.format(user_id=user_id)
+    try:
+        async with redis_client.get_redis().pipeline(transaction=False) as pipe:
+            for event in events:
+                pipe.publish(channel, json.dumps(event, default=str))
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning("Live events for user %s not published: %s", user_id, e)
+
+
+class HubFull(Exception):
+    pass
+
+
+class LiveConnection:
+    """
+    One client's outbox. The hub never waits on a client: when the queue is
+    full the backlog is dropped for a single `resync`, and the client refetches.
+    """
+    __slots__ = ("user_id", "queue", "resyncs")
+
+    def __init__(self, user_id: int, queue_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.resyncs = 0
+
+    def offer(self, message: str) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            self.resyncs += 1
+
+
+class LiveHub:
+    """
+    Fans Redis pub/sub out to this worker's live connections.
+
+    Write paths publish to `live:user:<id>` after their transaction commits.
+    The hub keeps one pub/sub connection per worker and subscribes to a
+    user's channel while that user has a connection here, so a worker only
+    receives the events it can deliver. Connections are capped at
+    `max_connections`, and each has its own bounded queue (see
+    `LiveConnection`).
+    """
+    def __init__(self, max_connections: int = 10_000, queue_size: int = 64, reconnect_seconds: float = 1.0):
+        self.max_connections = max_connections
+        self.queue_size = queue_size
+        self.reconnect_seconds = reconnect_seconds
+        self._by_user: Dict[int, Set[LiveConnection]] = {}
+        self.connections = 0
+        self.delivered = 0
+        self.rejected = 0
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Connections
+    # ------------------------------------------------------------------
+    async def connect(self, user_id: int) -> LiveConnection:
+        if self.connections >= self.max_connections:
+            self.rejected += 1
+            raise HubFull(f"{self.connections} live connections")
+        conn = LiveConnection(user_id, self.queue_size)
+        conns = self._by_user.setdefault(user_id, set())
+        conns.add(conn)
+        self.connections += 1
+        if len(conns) == 1:
+            await self._subscribe(USER_CHANNEL.format(user_id=user_id))
+        return conn
+
+    async def disconnect(self, conn: LiveConnection) -> None:
+        conns = self._by_user.get(conn.user_id)
+        if not conns or conn not in conns:
+            return
+        conns.discard(conn)
+        self.connections -= 1
+        if not conns:
+            del self._by_user[conn.user_id]
+            await self._unsubscribe(USER_CHANNEL.format(user_id=conn.user_id))
+
+    def dispatch(self, channel: str, message: str) -> None:
+        if channel == BROADCAST_CHANNEL:
+            targets = [conn for conns in self._by_user.values() for conn in conns]
+        else:
+            targets = self._by_user.get(int(channel.rsplit(":", 1)[1]), ())
+        for conn in targets:
+            conn.offer(message)
+            self.delivered += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": self.connections,
+            "users": len(self._by_user),
+            "max_connections": self.max_connections,
+            "delivered": self.delivered,
+            "rejected": self.rejected,
+        }
+
+    # ------------------------------------------------------------------
+    # Redis
+    # ------------------------------------------------------------------
+    async def _subscribe(self, channel: str) -> None:
+        if self._pubsub is None:
+            return  # the reader subscribes every user it finds on (re)connect
+        try:
+            await self._pubsub.subscribe(channel)
+        except RedisError as e:
+            logger.warning("Live channel %s not subscribed: %s", channel, e)
+
+    async def _unsubscribe(self, channel: str) -> None:
+        if self._pubsub is None:
+            return
+        try:
+            await self._pubsub.unsubscribe(channel)
+        except RedisError as e:
+            logger.warning("Live channel %s not unsubscribed: %s", channel, e)
+
+    async def _reader(self) -> None:
+        while True:
+            pubsub = redis_client.get_redis().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(BROADCAST_CHANNEL, *(USER_CHANNEL.format(user_id=u) for u in self._by_user))
+                self._pubsub = pubsub
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is not None and message["type"] == "message":
+                        self.dispatch(message["channel"], message["data"])
+            except RedisError as e:
+                logger.warning("Live event stream lost, reconnecting: %s", e)
+            finally:
+                self._pubsub = None
+                await pubsub.aclose()
+            await asyncio.sleep(self.reconnect_seconds)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._reader())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+live_hub = LiveHub(
+    max_connections=settings.LIVE_MAX_CONNECTIONS,
+    queue_size=settings.LIVE_QUEUE_SIZE,
+)
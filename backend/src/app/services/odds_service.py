@@ -3,18 +3,29 @@ import json
 import os
 import hashlib
 from datetime import datetime
+from decimal import Decimal
 from pathlib import Path
+from typing import Mapping, Optional
 from app.db.models.case_config import CaseConfig
+from app.services.rate_cache import rate_cache
+from app.services.rtp_calculator import compute_case_rtp, check_rtp_bounds
 from app.core.config.settings import Settings
 from app.core.config.settings import get_settings
 import aioboto3
 
 settings: Settings = get_settings()
 
-async def export_odds(case_id: str, to_bucket: bool = True) -> Path:
+async def export_odds(
+    case_id: str,
+    to_bucket: bool = True,
+    rates: Optional[Mapping[str, Decimal]] = None,
+    enforce_rtp: bool = True,
+) -> Path:
     """
     Generate JSON with odds.
     If to_bucket=True, upload to S3; otherwise, save locally.
+    With enforce_rtp the table is refused unless its exact RTP at `rates`
+    (the live rate cache by default) is within ODDS_RTP_MIN..ODDS_RTP_MAX.
     Returns the URL or file path.
     """
     # Fetch case configuration from database
@@ -22,6 +33,13 @@ async def export_odds(case_id: str, to_bucket: bool = True) -> Path:
     if not cfg:
         raise ValueError(f"CaseConfig {case_id} not found")
 
+    if enforce_rtp:
+        if rates is None:
+            rates = {k: Decimal(v) for k, v in rate_cache.get_all_rates().items()}
+        reason = check_rtp_bounds(compute_case_rtp(cfg, rates), settings.ODDS_RTP_MIN, settings.ODDS_RTP_MAX)
+        if reason:
+            raise ValueError(f"Odds of {case_id} rejected: {reason}")
+
     # Build payload structure
     payload = {
         "case_id": cfg.case_id,
@@ -0,0 +1,114 @@
+# services/portfolio_cache.py
+import logging
+
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+
+from redis.exceptions import RedisError
+
+from app.core import redis_client
+from app.core.config.settings import Settings, get_settings
+from app.db.init_db import Transaction
+from app.db.models.internal_balance import InternalBalance
+from app.services.rate_cache import rate_cache
+
+logger = logging.getLogger(__name__)
+settings: Settings = get_settings()
+
+BALANCE_VERSION_KEY = "balance:version:{user_id}"
+PORTFOLIO_KEY = "portfolio:usd:{user_id}"
+
+
+class PortfolioCache:
+    """
+    USD value of each user's internal balances, cached under the pair
+    (rate snapshot version, balance version). Every balance write bumps the
+    user's `balance:version:<id>` in Redis after it commits, so an entry goes
+    out of date as soon as the rates or the balances it was priced from do.
+
+    Hits are served from this worker's LRU, then from the copy in Redis that
+    the other workers share; a miss costs one projected query. Versions are
+    read before the query, so a write racing it leaves the entry stale, never
+    wrong. Without Redis every call is a miss.
+    """
+    def __init__(self, max_users: int = 10_000, ttl_seconds: int = 3600):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._local: "OrderedDict[int, Tuple[int, int, Decimal]]" = OrderedDict()
+        self.hits = {"memory": 0, "redis": 0, "computed": 0}
+
+    async def bump(self, user_id: int, tx: Optional[Transaction] = None) -> None:
+        """Invalidate `user_id`'s total once `tx` commits, or right away without one."""
+        async def incr() -> None:
+            try:
+                await redis_client.get_redis().incr(BALANCE_VERSION_KEY.format(user_id=user_id))
+            except RedisError as e:
+                # the Redis copy expires within the TTL; local entries go with it
+                logger.warning("Balance version of user %s not bumped: %s", user_id, e)
+            self._local.pop(user_id, None)
+
+        if tx is None:
+            await incr()
+        else:
+            tx.after_commit(incr)
+
+    async def usd_total(self, user_id: int) -> Decimal:
+        # the table and its version, taken together before any await
+        table, rate_version = rate_cache.table, rate_cache.version
+        try:
+            balance_version, cached = await redis_client.get_redis().mget(
+                BALANCE_VERSION_KEY.format(user_id=user_id),
+                PORTFOLIO_KEY.format(user_id=user_id),
+            )
+        except RedisError as e:
+            logger.warning("Portfolio cache unavailable: %s", e)
+            return await self._compute(user_id, table)
+        balance_version = int(balance_version or 0)
+
+        entry = self._local.get(user_id)
+        if entry is not None and entry[:2] == (rate_version, balance_version):
+            self._local.move_to_end(user_id)
+            self.hits["memory"] += 1
+            return entry[2]
+        if cached:
+            cached_rates, cached_balances, total = cached.split(":", 2)
+            if (int(cached_rates), int(cached_balances)) == (rate_version, balance_version):
+                self.hits["redis"] += 1
+                return self._remember(user_id, rate_version, balance_version, Decimal(total))
+
+        total = await self._compute(user_id, table)
+        self.hits["computed"] += 1
+        try:
+            await redis_client.get_redis().set(
+                PORTFOLIO_KEY.format(user_id=user_id),
+                f"{rate_version}:{balance_version}:{total}",
+                ex=self.ttl_seconds,
+            )
+        except RedisError as e:
+            logger.warning("Portfolio total of user %s not shared: %s", user_id, e)
+        return self._remember(user_id, rate_version, balance_version, total)
+
+    async def _compute(self, user_id: int, table) -> Decimal:
+        balances = await InternalBalance.get_motor_collection().find(
+            {"user_id": user_id, "balance": {"$gt": 0}},
+            {"_id": 0, "coin": 1, "balance": 1},
+        ).to_list(None)
+        rates = table.get_many({b["coin"] for b in balances})
+        return sum((Decimal(b["balance"]) * rates[b["coin"]] for b in balances), Decimal("0"))
+
+    def _remember(self, user_id: int, rate_version: int, balance_version: int, total: Decimal) -> Decimal:
+        self._local[user_id] = (rate_version, balance_version, total)
+        self._local.move_to_end(user_id)
+        while len(self._local) > self.max_users:
+            self._local.popitem(last=False)
+        return total
+
+    def stats(self) -> Dict[str, Any]:
+        return {"users": len(self._local), **self.hits}
+
+
+portfolio_cache = PortfolioCache(
+    max_users=settings.PORTFOLIO_CACHE_SIZE,
+    ttl_seconds=settings.PORTFOLIO_CACHE_TTL_SECONDS,
+)
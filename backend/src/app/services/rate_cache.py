@@ -1,116 +1,441 @@
+
 import asyncio
 import logging
 import json
+import os
+import random
+import time
+import uuid
 
-from typing import List, Dict, Optional
-from aiocache import caches, Cache
-from aiohttp import ClientSession, ClientError, ClientTimeout
+from datetime import datetime, timezone
+from typing import Any, Iterable, List, Dict, Optional, Tuple
+from aiohttp import ClientSession, ClientError, ClientResponseError, ClientTimeout
 from decimal import Decimal
 from pathlib import Path
+from redis.exceptions import RedisError, WatchError
 
+from app.core import redis_client
 from app.core.config.coin_registry import CoinRegistry
 from app.core.config.settings import Settings, BASE_DIR
 from app.core.config.settings import get_settings
+from app.services.rate_history import rate_history
+from app.services.rate_table import RateTable
+from app.utils.rate_limit import TokenBucket
 
 
 
 logger = logging.getLogger(__name__)
-caches.set_config({"default": {"cache": "aiocache.SimpleMemoryCache"}})
+
+RATES_KEY = "rates:snapshot"
+RATES_VERSION_KEY = "rates:version"
+RATES_CHANNEL = "rates:updates"
+UPDATER_LEASE_KEY = "rates:updater"
+# version of snapshots this process fetched or loaded from disk: never published,
+# so their updated_at alone tells them apart
+LOCAL_VERSION = 0
 
 def chunk_list(lst: List[str], size: int) -> List[List[str]]:
     """Розбиває список на чанки заданого розміру."""
     return [lst[i : i + size] for i in range(0, len(lst), size)]
 
+def write_json_atomic(path: Path, data: Any) -> None:
+    """Write to a temp file and rename it over `path`. Blocking; run it in a thread."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2, default=str, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
 class RateCache:
+    """
+    USD rates shared by every API worker and Celery task through Redis.
+
+    One process at a time holds the updater lease (`SET NX PX` on
+    `rates:updater`) and fetches CoinGecko; it writes the snapshot with a new
+    version to `rates:snapshot` and publishes it on `rates:updates`. Every
+    process keeps a local copy that the subscriber swaps in whole, so reads
+    are plain dict lookups. Celery tasks, which run no subscriber, call
+    `refresh()` first. Without Redis a process fetches for itself.
+
+    Batches are fetched `concurrency` at a time under a token bucket matched
+    to the API plan, each retried with jittered backoff. Coins whose batch
+    still failed keep their previous rate and are listed in `stale_coins`.
+    """
     def __init__(
         self,
         batch_size: int = 50,
         timeout_seconds: int = 5,
+        interval_seconds: float = 300,
+        stale_seconds: float = 900,
+        concurrency: int = 4,
+        rate_per_minute: float = 30,
+        retries: int = 3,
+        backoff_seconds: float = 1.0,
+        base_url: Optional[str] = None,
+        snapshot_path: Optional[Path] = None,
     ):
         self.batch_size = batch_size
         # пункт 1 & 3: створюємо одну сесію з таймаутом
         self._timeout = ClientTimeout(total=timeout_seconds)
         self._session: Optional[ClientSession] = None
         self._settings = get_settings()
+        self.base_url = base_url or self._settings.COINGECKO_BASE_URL
+        self.snapshot_path = snapshot_path
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self._bucket = TokenBucket(rate_per_minute / 60, capacity=concurrency)
+        self.stale_coins: frozenset = frozenset()
+        self.source: Optional[str] = None  # redis | disk | fetch
+        self.interval_seconds = interval_seconds
+        self.stale_seconds = stale_seconds
+        # the lease outlives one missed update; followers retry well within it
+        self.lease_seconds = interval_seconds * 2
+        self._token = uuid.uuid4().hex
+        self._table = RateTable({})
+        self.version = LOCAL_VERSION
+        self.updated_at: Optional[float] = None
+        self.is_updater = False
+        self._tasks: List[asyncio.Task] = []
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def get_rate(self, coin_id: str) -> Decimal:
+        """
+        Повертає курс конкретної монети з кешу (або 0, якщо немає).
+        """
+        return self._table.by_coin.get(coin_id, Decimal("0"))
+
+    def get_rates(self, coin_ids: Iterable[str]) -> Dict[str, Decimal]:
+        """Rates of `coin_ids` (0 for unknown coins), all from the same snapshot."""
+        return self._table.get_many(coin_ids)
+
+    @property
+    def table(self) -> RateTable:
+        """The current snapshot with its cross-rate matrix; hold on to it for consistent reads."""
+        return self._table
+
+    @property
+    def snapshot_id(self) -> Tuple[int, Optional[datetime]]:
+        """
+        (version, updated_at) of the snapshot in force: a flushed Redis reuses
+        versions and local snapshots share LOCAL_VERSION, the pair stays unique.
+        """
+        if self.updated_at is None:
+            return self.version, None
+        return self.version, datetime.fromtimestamp(self.updated_at, timezone.utc)
+
+    def get_all_rates(self) -> Dict[str, str]:
+        return {sym: str(rt) for sym, rt in self._table.by_coin.items()}
+
+    def age_seconds(self) -> Optional[float]:
+        return time.time() - self.updated_at if self.updated_at is not None else None
+
+    def is_stale(self, coin_id: Optional[str] = None) -> bool:
+        """The whole snapshot is too old, or `coin_id` missed the last update."""
+        age = self.age_seconds()
+        return age is None or age > self.stale_seconds or coin_id in self.stale_coins
+
+    def is_ready(self, max_age_seconds: float) -> bool:
+        """A snapshot younger than `max_age_seconds` is loaded."""
+        age = self.age_seconds()
+        return age is not None and age <= max_age_seconds
+
+    def stats(self) -> Dict[str, Any]:
+        age = self.age_seconds()
+        return {
+            "version": self.version,
+            "updated_at": self.updated_at,
+            "age_seconds": round(age, 1) if age is not None else None,
+            "source": self.source,
+            "stale": self.is_stale(),
+            "coins": len(self._table),
+            "stale_coins": sorted(self.stale_coins),
+            "updater": self.is_updater,
+        }
+
+    # ------------------------------------------------------------------
+    # Shared snapshot
+    # ------------------------------------------------------------------
+    async def publish(self, rates: Dict[str, Decimal], stale: Iterable[str] = ()) -> int:
+        """
+        Store `rates` as the next snapshot version and push it to every process.
+        `stale` are the coins carried over from the previous snapshot.
+        """
+        redis = redis_client.get_redis()
+        version = await redis.incr(RATES_VERSION_KEY)
+        payload = json.dumps({
+            "version": version,
+            "updated_at": time.time(),
+            "rates": {coin: str(rate) for coin, rate in rates.items()},
+            "stale": sorted(stale),
+        })
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.set(RATES_KEY, payload)
+            pipe.publish(RATES_CHANNEL, payload)
+            await pipe.execute()
+        self._apply(payload)
+        self.source = "fetch"
+        return version
+
+    async def refresh(self) -> bool:
+        """Pull the current snapshot from Redis; True if it replaced the local copy."""
+        payload = await redis_client.get_redis().get(RATES_KEY)
+        if payload and self._apply(payload):
+            self.source = "redis"
+            return True
+        return False
+
+    async def warm_start(self) -> Optional[float]:
+        """
+        Load the last persisted snapshot before serving: the Redis copy, or the
+        snapshot file when Redis has none or one older by more than an update
+        interval. Returns the snapshot age, None if there is none.
+        """
+        try:
+            await self.refresh()
+        except RedisError as e:
+            logger.warning("No rate snapshot from Redis: %s", e)
+        path = self.snapshot_path
+        if path is not None and path.exists():
+            try:
+                mtime = path.stat().st_mtime
+                if self.updated_at is None or mtime - self.updated_at > self.interval_seconds:
+                    rates = await asyncio.to_thread(lambda: json.loads(path.read_text()))
+                    # the file has no version; the history already has these samples
+                    self._set_local({coin: Decimal(rate) for coin, rate in rates.items()},
+                                    LOCAL_VERSION, mtime, record=False)
+                    self.source = "disk"
+            except (OSError, ValueError, ArithmeticError) as e:
+                logger.error("Rate snapshot %s not loaded: %s", path, e)
+        return self.age_seconds()
+
+    def _apply(self, payload: str) -> bool:
+        snapshot = json.loads(payload)
+        # a flushed Redis restarts the version: the timestamp still orders snapshots;
+        # a local snapshot has no version to compare against
+        if snapshot["updated_at"] <= (self.updated_at or 0) and (
+                self.version == LOCAL_VERSION or snapshot["version"] <= self.version):
+            return False
+        self._set_local({coin: Decimal(rate) for coin, rate in snapshot["rates"].items()},
+                        snapshot["version"], snapshot["updated_at"], frozenset(snapshot.get("stale", ())))
+        return True
+
+    def _set_local(self, rates: Dict[str, Decimal], version: int, updated_at: float,
+                   stale: frozenset = frozenset(), record: bool = True) -> None:
+        # one assignment: readers see the old table or the new one, never a mix;
+        # the cross-rate matrix is built here once per snapshot, not per quote
+        self._table = RateTable(rates)
+        self.stale_coins = stale
+        self.version = version
+        self.updated_at = updated_at
+        if record:
+            rate_history.record({coin: rate for coin, rate in rates.items() if coin not in stale}, version, updated_at)
+
+    # ------------------------------------------------------------------
+    # Updater lease
+    # ------------------------------------------------------------------
+    async def _hold_lease(self) -> bool:
+        """Take the updater lease, or extend it if this process already holds it."""
+        redis = redis_client.get_redis()
+        ttl_ms = int(self.lease_seconds * 1000)
+        if await redis.set(UPDATER_LEASE_KEY, self._token, nx=True, px=ttl_ms):
+            return True
+        return await self._if_lease_held(lambda pipe: pipe.pexpire(UPDATER_LEASE_KEY, ttl_ms))
+
+    async def _release_lease(self) -> None:
+        await self._if_lease_held(lambda pipe: pipe.delete(UPDATER_LEASE_KEY))
+
+    async def _if_lease_held(self, command) -> bool:
+        async with redis_client.get_redis().pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(UPDATER_LEASE_KEY)
+                if await pipe.get(UPDATER_LEASE_KEY) != self._token:
+                    return False
+                pipe.multi()
+                command(pipe)
+                await pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._listen()), asyncio.create_task(self.rate_updater())]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        if self.is_updater:
+            try:
+                await self._release_lease()
+            except RedisError as e:
+                logger.warning("Could not release the rate updater lease: %s", e)
+            self.is_updater = False
 
     async def close(self):
         """Закриваємо сесію при завершенні роботи."""
-        await self._session.close() # type: ignore
-        
+        await self.stop()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = redis_client.get_redis().pubsub()
+            try:
+                await pubsub.subscribe(RATES_CHANNEL)
+                # whatever was published before the subscription
+                await self.refresh()
+                async for message in pubsub.listen():
+                    if message["type"] == "message" and self._apply(message["data"]):
+                        self.source = "redis"
+            except RedisError as e:
+                logger.error("Rate subscription failed: %s", e)
+            finally:
+                await pubsub.aclose()
+            await asyncio.sleep(1)
+
+    async def rate_updater(self) -> None:
+        """
+        Фоновий таск: поки процес тримає lease, кожні interval_seconds оновлює
+        спільний знімок курсів; інакше чекає, щоб перехопити lease.
+        """
+        while True:
+            try:
+                self.is_updater = await self._hold_lease()
+                if self.is_updater and (self.age_seconds() is None or self.age_seconds() >= self.interval_seconds * 0.9):
+                    await self.force_update()
+                    logger.info("Coin rates v%s updated, next in %s sec", self.version, self.interval_seconds)
+            except RedisError as e:
+                self.is_updater = False
+                logger.error("Rate updater has no Redis (%s), fetching for this process only", e)
+                if self.age_seconds() is None or self.age_seconds() >= self.interval_seconds:
+                    fresh = await self._fetch_rates(CoinRegistry.list_ids() or [])
+                    if fresh:
+                        merged = {**self._table.by_coin, **fresh}
+                        self._set_local(merged, LOCAL_VERSION, time.time(), frozenset(merged.keys() - fresh.keys()))
+                        self.source = "fetch"
+            await asyncio.sleep(self.interval_seconds if self.is_updater else self.interval_seconds / 4)
+
+    async def force_update(self) -> bool:
+        """
+        Fetch every registry coin and publish the previous snapshot updated
+        with whatever arrived; nothing is published if nothing arrived.
+        """
+        # пункт 1: беремо актуальні id кожного разу
+        fresh = await self._fetch_rates(CoinRegistry.list_ids() or [])
+        if not fresh:
+            logger.error("No rates fetched, keeping snapshot v%s", self.version)
+            return False
+        merged = {**self._table.by_coin, **fresh}
+        stale = merged.keys() - fresh.keys()
+        if stale:
+            logger.warning("%d coin rate(s) not refreshed, serving the previous values", len(stale))
+        version = await self.publish(merged, stale)
+        await rate_history.persist(fresh, version, self.updated_at)
+        if self.snapshot_path is not None:
+            try:
+                await asyncio.to_thread(write_json_atomic, self.snapshot_path, merged)
+            except OSError as e:
+                logger.error("Rate snapshot not written to %s: %s", self.snapshot_path, e)
+        return True
+
+    # ------------------------------------------------------------------
+    # CoinGecko
+    # ------------------------------------------------------------------
     async def _ensure_session(self):
         if self._session is None:
             self._session = ClientSession(timeout=self._timeout)
 
-    async def _fetch_rates(self) -> Dict[str, Decimal]:
-        await self._ensure_session()
-        # пункт 1: беремо актуальні id кожного разу
-        ids = CoinRegistry.list_ids() or []
+    async def _fetch_rates(self, ids: List[str]) -> Dict[str, Decimal]:
+        """The rates of `ids` that could be fetched; failed batches are left out."""
         if not ids:
             return {}
+        await self._ensure_session()
+        semaphore = asyncio.Semaphore(self.concurrency)
 
-        results: Dict[str, Decimal] = {}
+        async def fetch(batch: List[str]) -> Dict[str, Decimal]:
+            async with semaphore:
+                return await self._fetch_batch(batch)
 
         # пункт 5: батчимо запити по batch_size
-        for batch in chunk_list(ids, self.batch_size):
-            params = {
-                "ids": ",".join(batch),      # пункт 2: params замість ручного f-string у URL
-                "vs_currencies": "usd"
-            }
+        results: Dict[str, Decimal] = {}
+        for rates in await asyncio.gather(*(fetch(b) for b in chunk_list(ids, self.batch_size))):
+            results.update(rates)
+        return results
+
+    async def _fetch_batch(self, batch: List[str]) -> Dict[str, Decimal]:
+        params = {
+            "ids": ",".join(batch),      # пункт 2: params замість ручного f-string у URL
+            "vs_currencies": "usd"
+        }
+        error: Any = None
+        for attempt in range(self.retries + 1):
+            await self._bucket.acquire()
+            retry_after = 0.0
             try:
-                resp = await self._session.get( # type: ignore
-                    f"{self._settings.COINGECKO_BASE_URL}/simple/price",
-                    params=params
-                )
-                resp.raise_for_status()      # пункт 3: перевірка статусу
-                data = await resp.json()
-            except (ClientError, asyncio.TimeoutError) as e:
+                async with self._session.get(f"{self.base_url}/simple/price", params=params) as resp:  # type: ignore
+                    if resp.status == 429 or resp.status >= 500:
+                        error = f"HTTP {resp.status}"
+                        if resp.status == 429:
+                            retry_after = _retry_after(resp.headers.get("Retry-After"))
+                            self._bucket.pause(retry_after)
+                    else:
+                        resp.raise_for_status()      # пункт 3: перевірка статусу
+                        return self._parse_prices(await resp.json())
+            except ClientResponseError as e:
+                # any other 4xx: the request itself is wrong, retrying will not help
                 logger.error("Error fetching rates for batch %s: %s", batch, e)
-                continue
+                return {}
+            except (ClientError, asyncio.TimeoutError) as e:
+                error = e
+            if attempt < self.retries:
+                # full jitter: uniform in [0, base * 2^attempt]
+                await asyncio.sleep(max(retry_after, random.uniform(0, self.backoff_seconds * 2 ** attempt)))
+        logger.error("Giving up on rates for batch %s after %d attempts: %s", batch, self.retries + 1, error)
+        return {}
 
-            # пункт 4: ітеруємося по тому, що реально прийшло
-            for key, obj in data.items():
-                usd_val = obj.get("usd")
-                if usd_val is None:
-                    logger.warning("No USD price for %s in response", key)
-                    continue
-                try:
-                    results[key] = Decimal(str(usd_val))
-                except (ValueError, TypeError) as e:
-                    logger.error("Can't parse USD value for %s: %s", key, e)
-            await asyncio.sleep(1)
-        with open(Path( "/app/data/rate_cache.json"), "w") as f:
-            json.dump(results, f, indent=2, default=str, ensure_ascii=False)
+    @staticmethod
+    def _parse_prices(data: Dict[str, Any]) -> Dict[str, Decimal]:
+        results: Dict[str, Decimal] = {}
+        # пункт 4: ітеруємося по тому, що реально прийшло
+        for key, obj in data.items():
+            usd_val = obj.get("usd")
+            if usd_val is None:
+                logger.warning("No USD price for %s in response", key)
+                continue
+            try:
+                results[key] = Decimal(str(usd_val))
+            except (ValueError, TypeError, ArithmeticError) as e:
+                logger.error("Can't parse USD value for %s: %s", key, e)
         return results
 
-    async def rate_updater(self, interval_seconds: int = 300) -> None:
-        """
-        Фоновий таск, що кожні interval_seconds оновлює cache["coin_rates"].
-        Запускай як: asyncio.create_task(rate_cache.rate_updater())
-        """
-        cache = caches.get("default")
-        while True:
-            rates = await self._fetch_rates()
-            await cache.set("coin_rates", rates) # type: ignore
-            logger.info("Coin rates updated, next in %s sec", interval_seconds)
-            await asyncio.sleep(interval_seconds)
 
-    async def get_rate(self, coin_id: str) -> Decimal:
-        """
-        Повертає курс конкретної монети з кешу (або 0, якщо немає).
-        """
-        cache = caches.get("default")
-        rates: Dict[str, Decimal] = await cache.get("coin_rates", {})  # type: ignore # {} for default
-        return rates.get(coin_id, Decimal("0"))
-    
-    async def get_all_rates(self) -> Dict[str, str]:
-        cache = caches.get("default")
-        rates = await cache.get("coin_rates", {}) or {} # type: ignore
-        return {sym: str(rt) for sym, rt in rates.items()}
-    
-    
-    async def force_update(self):
-        cache = caches.get("default")
-        rates = await self._fetch_rates()
-        await cache.set("coin_rates", rates) # type: ignore
-
-rate_cache = RateCache()
\ No newline at end of file
+def _retry_after(value: Optional[str]) -> float:
+    try:
+        return max(0.0, float(value)) if value else 0.0
+    except ValueError:
+        return 0.0
+
+settings: Settings = get_settings()
+rate_cache = RateCache(
+    interval_seconds=settings.RATE_UPDATE_SECONDS,
+    stale_seconds=settings.RATE_STALE_SECONDS,
+    concurrency=settings.COINGECKO_CONCURRENCY,
+    rate_per_minute=settings.COINGECKO_RATE_PER_MINUTE,
+    retries=settings.COINGECKO_RETRIES,
+    snapshot_path=settings.RATE_SNAPSHOT_PATH,
+)
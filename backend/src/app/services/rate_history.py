@@ -0,0 +1,204 @@
+# services/rate_history.py
+import logging
+
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import PyMongoError
+
+from app.db.models.rate_history import RateBucket
+from app.core.config.settings import Settings
+from app.core.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+settings: Settings = get_settings()
+
+
+@dataclass(slots=True)
+class RatePoint:
+    ts: float
+    rate: Decimal
+    version: int
+
+
+@dataclass(slots=True)
+class Candle:
+    start: float
+    open: Decimal
+    high: Decimal
+    low: Decimal
+    close: Decimal
+    samples: int
+
+
+class RateSeries:
+    """
+    Fixed-capacity ring buffer of one coin's samples in three parallel arrays,
+    oldest first from `head`. Samples arrive in time order, so the logical
+    order is sorted and lookups bisect it.
+
+    Rates are kept as floats: they arrive from CoinGecko as floats and
+    `Decimal(repr(f))` gives the original value back.
+    """
+    __slots__ = ("capacity", "head", "size", "ts", "rates", "versions")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.head = 0
+        self.size = 0
+        self.ts = array("d", bytes(8 * capacity))
+        self.rates = array("d", bytes(8 * capacity))
+        self.versions = array("q", bytes(8 * capacity))
+
+    def _slot(self, i: int) -> int:
+        return (self.head + i) % self.capacity
+
+    def append(self, ts: float, rate: Decimal, version: int) -> bool:
+        if self.size and ts <= self.ts[self._slot(self.size - 1)]:
+            return False
+        if self.size < self.capacity:
+            slot = self._slot(self.size)
+            self.size += 1
+        else:
+            # full: overwrite the oldest
+            slot = self.head
+            self.head = (self.head + 1) % self.capacity
+        self.ts[slot] = ts
+        self.rates[slot] = float(rate)
+        self.versions[slot] = version
+        return True
+
+    def oldest(self) -> Optional[float]:
+        return self.ts[self.head] if self.size else None
+
+    def point(self, i: int) -> RatePoint:
+        slot = self._slot(i)
+        return RatePoint(self.ts[slot], Decimal(repr(self.rates[slot])), self.versions[slot])
+
+    def index_at(self, ts: float) -> int:
+        """Index of the last sample at or before `ts`, -1 if there is none."""
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.ts[self._slot(mid)] <= ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo - 1
+
+    def between(self, start: float, end: float) -> Iterator[RatePoint]:
+        for i in range(self.index_at(start - 1e-9) + 1, self.index_at(end) + 1):
+            yield self.point(i)
+
+
+class RateHistory:
+    """
+    What rate was in force at time T: every process keeps the recent samples
+    of each coin in a `RateSeries`; the rate updater also appends them to
+    daily `RateBucket` documents, which answer anything older.
+    """
+    def __init__(self, capacity: int = 2016, bucket_seconds: int = 86400):
+        self.capacity = capacity
+        self.bucket_seconds = bucket_seconds
+        self._series: Dict[str, RateSeries] = {}
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def record(self, rates: Dict[str, Decimal], version: int, ts: float) -> None:
+        for coin, rate in rates.items():
+            series = self._series.get(coin)
+            if series is None:
+                series = self._series[coin] = RateSeries(self.capacity)
+            series.append(ts, rate, version)
+
+    async def persist(self, rates: Dict[str, Decimal], version: int, ts: float) -> None:
+        """Append one snapshot to the buckets: one upsert per coin, one bulk write."""
+        start = self._bucket_start(ts)
+        ops = [
+            UpdateOne(
+                {"coin": coin, "start": start},
+                {"$push": {"ts": ts, "rates": rate, "versions": version}, "$inc": {"samples": 1}},
+                upsert=True,
+            )
+            for coin, rate in rates.items()
+        ]
+        if not ops:
+            return
+        try:
+            await RateBucket.get_motor_collection().bulk_write(ops, ordered=False)
+        except PyMongoError as e:
+            logger.error("Rate history v%s not persisted: %s", version, e)
+
+    async def load(self, since: float) -> int:
+        """Warm the ring buffers from the buckets; returns the samples loaded."""
+        loaded = 0
+        cursor = RateBucket.get_motor_collection().find(
+            {"start": {"$gte": self._bucket_start(since)}},
+        ).sort("start", ASCENDING)
+        async for raw in cursor:
+            for ts, rate, version in zip(raw["ts"], raw["rates"], raw["versions"]):
+                if ts >= since:
+                    self.record({raw["coin"]: rate}, version, ts)
+                    loaded += 1
+        return loaded
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    async def rate_at(self, coin_id: str, ts: float) -> Optional[RatePoint]:
+        """The sample in force at `ts` (the last one at or before it)."""
+        series = self._series.get(coin_id)
+        if series is not None and series.size and series.oldest() <= ts:
+            return series.point(series.index_at(ts))
+
+        buckets = await RateBucket.get_motor_collection().find(
+            {"coin": coin_id, "start": {"$lte": self._bucket_start(ts)}},
+        ).sort("start", DESCENDING).limit(2).to_list(2)
+        for raw in buckets:
+            i = bisect_right(raw["ts"], ts) - 1
+            if i >= 0:
+                return RatePoint(raw["ts"][i], raw["rates"][i], raw["versions"][i])
+        return None
+
+    async def points(self, coin_id: str, start: float, end: float) -> List[RatePoint]:
+        series = self._series.get(coin_id)
+        if series is not None and series.size and series.oldest() <= start:
+            return list(series.between(start, end))
+
+        points: List[RatePoint] = []
+        cursor = RateBucket.get_motor_collection().find(
+            {"coin": coin_id, "start": {"$gte": self._bucket_start(start), "$lte": self._bucket_start(end)}},
+        ).sort("start", ASCENDING)
+        async for raw in cursor:
+            for ts, rate, version in zip(raw["ts"], raw["rates"], raw["versions"]):
+                if start <= ts <= end:
+                    points.append(RatePoint(ts, rate, version))
+        return points
+
+    async def ohlc(self, coin_id: str, start: float, end: float, step: float) -> List[Candle]:
+        """Samples in [start, end] downsampled to one candle per `step` seconds."""
+        candles: List[Candle] = []
+        for p in await self.points(coin_id, start, end):
+            bucket = start + (p.ts - start) // step * step
+            if candles and candles[-1].start == bucket:
+                c = candles[-1]
+                c.high, c.low, c.close = max(c.high, p.rate), min(c.low, p.rate), p.rate
+                c.samples += 1
+            else:
+                candles.append(Candle(bucket, p.rate, p.rate, p.rate, p.rate, 1))
+        return candles
+
+    def _bucket_start(self, ts: float) -> datetime:
+        return datetime.fromtimestamp(ts - ts % self.bucket_seconds, timezone.utc)
+
+
+rate_history = RateHistory(
+    capacity=settings.RATE_HISTORY_CAPACITY,
+    bucket_seconds=settings.RATE_BUCKET_SECONDS,
+)
@@ -0,0 +1,43 @@
+# services/rate_table.py
+from decimal import Decimal
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+ZERO = Decimal("0")
+
+
+class RateTable:
+    """
+    One rate snapshot indexed for batch reads, built once per update and never
+    mutated. `index[coin]` is the row of the coin in the exact `rates`, the
+    float64 `usd` vector and the `cross` matrix, where cross[i, j] is the
+    number of units of coin j one unit of coin i buys (0 if either rate is
+    missing). The matrix is n x n floats: 8 MB at 1000 coins.
+    """
+    __slots__ = ("by_coin", "index", "rates", "usd", "cross")
+
+    def __init__(self, rates: Dict[str, Decimal]):
+        self.by_coin = rates
+        self.index: Dict[str, int] = {coin: i for i, coin in enumerate(rates)}
+        self.rates: List[Decimal] = list(rates.values())
+        self.usd = np.array([float(rate) for rate in self.rates], dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cross = self.usd[:, None] / self.usd[None, :]
+        cross[~np.isfinite(cross)] = 0.0
+        self.cross = cross
+
+    def __len__(self) -> int:
+        return len(self.rates)
+
+    def get_many(self, coin_ids: Iterable[str]) -> Dict[str, Decimal]:
+        return {coin: self.by_coin.get(coin, ZERO) for coin in coin_ids}
+
+    def cross_rates(self, from_ids: List[str], to_ids: List[str]) -> np.ndarray:
+        """cross[from, to] for every pair, in one gather; 0 for unknown coins."""
+        rows = np.array([self.index.get(coin, -1) for coin in from_ids], dtype=np.intp)
+        cols = np.array([self.index.get(coin, -1) for coin in to_ids], dtype=np.intp)
+        known = (rows >= 0) & (cols >= 0)
+        out = np.zeros(len(rows), dtype=np.float64)
+        out[known] = self.cross[rows[known], cols[known]]
+        return out
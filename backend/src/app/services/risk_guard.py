@@ -1,28 +1,288 @@
 # services/risk_guard.py
-from typing import Optional
-from app.db.models.player import CapPool
+import asyncio
+import logging
+import random
+
+from decimal import Decimal, ROUND_DOWN
+from typing import Iterable, List, Optional, Sequence, Tuple
+
 from fastapi import HTTPException
-import math
-from decimal import Decimal
-
-async def ensure_reserve_and_limits(stake: Decimal, payout: Decimal):
-    pool: Optional[CapPool] = await CapPool.get("main")
-    if pool:
-        # 1. Cap-pool
-        reserve_required = payout
-        if pool.balance < reserve_required:
-            raise HTTPException(503, "reserve_low")
-
-        # 2. Max-payout
+from motor.motor_asyncio import AsyncIOMotorClientSession
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.db.init_db import DataBase
+from app.db.models.player import CapPool, CapPoolShard
+from app.services.case_cache import case_cache
+from app.core.config.settings import Settings
+from app.core.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+settings: Settings = get_settings()
+
+HOUSE_SHARE = Decimal("0.05")  # 5% of every stake goes to the reserve
+QUANT = Decimal("0.00000001")
+
+
+def _first_failure(pool: CapPool, spins: Sequence[Tuple[Decimal, Decimal]], balance: Decimal) -> Optional[HTTPException]:
+    """
+    The error the single-document pool raised for `spins` starting from
+    `balance`, None if they all pass: per spin, reserve_low before
+    payout_exceeds_max before maintenance.
+    """
+    for stake, payout in spins:
+        if balance < payout:
+            return HTTPException(503, "reserve_low")
         if payout > pool.max_payout:
-            raise HTTPException(400, "payout_exceeds_max")
+            return HTTPException(400, "payout_exceeds_max")
+        if balance < pool.sigma_buffer:
+            return HTTPException(503, "maintenance")
+        balance += stake * HOUSE_SHARE - payout
+    return None
+
+
+def _requirement(spins: Sequence[Tuple[Decimal, Decimal]], floor: Decimal) -> Tuple[Decimal, Decimal]:
+    """
+    Lowest starting balance that lets the spins pass the reserve checks one after
+    another (balance >= payout and balance >= floor before each spin), and the net
+    balance change of the whole sequence.
+    """
+    required = Decimal("0")
+    running = Decimal("0")
+    for stake, payout in spins:
+        required = max(required, max(payout, floor) - running)
+        running += stake * HOUSE_SHARE - payout
+    return required, running
+
+
+class ShardedReserve:
+    """
+    CapPool reserve split over N CapPoolShard documents.
+
+    A spin is one atomic conditional `$inc` on a random shard, with the payout
+    check in the filter, so concurrent spins neither block each other on one
+    hot document nor lose updates. The background rebalancer evens the shards
+    out and publishes their total to `CapPool.balance`.
+
+    The `sigma_buffer` floor applies to the total. Each worker tracks it as
+    the total read by its last rebalance plus its own deltas since, and takes
+    the one-shard path only while that is a full `sigma_buffer` above what
+    the spins need; other workers would have to pay out more than that within
+    one rebalance interval to slip under the floor. Closer to the floor,
+    spins read every shard in a transaction and the floor is exact.
+    """
+    def __init__(self, pool_id: str = "main", rebalance_interval_seconds: float = 5.0, tolerance: Decimal = Decimal("0.1")):
+        self.pool_id = pool_id
+        self.rebalance_interval_seconds = rebalance_interval_seconds
+        self.tolerance = tolerance
+        self._shard_ids: List[str] = []
+        self._total: Optional[Decimal] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+
+    # ------------------------------------------------------------------
+    # Shards
+    # ------------------------------------------------------------------
+    async def ensure_shards(self, count: Optional[int] = None) -> List[str]:
+        """
+        Create missing shards. The first run moves the current CapPool balance
+        into them; the ids and amounts are deterministic, so concurrent
+        processes racing on this insert the same documents.
+        """
+        count = count or settings.CAP_POOL_SHARDS
+        existing = await CapPoolShard.find(CapPoolShard.pool_id == self.pool_id).to_list()
+        if len(existing) < count:
+            have = {s.index for s in existing}
+            pool = await CapPool.get(self.pool_id)
+            seed = pool.balance if pool and not existing else Decimal("0")
+            share = (seed / count).quantize(QUANT, rounding=ROUND_DOWN)
+            new = [
+                CapPoolShard(
+                    id=f"{self.pool_id}:{i}",
+                    pool_id=self.pool_id,
+                    index=i,
+                    balance=(seed - share * (count - 1)) if i == 0 else share,
+                )
+                for i in range(count) if i not in have
+            ]
+            try:
+                await CapPoolShard.get_motor_collection().insert_many(
+                    [s.model_dump(by_alias=True) for s in new], ordered=False
+                )
+            except BulkWriteError:
+                pass  # another process created them first
+            existing = await CapPoolShard.find(CapPoolShard.pool_id == self.pool_id).to_list()
+        self._shard_ids = [s.id for s in sorted(existing, key=lambda s: s.index)]
+        self._total = None
+        return self._shard_ids
+
+    async def shard_ids(self) -> List[str]:
+        if not self._shard_ids:
+            await self.ensure_shards()
+        return self._shard_ids
+
+    async def total(self, session: Optional[AsyncIOMotorClientSession] = None) -> Decimal:
+        shards = await CapPoolShard.find(CapPoolShard.pool_id == self.pool_id, session=session).to_list()
+        return sum((s.balance for s in shards), Decimal("0"))
+
+    # ------------------------------------------------------------------
+    # Reserve
+    # ------------------------------------------------------------------
+    async def reserve(
+        self,
+        spins: Sequence[Tuple[Decimal, Decimal]],
+        session: Optional[AsyncIOMotorClientSession] = None,
+    ) -> None:
+        """
+        Apply the reserve checks and the balance change of `spins` (stake, payout)
+        atomically, or raise the same HTTPException the single-document pool did.
+        """
+        pool: Optional[CapPool] = await case_cache.get_cap_pool()
+        if not pool or not spins:
+            return
+        over_max = any(payout > pool.max_payout for _, payout in spins)
+
+        ids = await self.shard_ids()
+        if self._total is None:
+            self._total = await self.total(session)
+        required_total, delta = _requirement(spins, pool.sigma_buffer)
+        if not over_max and self._total >= required_total + pool.sigma_buffer:
+            # the shard only has to cover the payouts; the floor is the total's
+            required, _ = _requirement(spins, Decimal("0"))
+            collection = CapPoolShard.get_motor_collection()
+            for shard_id in random.sample(ids, len(ids)):
+                result = await collection.update_one(
+                    {"_id": shard_id, "balance": {"$gte": required}},
+                    {"$inc": {"balance": delta}},
+                    session=session,
+                )
+                if result.modified_count:
+                    self._total += delta
+                    return
+
+        # near the floor, or no single shard can cover it: the reserve is low or just fragmented;
+        # a payout over the max fails there too, against the total, in the pool's check order
+        if not over_max:
+            self._wake.set()
+        if session is not None:
+            await self._reserve_spread(pool, spins, session)
+        else:
+            await DataBase.run_transaction(lambda tx: self._reserve_spread(pool, spins, tx.session))
+
+    async def _reserve_spread(
+        self,
+        pool: CapPool,
+        spins: Sequence[Tuple[Decimal, Decimal]],
+        session: Optional[AsyncIOMotorClientSession],
+    ) -> None:
+        """
+        Check the spins against the total of all shards and take the net debit
+        from the fullest ones. Runs in a transaction: when a concurrent spin
+        drained a shard first, the takes already made are rolled back with it.
+        """
+        _, delta = _requirement(spins, pool.sigma_buffer)
+        collection = CapPoolShard.get_motor_collection()
+        shards = await CapPoolShard.find(CapPoolShard.pool_id == self.pool_id, session=session).to_list()
+        total = sum((s.balance for s in shards), Decimal("0"))
+        self._total = total
+        failure = _first_failure(pool, spins, total)
+        if failure is not None:
+            raise failure
+
+        need = -delta
+        for shard in sorted(shards, key=lambda s: s.balance, reverse=True):
+            if need <= 0:
+                break
+            take = min(need, shard.balance)
+            if take <= 0:
+                continue
+            result = await collection.update_one(
+                {"_id": shard.id, "balance": {"$gte": take}},
+                {"$inc": {"balance": -take}},
+                session=session,
+            )
+            if not result.modified_count:
+                raise HTTPException(503, "reserve_low")
+            need -= take
+        if delta > 0:
+            await collection.update_one({"_id": shards[0].id}, {"$inc": {"balance": delta}}, session=session)
+        self._total = total + delta
+
+    # ------------------------------------------------------------------
+    # Rebalancer
+    # ------------------------------------------------------------------
+    async def rebalance(self) -> Decimal:
+        """
+        Move reserve from shards above the mean to shards below it with `$inc`
+        deltas inside one transaction, so spins landing meanwhile are never
+        overwritten. Returns the total and publishes it to CapPool.balance.
+        """
+        await self.shard_ids()
+        for attempt in range(3):
+            try:
+                async with DataBase.start_transaction() as session:
+                    shards = await CapPoolShard.find(CapPoolShard.pool_id == self.pool_id, session=session).to_list()
+                    total = sum((s.balance for s in shards), Decimal("0"))
+                    target = (total / len(shards)).quantize(QUANT, rounding=ROUND_DOWN)
+                    spread = max(s.balance for s in shards) - min(s.balance for s in shards)
+                    if spread > abs(target) * self.tolerance:
+                        # deltas sum to zero: the remainder goes to the last shard
+                        deltas = [target - s.balance for s in shards]
+                        deltas[-1] -= sum(deltas)
+                        collection = CapPoolShard.get_motor_collection()
+                        for shard, d in zip(shards, deltas):
+                            if d:
+                                await collection.update_one({"_id": shard.id}, {"$inc": {"balance": d}}, session=session)
+                break
+            except PyMongoError as e:
+                if not e.has_error_label("TransientTransactionError") or attempt == 2:
+                    raise
+        self._total = total
+        await CapPool.get_motor_collection().update_one({"_id": self.pool_id}, {"$set": {"balance": total}})
+        return total
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._rebalancer())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _rebalancer(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.rebalance_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.rebalance()
+            except PyMongoError as e:
+                logger.error("CapPool rebalance failed: %s", e)
+
+
+cap_reserve = ShardedReserve(rebalance_interval_seconds=settings.CAP_POOL_REBALANCE_SECONDS)
+
+
+async def ensure_reserve_and_limits(
+    stake: Decimal,
+    payout: Decimal,
+    session: Optional[AsyncIOMotorClientSession] = None
+):
+    await cap_reserve.reserve([(stake, payout)], session=session)
 
-        # 3. σ-buffer check
-        # припускаємо, що pool.sigma_buffer = 4σ
-        if pool.balance < pool.sigma_buffer:
-            raise HTTPException(503, "maintenance")
 
-        # якщо все добре — оновимо баланс
-        pool.balance += stake * Decimal("0.05")  # 5% share
-        pool.balance -= payout
-        await pool.save()
+async def ensure_reserve_and_limits_many(
+    spins: Iterable[Tuple[Decimal, Decimal]],
+    session: Optional[AsyncIOMotorClientSession] = None
+):
+    """
+    Same checks as `ensure_reserve_and_limits` for a batch of (stake, payout),
+    applied in order and committed as a single shard update.
+    """
+    await cap_reserve.reserve(list(spins), session=session)
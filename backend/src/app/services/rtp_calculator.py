@@ -0,0 +1,188 @@
+# services/rtp_calculator.py
+from dataclasses import dataclass, field
+from decimal import Decimal
+from fractions import Fraction
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from app.models.case_config import TierConfig
+from app.services.spin_sampler import PITY_LEVELS, ROLL_SPACE, SpinSampler, pity_level
+
+TAIL_MULTIPLES = (1, 2, 5, 10, 25, 50, 100)
+COMMON_SUB_CHANCE = Decimal("0.999")
+
+
+@dataclass(slots=True)
+class RtpReport:
+    """
+    Exact long-run statistics of one odds table, per completed spin, with the
+    player's `fail_streak` distributed according to the soft-pity stationary law.
+    """
+    case_id: str
+    odds_version: str
+    price_usd: Fraction
+    expected_payout: Fraction
+    second_moment: Fraction
+    gap_probability: Fraction
+    pity_engaged: Fraction
+    tails: Dict[int, Fraction]
+    stationary: List[Fraction]
+    missing_rates: List[str] = field(default_factory=list)
+
+    @property
+    def rtp(self) -> Fraction:
+        return self.expected_payout / self.price_usd
+
+    @property
+    def variance(self) -> Fraction:
+        return self.second_moment - self.expected_payout ** 2
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "case_id": self.case_id,
+            "odds_version": self.odds_version,
+            "price_usd": str(Decimal(self.price_usd.numerator) / Decimal(self.price_usd.denominator)),
+            "rtp": float(self.rtp),
+            "expected_payout_usd": float(self.expected_payout),
+            "variance": float(self.variance),
+            "std": float(self.variance) ** 0.5,
+            "gap_probability": float(self.gap_probability),
+            "pity_engaged": float(self.pity_engaged),
+            "tails": {f"payout>={m}x": float(p) for m, p in self.tails.items()},
+            "stationary": [float(p) for p in self.stationary],
+            "missing_rates": self.missing_rates,
+        }
+
+
+def _level_outcomes(sampler: SpinSampler, level: int, n_tiers: int) -> List[Fraction]:
+    """
+    Probability of every (tier, reward) at one pity level, flattened in config
+    order. Counts are taken straight from the compiled integer thresholds, so
+    they are exactly the frequencies `spin()` produces over the 2^32 rolls.
+    """
+    tier_bounds = sampler.tier_bounds(level)
+    probs: List[Fraction] = []
+    for t in range(n_tiers):
+        lo_t = tier_bounds[t - 1] if t else 0
+        hi_t = min(tier_bounds[t], ROLL_SPACE)
+        prev = lo_t
+        for bound in sampler.reward_bounds(level)[t]:
+            lo, hi = max(prev, lo_t), min(bound, hi_t)
+            probs.append(Fraction(max(hi - lo, 0), ROLL_SPACE))
+            prev = max(prev, bound)
+    return probs
+
+
+def _stationary(common: Sequence[Fraction], gap: Sequence[Fraction]) -> List[Fraction]:
+    """
+    Stationary law of the fail-streak chain over states 0..S, where S collapses
+    every streak at maximum pity. From state s a spin moves to s+1 (S stays at S)
+    with probability `common[s]`, stays put on a gap roll and resets to 0 otherwise.
+    """
+    last = len(common) - 1
+    weights = [Fraction(1)]
+    for s in range(1, last + 1):
+        inflow = weights[-1] * common[s - 1]
+        if inflow == 0:
+            weights.extend([Fraction(0)] * (last + 1 - s))
+            break
+        leave = 1 - gap[s] - (common[s] if s == last else 0)
+        if leave == 0:
+            if s == last:
+                # nothing ever resets at max pity: the chain is absorbed there
+                return [Fraction(0)] * last + [Fraction(1)]
+            raise ValueError(f"fail_streak state {s} can never be left")
+        weights.append(inflow / leave)
+    total = sum(weights)
+    return [w / total for w in weights]
+
+
+def compute_rtp(
+    tiers: Sequence[TierConfig],
+    pity_after: int,
+    price_usd: Decimal,
+    rates: Mapping[str, Decimal],
+    case_id: str = "",
+    odds_version: str = "",
+) -> RtpReport:
+    """
+    Exact RTP, variance and tail probabilities for an odds table and a rate snapshot.
+    Coins without a rate are valued at 0 and listed in `missing_rates`.
+    """
+    sampler = SpinSampler(tiers, case_id=case_id, odds_version=odds_version)
+    price = Fraction(price_usd)
+    rewards: List[Tuple[Fraction, bool]] = []
+    missing: List[str] = []
+    for tier in tiers:
+        for reward in tier.rewards:
+            rate = rates.get(reward.coin_id)
+            if rate is None:
+                if reward.coin_id not in missing:
+                    missing.append(reward.coin_id)
+                rate = Decimal("0")
+            rewards.append((Fraction(reward.amount) * Fraction(rate), reward.sub_chance >= COMMON_SUB_CHANCE))
+
+    levels = [_level_outcomes(sampler, level, len(tiers)) for level in range(PITY_LEVELS + 1)]
+    level_common = [sum((p for p, (_, c) in zip(probs, rewards) if c), Fraction(0)) for probs in levels]
+    level_gap = [1 - sum(probs) for probs in levels]
+
+    # streaks past pity_after + PITY_LEVELS - 1 all sit at maximum pity
+    state_levels = [pity_level(s, pity_after) for s in range(max(pity_after + PITY_LEVELS, 1))]
+    pi = _stationary([level_common[lv] for lv in state_levels], [level_gap[lv] for lv in state_levels])
+
+    # marginal outcome law of one spin under the stationary streak
+    mix = [Fraction(0)] * (PITY_LEVELS + 1)
+    for weight, lv in zip(pi, state_levels):
+        mix[lv] += weight
+    outcome = [
+        sum((mix[lv] * levels[lv][i] for lv in range(PITY_LEVELS + 1) if mix[lv]), Fraction(0))
+        for i in range(len(rewards))
+    ]
+    completed = sum(outcome)
+    if completed == 0:
+        raise ValueError(f"odds table of {case_id} never produces a reward")
+
+    expected = sum(p * x for p, (x, _) in zip(outcome, rewards)) / completed
+    second = sum(p * x * x for p, (x, _) in zip(outcome, rewards)) / completed
+    tails = {
+        m: sum((p for p, (x, _) in zip(outcome, rewards) if x >= m * price), Fraction(0)) / completed
+        for m in TAIL_MULTIPLES
+    }
+    return RtpReport(
+        case_id=case_id,
+        odds_version=odds_version,
+        price_usd=price,
+        expected_payout=expected,
+        second_moment=second,
+        gap_probability=1 - completed,
+        pity_engaged=1 - mix[0],
+        tails=tails,
+        stationary=pi,
+        missing_rates=missing,
+    )
+
+
+def compute_case_rtp(cfg, rates: Mapping[str, Decimal]) -> RtpReport:
+    """
+    `compute_rtp` for a CaseConfig at its latest odds version.
+    """
+    return compute_rtp(
+        tiers=cfg.tiers,
+        pity_after=cfg.pity_after,
+        price_usd=cfg.price_usd,
+        rates=rates,
+        case_id=cfg.case_id,
+        odds_version=cfg.odds_versions[-1].version if cfg.odds_versions else "",
+    )
+
+
+def check_rtp_bounds(report: RtpReport, rtp_min: Decimal, rtp_max: Decimal) -> Optional[str]:
+    """
+    Reason the report fails the RTP gate, or None when it passes.
+    """
+    if report.missing_rates:
+        return f"no rate for {', '.join(report.missing_rates)}"
+    if report.gap_probability:
+        return f"chances leave {float(report.gap_probability):.3e} of rolls without a reward"
+    if not Fraction(rtp_min) <= report.rtp <= Fraction(rtp_max):
+        return f"RTP {float(report.rtp):.6f} outside [{rtp_min}, {rtp_max}]"
+    return None
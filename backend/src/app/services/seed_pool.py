@@ -0,0 +1,159 @@
+# services/seed_pool.py
+import asyncio
+import hashlib
+import logging
+import os
+import time
+
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING
+from pymongo.errors import PyMongoError
+
+from app.db.models.player import ServerSeed
+from app.core.config.settings import Settings
+from app.core.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+settings: Settings = get_settings()
+
+
+def new_seed_doc(owner_id: str) -> Dict[str, Any]:
+    """
+    A fresh commitment: 32 random bytes and the sha256 of them.
+    """
+    raw = os.urandom(32)
+    return ServerSeed(
+        seed=raw.hex(),
+        hash=hashlib.sha256(raw).hexdigest(),
+        owner_id=owner_id,
+    ).model_dump(by_alias=True, exclude={"id"})
+
+
+class SeedPool:
+    """
+    Keeps `pool_size` unused server seeds committed ahead for every active user,
+    so `/fairness/commit` is a single indexed read instead of urandom + sha256 +
+    insert on the request path.
+
+    A user is active for `active_seconds` after their last commit. The refiller
+    counts unused seeds of all active users with one aggregation and tops them up
+    with one `insert_many`; unused seeds of users who left expire by the TTL
+    index on `ServerSeed`.
+    """
+    def __init__(
+        self,
+        pool_size: int = 5,
+        refill_interval_seconds: float = 2.0,
+        active_seconds: float = 900,
+    ):
+        self.pool_size = pool_size
+        self.refill_interval_seconds = refill_interval_seconds
+        self.active_seconds = active_seconds
+        self._active: Dict[str, float] = {}
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    async def take(self, user_id: int, count: int = 1) -> List[ServerSeed]:
+        """
+        Return `count` distinct unused commitments of the user, oldest first.
+        Seeds stay unused until revealed; the shortfall is generated inline.
+        """
+        owner_id = str(user_id)
+        self._active[owner_id] = time.monotonic()
+        raws = await ServerSeed.get_motor_collection().find(
+            {"owner_id": owner_id, "used": False},
+            sort=[("created_at", ASCENDING)],
+            limit=count,
+        ).to_list(None)
+        seeds = [ServerSeed.model_validate(raw) for raw in raws]
+        self.hits += len(seeds)
+
+        missing = count - len(seeds)
+        if missing > 0:
+            self.misses += missing
+            docs = [new_seed_doc(owner_id) for _ in range(missing)]
+            result = await ServerSeed.get_motor_collection().insert_many(docs)
+            seeds += [
+                ServerSeed.model_validate({**doc, "_id": _id})
+                for doc, _id in zip(docs, result.inserted_ids)
+            ]
+            self._wake.set()
+        return seeds
+
+    async def refill(self) -> int:
+        """
+        Top up the pools of active users. Returns the number of seeds inserted.
+        """
+        now = time.monotonic()
+        self._active = {u: t for u, t in self._active.items() if now - t < self.active_seconds}
+        if not self._active:
+            return 0
+        collection = ServerSeed.get_motor_collection()
+        counts = {
+            row["_id"]: row["n"]
+            async for row in collection.aggregate([
+                {"$match": {"owner_id": {"$in": list(self._active)}, "used": False}},
+                {"$group": {"_id": "$owner_id", "n": {"$sum": 1}}},
+            ])
+        }
+        docs = [
+            new_seed_doc(owner_id)
+            for owner_id in self._active
+            for _ in range(self.pool_size - counts.get(owner_id, 0))
+        ]
+        if docs:
+            await collection.insert_many(docs, ordered=False)
+            self.generated += len(docs)
+        return len(docs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active_users": len(self._active),
+            "pool_size": self.pool_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "generated": self.generated,
+        }
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._refiller())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _refiller(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.refill_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.refill()
+            except PyMongoError as e:
+                logger.error("Seed pool refill failed: %s", e)
+
+
+seed_pool = SeedPool(
+    pool_size=settings.SEED_POOL_SIZE,
+    refill_interval_seconds=settings.SEED_POOL_REFILL_SECONDS,
+    active_seconds=settings.SEED_POOL_ACTIVE_SECONDS,
+)
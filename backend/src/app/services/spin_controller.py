@@ -1,142 +1,497 @@
 # services/spin_controller.py
 import hmac
 import hashlib
+import logging
 
-from itertools import accumulate
+from dataclasses import dataclass, replace
 from datetime import datetime, timezone
-from typing import Dict, Union, Optional
+from typing import Any, Callable, Dict, List, Union, Optional, Tuple
 from decimal import Decimal
 
 from fastapi import HTTPException
 from beanie import PydanticObjectId
+from motor.motor_asyncio import AsyncIOMotorClientSession
+from pymongo import ReturnDocument
 
 
-from app.db.models.player import PlayerStat
+from app.db.init_db import DataBase, Transaction
+from app.db.models.player import PlayerStat, ServerSeed
 from app.db.models.player import SpinLog
 from app.db.models.case_config import CaseConfig, TierConfig, RewardItem
-from app.services.risk_guard import ensure_reserve_and_limits
+from app.exceptions.balance import BalanceTooLow
+from app.services.risk_guard import ensure_reserve_and_limits, ensure_reserve_and_limits_many
+from app.services.case_cache import case_cache
+from app.services.spin_sampler import ZERO, STEP, MAX_BONUS, PITY_LEVELS, pity_bonus, pity_level, sampler_cache
 from app.services.rate_cache import rate_cache
 from app.services.fairness_service import FairnessService
-from app.schemas.case import CaseOpenResponse, PrizeItem, CaseOpenRequest
+from app.services.hash_chain import ChainLink, hash_chains
+from app.services.internal_balance_service import InternalBalanceService
+from app.services.live_events import publish
+from app.services.spin_log_writer import spin_log_writer
+from app.utils.money import Money
+from app.utils.timing import StageTimer
+from app.schemas.case import (
+    CaseOpenResponse,
+    PrizeItem,
+    CaseOpenRequest,
+    CaseOpenBatchRequest,
+    CaseOpenBatchResponse,
+)
 from app.core.config.settings import Settings
 from app.core.config.settings import get_settings
 
+logger = logging.getLogger(__name__)
 settings: Settings = get_settings()
 
-ZERO = Decimal("0")
-STEP = Decimal("0.02")
-MAX_BONUS = Decimal("0.20")
-async def spin(user_id:int, data_for_spin: CaseOpenRequest) -> CaseOpenResponse:
 
-    seed_doc = await FairnessService.reveal_and_verify(
-        commit_id=PydanticObjectId(data_for_spin.server_seed_id),
-        user_id=user_id)
-    server_seed = seed_doc.seed
-    
+@dataclass(slots=True)
+class SpinPick:
+    """
+    Outcome of one provably-fair roll before any money moves.
+    """
+    hmac_value: bytes
+    roll: Decimal
+    tier: TierConfig
+    reward: RewardItem
+    reward_network: Optional[str]
+    pity_before: Decimal
+    pity_after: Decimal
+    fail_streak: int
+    amount: Money
+    reward_index: int
+
+
+def hmac_roll(server_seed: str, client_seed: str, nonce: int) -> bytes:
+    """
+    HMAC-SHA256(server_seed, "client_seed:nonce"); its first 4 bytes are the roll.
+    """
     key = bytes.fromhex(server_seed)
-    msg = f"{data_for_spin.client_seed}:{data_for_spin.nonce}".encode()
-    raw = hmac.new(key, msg, hashlib.sha256).digest()
-    roll = Decimal.from_float(int.from_bytes(raw[:4], "big") / 2**32)
+    msg = f"{client_seed}:{nonce}".encode()
+    return hmac.new(key, msg, hashlib.sha256).digest()
 
-    # 3. Load config & player
-    cfg: Optional[CaseConfig] = await CaseConfig.find_one(CaseConfig.case_id == data_for_spin.case_id)
-    if not cfg:
-        raise HTTPException(404, "invalid_case")
-    ps = await PlayerStat.find_one(PlayerStat.user_id == user_id)
-    if not ps:
-        ps = PlayerStat(user_id=user_id)
-    
-    # 4. Soft-pity
-    bonus_before = ZERO
-    if ps.fail_streak >= cfg.pity_after:
-        diff = ps.fail_streak - cfg.pity_after + 1
-        potential = diff * STEP
-        bonus_before = min(potential, MAX_BONUS)
-    roll_adj = max(ZERO, roll - bonus_before) 
-
-    # 5. Weighted-tier
-    probs = [t.chance for t in cfg.tiers]
-    cum_t = list(accumulate(probs))
-    idx_t = next(i for i,p in enumerate(cum_t) if roll_adj < p)
-    tier: TierConfig = cfg.tiers[idx_t]
 
-    # 6. Weighted-sub
-    # нормалізуємо всередині tier
-    sub_roll = (roll_adj - (cum_t[idx_t-1] if idx_t > 0 else ZERO)) / tier.chance  # тут можеш взяти новий u2 = (roll_adj - lower_bound_tier)/(tier_weight)
-    sub_probs = [r.sub_chance for r in tier.rewards]
-    cum_r = list(accumulate(sub_probs))
-    idx_r = next(i for i,p in enumerate(cum_r) if sub_roll < p)
-    reward: RewardItem = tier.rewards[idx_r]
-    reward.network = None if reward.coin_id in settings.GLOBAL_USD_WALLET_ALIAS else reward.network
+def pick_from_roll(cfg: CaseConfig, raw: bytes, fail_streak: int) -> SpinPick:
+    """
+    Soft-pity and weighted tier/reward selection for one HMAC roll.
+    `fail_streak` is the player's streak before the spin; the returned pick carries the new one.
+    """
+    roll_int = int.from_bytes(raw[:4], "big")
+    roll = Decimal.from_float(roll_int / 2**32)
 
-    prize_amount = Decimal(reward.amount)
-    rate = await rate_cache.get_rate(reward.coin_id)
-    payout_in_usd = prize_amount * rate
+    # Soft-pity
+    bonus_before = pity_bonus(fail_streak, cfg.pity_after)
 
-    # 7. RiskGuard
-    await ensure_reserve_and_limits(cfg.price_usd, payout_in_usd)
+    # Weighted tier & reward via the compiled sampler (roll_adj is applied in its thresholds)
+    sampler = sampler_cache.get(cfg)
+    idx_t, idx_r = sampler.sample(roll_int, pity_level(fail_streak, cfg.pity_after))
+    tier: TierConfig = cfg.tiers[idx_t]
+    reward: RewardItem = tier.rewards[idx_r]
+    # cfg is shared through the cache, so don't write the USD alias back into it
+    reward_network = None if reward.coin_id in settings.GLOBAL_USD_WALLET_ALIAS else reward.network
 
-    # 8. Update player stat
     if reward.sub_chance >= 0.999:  # treat as common vs rare by name if needed
-        ps.fail_streak += 1
+        fail_streak += 1
     else:
-        ps.fail_streak = 0
-        
-    bonus_after = ZERO
-    if ps.fail_streak >= cfg.pity_after:
-        diff_after = ps.fail_streak - cfg.pity_after + 1
-        potential_after = diff_after * STEP
-        bonus_after = min(potential_after, MAX_BONUS)
-        
-    ps.rtp_session = ps.rtp_session + (payout_in_usd / cfg.price_usd)
-    ps.net_loss += cfg.price_usd - payout_in_usd
-    await ps.save()
+        fail_streak = 0
+
+    return SpinPick(
+        hmac_value=raw,
+        roll=roll,
+        tier=tier,
+        reward=reward,
+        reward_network=reward_network,
+        pity_before=bonus_before,
+        pity_after=pity_bonus(fail_streak, cfg.pity_after),
+        fail_streak=fail_streak,
+        amount=sampler.reward_amount(idx_t, idx_r),
+        reward_index=sampler.reward_index(idx_t, idx_r),
+    )
+
+
+def pick_reward(cfg: CaseConfig, server_seed: str, client_seed: str, nonce: int, fail_streak: int) -> SpinPick:
+    """
+    HMAC roll, soft-pity and weighted tier/reward selection for a single spin.
+    """
+    return pick_from_roll(cfg, hmac_roll(server_seed, client_seed, nonce), fail_streak)
+
+
+def player_stat_pipeline(
+    last_state: int,
+    spins: int,
+    reset: List[bool],
+    tail: List[int],
+    rtp: List[Decimal],
+    loss: List[Decimal],
+) -> List[Dict[str, Any]]:
+    """
+    Update pipeline applying precomputed spin outcomes to a PlayerStat.
+    Entry `s` of every list is the outcome for a starting streak of `s`, where
+    `last_state` stands for every streak at maximum pity. If the spins reset
+    the streak it ends at `tail[s]`, otherwise it grows by `spins`.
+    """
+    fail_streak = {"$ifNull": ["$fail_streak", 0]}
+    pick = lambda values: {"$arrayElemAt": [values, "$_state"]}  # noqa: E731
+    return [
+        {"$set": {"_state": {"$min": [fail_streak, last_state]}}},
+        {"$set": {
+            "fail_streak": {"$cond": [pick(reset), pick(tail), {"$add": [fail_streak, spins]}]},
+            "rtp_session": {"$add": [{"$ifNull": ["$rtp_session", ZERO]}, pick(rtp)]},
+            "net_loss": {"$add": [{"$ifNull": ["$net_loss", ZERO]}, pick(loss)]},
+        }},
+        {"$unset": "_state"},
+    ]
+
+
+def branch_totals(
+    branches: List[Optional[List[SpinPick]]],
+    rewards: List[Tuple[str, Money]],
+    rates: Dict[str, Money],
+    price_usd: Decimal,
+) -> Tuple[List[bool], List[int], List[Decimal], List[Decimal], Callable[[SpinPick], Money]]:
+    """
+    Per-branch inputs of `player_stat_pipeline`. Every distinct reward (by
+    `reward_index` into `rewards`) is priced once as an exact `Money` product;
+    branch sums are integer sums at a common scale, converted to Decimal once
+    per branch. The rtp increment is the branch payout divided by the case
+    price in one Decimal division. Also returns the payout function for the picks.
+    """
+    keyed = [[p.reward_index for p in picks] if picks else [] for picks in branches]
+    payouts = {key: rewards[key][1] * rates[rewards[key][0]] for key in set().union(*keyed)}
+    price = Money.from_decimal(price_usd)
+    scale = max([price.scale] + [m.scale for m in payouts.values()])
+    units = {key: m.rescale(scale).units for key, m in payouts.items()}
+    scales = {key: m.scale for key, m in payouts.items()}
+    price_units = price.rescale(scale).units
+
+    reset: List[bool] = []
+    tail: List[int] = []
+    rtp: List[Decimal] = []
+    loss: List[Decimal] = []
+    sums: Dict[Tuple[int, ...], Tuple[Decimal, Decimal]] = {}  # branches often draw the same rewards
+    for picks, keys in zip(branches, keyed):
+        # a branch whose roll falls outside the odds table fails later, the values don't matter
+        if not picks:
+            reset.append(False)
+            tail.append(0)
+            rtp.append(ZERO)
+            loss.append(ZERO)
+            continue
+        resets = 0 in [p.fail_streak for p in picks]
+        reset.append(resets)
+        tail.append(picks[-1].fail_streak if resets else 0)
+        signature = tuple(keys)
+        branch = sums.get(signature)
+        if branch is None:
+            # exponent of the Decimal sums: the finest scale among the branch's payouts
+            branch_scale = max(price.scale, max(map(scales.__getitem__, keys)))
+            step = 10 ** (scale - branch_scale)  # divides every unit count exactly
+            paid = sum(map(units.__getitem__, keys))
+            branch = sums[signature] = (
+                Money(paid // step, branch_scale).to_decimal() / price_usd,
+                Money((price_units * len(keys) - paid) // step, branch_scale).to_decimal(),
+            )
+        rtp.append(branch[0])
+        loss.append(branch[1])
+
+    def payout(pick: SpinPick) -> Money:
+        return payouts[pick.reward_index]
+
+    return reset, tail, rtp, loss, payout
+
+
+async def apply_player_stat(
+    user_id: int,
+    cfg: CaseConfig,
+    raws: List[bytes],
+    session: Optional[AsyncIOMotorClientSession] = None,
+) -> Tuple[List[SpinPick], List[Decimal], Decimal]:
+    """
+    Evaluate consecutive spins of one player and update their PlayerStat with a
+    single atomic find_one_and_update.
+
+    The outcome depends on the stored fail streak, so the spins are evaluated
+    for every distinct starting streak and the update pipeline selects the
+    matching branch server-side; the returned pre-image tells which branch was
+    applied. Returns the picks, their USD payouts and rtp_session before the spins.
+    """
+    last_state = cfg.pity_after + PITY_LEVELS - 1  # streaks from here on share max pity
+    branches: List[Optional[List[SpinPick]]] = []
+    errors: Dict[int, ValueError] = {}
+    for state in range(last_state + 1):
+        fail_streak = state
+        picks: List[SpinPick] = []
+        try:
+            for raw in raws:
+                pick = pick_from_roll(cfg, raw, fail_streak)
+                fail_streak = pick.fail_streak
+                picks.append(pick)
+        except ValueError as e:
+            errors[state] = e
+            branches.append(None)
+            continue
+        branches.append(picks)
+
+    rates: Dict[str, Money] = {}
+    for picks in branches:
+        for pick in picks or ():
+            if pick.reward.coin_id not in rates:
+                rates[pick.reward.coin_id] = Money.from_decimal(rate_cache.get_rate(pick.reward.coin_id))
+
+    reset, tail, rtp, loss, payout = branch_totals(branches, sampler_cache.get(cfg).flat_rewards(), rates, cfg.price_usd)
+
+    before = await PlayerStat.get_motor_collection().find_one_and_update(
+        {"user_id": user_id},
+        player_stat_pipeline(last_state, len(raws), reset, tail, rtp, loss),
+        projection={"fail_streak": 1, "rtp_session": 1},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE,
+        session=session,
+    )
+    fail_streak = before.get("fail_streak", 0) if before else 0
+    rtp_before = before.get("rtp_session", ZERO) if before else ZERO
+
+    # The pipeline chose its branch as min(fail_streak, last_state) of this
+    # same pre-image, so the matching branch here is the one it applied.
+    state = min(fail_streak, last_state)
+    if state in errors:
+        raise errors[state]
+    picks = branches[state]
+    # a branch counted from last_state; until the first reset the real streak
+    # is higher by the excess (the pity, capped at last_state, is the same)
+    offset = fail_streak - state
+    if offset:
+        first_reset = next((i for i, p in enumerate(picks) if p.fail_streak == 0), len(picks))
+        picks = [
+            replace(p, fail_streak=p.fail_streak + offset) if i < first_reset else p
+            for i, p in enumerate(picks)
+        ]
+    return picks, [payout(p).to_decimal() for p in picks], rtp_before
+
+
+def build_spin_log(
+    user_id: int,
+    cfg: CaseConfig,
+    seed_doc: Union[ServerSeed, ChainLink],
+    client_seed: str,
+    nonce: int,
+    pick: SpinPick,
+    payout_in_usd: Decimal,
+    rtp_session: Decimal,
+    rate_snapshot: Tuple[Optional[int], Optional[datetime]] = (None, None),
+) -> SpinLog:
     odds_version = cfg.odds_versions[-1].version
-    # 9. Log spin
-    spin_log =  SpinLog(
+    return SpinLog(
+        id=PydanticObjectId(),
         user_id=user_id,
-        case_id=data_for_spin.case_id,
-        server_seed_id=data_for_spin.server_seed_id,
+        case_id=cfg.case_id,
+        server_seed_id=str(seed_doc.id),
         server_seed_hash=seed_doc.hash,
-        server_seed_seed=server_seed,
-        client_seed=data_for_spin.client_seed,
-        nonce=data_for_spin.nonce,
-        hmac_value=raw,
-        raw_roll=roll,
+        server_seed_seed=seed_doc.seed,
+        client_seed=client_seed,
+        nonce=nonce,
+        fairness_mode="chain" if isinstance(seed_doc, ChainLink) else "hmac",
+        chain_index=seed_doc.index if isinstance(seed_doc, ChainLink) else None,
+        hmac_value=pick.hmac_value,
+        raw_roll=pick.roll,
         table_id=odds_version,
         odds_version=odds_version,
-        case_tier=tier.name,
-        prize_id=reward.coin_id,
+        case_tier=pick.tier.name,
+        prize_id=pick.reward.coin_id,
         stake=cfg.price_usd,
-        payout=prize_amount,
+        payout=Decimal(pick.reward.amount),
         payout_usd=payout_in_usd,
-        pity_before=bonus_before,
-        pity_after=bonus_after,
-        rtp_session=ps.rtp_session,
+        rate_snapshot_id=rate_snapshot[0],
+        rate_snapshot_at=rate_snapshot[1],
+        pity_before=pick.pity_before,
+        pity_after=pick.pity_after,
+        rtp_session=rtp_session,
         created_at=datetime.now(timezone.utc),
     )
-    await spin_log.insert()
+
+
+def build_open_response(spin_log: SpinLog, pick: SpinPick) -> CaseOpenResponse:
     return CaseOpenResponse(
-        server_seed=server_seed,
-        table_id=odds_version,
-        odds_version=odds_version,
+        server_seed=spin_log.server_seed_seed,
+        table_id=spin_log.table_id,
+        odds_version=spin_log.odds_version,
         prize= PrizeItem(
-            coin_amount=(reward.coin_id, reward.network, reward.amount),
-            usd_value=str(payout_in_usd),
-            reward_tier=tier.name
+            coin_amount=(pick.reward.coin_id, pick.reward_network, pick.reward.amount),
+            usd_value=str(spin_log.payout_usd),
+            reward_tier=pick.tier.name
         ),
-        payout=prize_amount,
-        fail_streak=ps.fail_streak,
+        payout=spin_log.payout,
+        fail_streak=pick.fail_streak,
         spin_log_id=spin_log.id
     )
-    # return {
-    #     "server_seed": ss.seed,
-    #     "table_id": cfg.odds_version,
-    #     "odds_version": cfg.odds_version,
-    #     "prize": {
-    #         "coin_amount": reward.coin_amount.to_storage(),
-    #         "usd_value": str(payout_in_usd),
-    #     },
-    #     "payout": prize_amount,
-    #     "fail_streak": ps.fail_streak,
-    # }
+
+
+async def spin(
+    user_id: int,
+    data_for_spin: CaseOpenRequest,
+    session: Optional[AsyncIOMotorClientSession] = None,
+    timer: Optional[StageTimer] = None,
+) -> Tuple[CaseOpenResponse, SpinPick, SpinLog]:
+    """
+    Reveal the seed, roll, and update the player stat and reserve. Money does
+    not move here and the returned log is not stored yet; see `open_case`.
+    """
+    timer = timer or StageTimer()
+    cfg: Optional[CaseConfig] = await case_cache.get_case(data_for_spin.case_id)
+    if not cfg:
+        raise HTTPException(404, "invalid_case")
+
+    if data_for_spin.fairness_mode == "chain":
+        seed_doc, = await hash_chains.advance(user_id, data_for_spin.chain_id, 1, session=session)
+    else:
+        seed_doc = await FairnessService.reveal_and_verify(
+            commit_id=PydanticObjectId(data_for_spin.server_seed_id),
+            user_id=user_id,
+            session=session)
+    timer.mark("reveal")
+
+    # 3-7. Roll, soft-pity, tier & reward, and the player stat in one update
+    raw = hmac_roll(seed_doc.seed, data_for_spin.client_seed, data_for_spin.nonce)
+    # the snapshot apply_player_stat prices with: it reads rates before its first await
+    rate_snapshot = rate_cache.snapshot_id
+    (pick,), (payout_in_usd,), rtp_before = await apply_player_stat(user_id, cfg, [raw], session=session)
+    timer.mark("player_stat")
+
+    # 8. RiskGuard
+    await ensure_reserve_and_limits(cfg.price_usd, payout_in_usd, session=session)
+    timer.mark("reserve")
+
+    # 9. Spin log, id allocated here
+    spin_log = build_spin_log(
+        user_id=user_id,
+        cfg=cfg,
+        seed_doc=seed_doc,
+        client_seed=data_for_spin.client_seed,
+        nonce=data_for_spin.nonce,
+        pick=pick,
+        payout_in_usd=payout_in_usd,
+        rtp_session=rtp_before + payout_in_usd / cfg.price_usd,
+        rate_snapshot=rate_snapshot,
+    )
+    return build_open_response(spin_log, pick), pick, spin_log
+
+
+async def open_case(user_id: int, data: CaseOpenRequest, timer: Optional[StageTimer] = None) -> CaseOpenResponse:
+    """
+    Charge, spin and prize credit of one case open in a single transaction,
+    re-run from scratch on transient errors; the spin log is handed to the
+    write-behind writer after commit. `timer` collects the latency of every
+    stage (of the last attempt).
+    """
+    timer = timer or StageTimer()
+    cfg: Optional[CaseConfig] = await case_cache.get_case(data.case_id)
+    if not cfg:
+        raise HTTPException(404, "invalid_case")
+
+    async def pipeline(tx: Transaction) -> Tuple[CaseOpenResponse, SpinLog]:
+        timer.reset()
+        session = tx.session
+        if not await InternalBalanceService.charge_usd(user_id, cfg.price_usd, tx=tx):
+            raise BalanceTooLow(None)
+        timer.mark("charge")
+
+        result, pick, spin_log = await spin(user_id, data, session=session, timer=timer)
+
+        await InternalBalanceService.adjust_balance(
+            user_id=user_id,
+            coin=pick.reward.coin_id,
+            network=pick.reward_network,
+            delta=Decimal(pick.reward.amount),
+            tx=tx,
+            reason="case_reward",
+        )
+        timer.mark("credit")
+        return result, spin_log
+
+    result, spin_log = await DataBase.run_transaction(pipeline)
+    timer.mark("commit")
+    # write-behind: spooled to disk now, inserted into Mongo in the next batch
+    await spin_log_writer.submit([spin_log])
+    timer.mark("log")
+    await publish(user_id, [{"type": "spin", "case_id": data.case_id, "results": [result.model_dump(mode="json")]}])
+    logger.info("case open user=%s case=%s %s", user_id, data.case_id, timer)
+    return result
+
+
+async def spin_batch(user_id: int, data: CaseOpenBatchRequest) -> CaseOpenBatchResponse:
+    """
+    Open the same case `data.count` times in one transaction: a single charge for the
+    total price, all rolls evaluated in memory with the pity state carried from spin
+    to spin, then bulk writes for seeds, reserve, player stat and prizes; the logs
+    are written behind after commit.
+    Every spin keeps its own (server_seed or chain link, client_seed, nonce) HMAC roll; the
+    transaction is re-run from scratch on transient errors.
+    """
+    cfg: Optional[CaseConfig] = await case_cache.get_case(data.case_id)
+    if not cfg:
+        raise HTTPException(404, "invalid_case")
+    total_price = cfg.price_usd * data.count
+
+    async def pipeline(tx: Transaction) -> Tuple[List[SpinLog], List[SpinPick]]:
+        session = tx.session
+        # 1. One charge for the whole batch
+        if not await InternalBalanceService.charge_usd(user_id, total_price, tx=tx):
+            raise BalanceTooLow(None)
+
+        # 2. Reveal every committed seed (or the next `count` chain links) at once
+        if data.fairness_mode == "chain":
+            seed_docs = await hash_chains.advance(user_id, data.chain_id, data.count, session=session)
+        else:
+            seed_docs = await FairnessService.reveal_many(
+                commit_ids=[PydanticObjectId(s.server_seed_id) for s in data.seeds],
+                user_id=user_id,
+                session=session,
+            )
+
+        # 3. Evaluate all spins, carrying the pity state, and update the player stat at once
+        rate_snapshot = rate_cache.snapshot_id
+        picks, payouts, rtp_session = await apply_player_stat(
+            user_id,
+            cfg,
+            [hmac_roll(seed_doc.seed, data.client_seed, seed.nonce) for seed_doc, seed in zip(seed_docs, data.seeds)],
+            session=session,
+        )
+
+        # 4. Reserve for every payout, in spin order
+        await ensure_reserve_and_limits_many(
+            [(cfg.price_usd, payout) for payout in payouts],
+            session=session,
+        )
+
+        # 5. Logs, written behind once the transaction commits
+        spin_logs: List[SpinLog] = []
+        for seed_doc, seed, pick, payout_in_usd in zip(seed_docs, data.seeds, picks, payouts):
+            rtp_session += payout_in_usd / cfg.price_usd
+            spin_logs.append(build_spin_log(
+                user_id=user_id,
+                cfg=cfg,
+                seed_doc=seed_doc,
+                client_seed=data.client_seed,
+                nonce=seed.nonce,
+                pick=pick,
+                payout_in_usd=payout_in_usd,
+                rtp_session=rtp_session,
+                rate_snapshot=rate_snapshot,
+            ))
+        # 6. Credit all prizes in one bulk write
+        await InternalBalanceService.credit_many(
+            user_id=user_id,
+            credits=[(p.reward.coin_id, p.reward_network, Decimal(p.reward.amount)) for p in picks],
+            tx=tx,
+        )
+        return spin_logs, picks
+
+    spin_logs, picks = await DataBase.run_transaction(pipeline)
+    await spin_log_writer.submit(spin_logs)
+    results = [build_open_response(log, pick) for log, pick in zip(spin_logs, picks)]
+    await publish(user_id, [{"type": "spin", "case_id": cfg.case_id, "results": [r.model_dump(mode="json") for r in results]}])
+    return CaseOpenBatchResponse(
+        case_id=cfg.case_id,
+        count=data.count,
+        total_price=total_price,
+        results=results,
+    )
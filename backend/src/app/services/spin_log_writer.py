@@ -0,0 +1,394 @@
+# services/spin_log_writer.py
+import asyncio
+import fcntl
+import logging
+import os
+import shutil
+import time
+
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import bson
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.db.models.player import SpinLog
+from app.db.mongo_codec import codec_options
+from app.core.config.settings import Settings
+from app.core.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+settings: Settings = get_settings()
+
+DUPLICATE_KEY = 11000
+LOCK_FILE = "owner.lock"
+DEAD_LETTER_FILE = "dead_letter.bson"
+
+
+def read_segment(path: Path) -> List[Dict[str, Any]]:
+    """
+    Decode a spool segment. A record cut short by a crash was never
+    acknowledged, so a torn tail is dropped.
+    """
+    data = path.read_bytes()
+    docs: List[Dict[str, Any]] = []
+    offset = 0
+    while offset + 4 <= len(data):
+        size = int.from_bytes(data[offset:offset + 4], "little")
+        if size < 5 or offset + size > len(data):
+            logger.warning("Dropping torn record at %s:%s", path, offset)
+            break
+        docs.append(bson.decode(data[offset:offset + size], codec_options=codec_options))
+        offset += size
+    return docs
+
+
+class SpinLogWriter:
+    """
+    Write-behind batcher for SpinLog documents.
+
+    `submit` appends the logs to an fsync'd spool segment (one fsync per group
+    of concurrent submits) and queues them; a background task flushes the queue
+    with `insert_many(ordered=False)` when `batch_size` logs are waiting or
+    `flush_interval_seconds` have passed. Ids are allocated client-side, so a
+    replayed spool only produces duplicate-key errors for logs already stored.
+
+    Every process spools into its own directory, held with a flock taken
+    before the directory appears under its final name; on start the writer
+    replays directories whose owner is gone. A batch that fails every flush
+    attempt is held (at most `max_held` logs, the rest wait for the replay)
+    and retried first on the next flush cycle. Logs Mongo rejects one by one
+    are held alone, and after `max_doc_failures` rejections moved to the
+    dead-letter segment next to the spool directories.
+    """
+    def __init__(
+        self,
+        spool_dir: Path,
+        batch_size: int = 500,
+        flush_interval_seconds: float = 0.2,
+        max_queue: int = 20000,
+        segment_bytes: int = 4 * 1024 * 1024,
+        max_held: int = 5000,
+        max_doc_failures: int = 3,
+    ):
+        self.spool_dir = Path(spool_dir)
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_queue = max_queue
+        self.segment_bytes = segment_bytes
+        self.max_held = max_held
+        self.max_doc_failures = max_doc_failures
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._spooler: Optional[asyncio.Task] = None
+        self._pending: List[Tuple[bytes, int, asyncio.Future]] = []
+        self._spool_wake = asyncio.Event()
+        self._closing = False
+        self._dir: Optional[Path] = None
+        self._lock_fd: Optional[int] = None
+        self._segment_no = 0
+        self._segment: Optional[Any] = None
+        self._segment_size = 0
+        self._unflushed: Dict[int, int] = {}  # segment number -> logs not yet in Mongo
+        self._held: List[Tuple[int, Dict[str, Any]]] = []  # not stored by the last flush
+        self._doc_failures: Dict[Any, int] = {}  # log id -> rejections so far
+
+        self.submitted = 0
+        self.flushed = 0
+        self.flush_errors = 0
+        self.replayed = 0
+        self.dead_lettered = 0
+        self._latencies: Deque[float] = deque(maxlen=1000)
+        self._last_flush_at: Optional[float] = None
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    async def submit(self, logs: List[SpinLog]) -> None:
+        """
+        Durably spool `logs` and queue them for Mongo. Returns once the spool
+        is fsync'd; waits for room when the queue is full.
+        """
+        if not logs:
+            return
+        queue = self._queue
+        if queue is None:
+            # writer not running (scripts, tests, shutdown): write through
+            await SpinLog.insert_many(logs)
+            return
+        docs = [log.model_dump(by_alias=True) for log in logs]
+        data = b"".join(bson.encode(doc, codec_options=codec_options) for doc in docs)
+        done = asyncio.get_running_loop().create_future()
+        self._pending.append((data, len(docs), done))
+        self._spool_wake.set()
+        segment_no = await done
+        # anything put after stop() drained the queue is still replayed from the spool
+        for doc in docs:
+            await queue.put((segment_no, doc))
+        self.submitted += len(docs)
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        pct = lambda q: round(latencies[min(int(q * len(latencies)), len(latencies) - 1)], 2) if latencies else None  # noqa: E731
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_max": self.max_queue,
+            "submitted": self.submitted,
+            "flushed": self.flushed,
+            "flush_errors": self.flush_errors,
+            "replayed": self.replayed,
+            "held": len(self._held),
+            "dead_lettered": self.dead_lettered,
+            "spool_segments": len(self._unflushed),
+            "unflushed": sum(self._unflushed.values()),
+            "flush_latency_ms": {"p50": pct(0.5), "p95": pct(0.95), "max": latencies[-1] if latencies else None},
+            "last_flush_age_sec": round(time.monotonic() - self._last_flush_at, 3) if self._last_flush_at else None,
+        }
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    async def start(self) -> None:
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        await self.replay()
+        # lock under a hidden name that replay() skips, then publish it
+        name = f"{os.getpid()}-{time.time_ns()}"
+        staging = self.spool_dir / f".{name}"
+        staging.mkdir()
+        self._lock_fd = os.open(staging / LOCK_FILE, os.O_CREAT | os.O_RDWR)
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._dir = staging.rename(self.spool_dir / name)
+        self._open_segment()
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._closing = False
+        self._spooler = asyncio.create_task(self._spool_loop())
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """
+        Stop accepting logs, flush whatever is queued and release the spool.
+        Logs that could not be flushed stay on disk for the next start.
+        """
+        if self._queue is None:
+            return
+        queue, self._queue = self._queue, None
+        self._closing = True
+        self._spool_wake.set()
+        await self._spooler
+        await queue.put(None)  # the flusher finishes its batch and exits
+        await self._flusher
+        batch = []
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is not None:
+                batch.append(item)
+        for i in range(0, len(batch), self.batch_size):
+            await self._flush(batch[i:i + self.batch_size])
+        if self._held:
+            await self._flush([])
+
+        self._segment.close()
+        if not any(self._unflushed.values()):
+            shutil.rmtree(self._dir, ignore_errors=True)
+        os.close(self._lock_fd)
+        logger.info("SpinLog writer stopped: %s", self.stats())
+
+    async def replay(self) -> int:
+        """
+        Insert every log found in spool directories of dead processes.
+        Hidden directories are still being set up and hold no logs.
+        """
+        replayed = 0
+        for owner in sorted(p for p in self.spool_dir.iterdir() if p.is_dir() and not p.name.startswith(".")):
+            fd = os.open(owner / LOCK_FILE, os.O_CREAT | os.O_RDWR)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue  # owner is alive
+            try:
+                for segment in sorted(owner.glob("*.bson")):
+                    docs = read_segment(segment)
+                    for i in range(0, len(docs), self.batch_size):
+                        chunk = docs[i:i + self.batch_size]
+                        rejected = await self._insert(chunk)
+                        if rejected:
+                            await asyncio.to_thread(self._dead_letter, [chunk[j] for j in rejected])
+                    replayed += len(docs)
+                    segment.unlink()
+            finally:
+                os.close(fd)
+            shutil.rmtree(owner, ignore_errors=True)
+        if replayed:
+            logger.info("Replayed %s spooled spin logs", replayed)
+        self.replayed += replayed
+        return replayed
+
+    # ------------------------------------------------------------------
+    # Spool
+    # ------------------------------------------------------------------
+    def _open_segment(self) -> None:
+        self._segment_no += 1
+        self._segment = open(self._dir / f"{self._segment_no:08d}.bson", "ab")
+        self._segment_size = 0
+        self._unflushed[self._segment_no] = 0
+
+    def _write(self, data: bytes) -> None:
+        self._segment.write(data)
+        self._segment.flush()
+        os.fsync(self._segment.fileno())
+
+    async def _spool_loop(self) -> None:
+        while True:
+            await self._spool_wake.wait()
+            self._spool_wake.clear()
+            if not self._pending:
+                if self._closing:
+                    return
+                continue
+            # group commit: everything submitted since the last fsync
+            group, self._pending = self._pending, []
+            data = b"".join(d for d, _, _ in group)
+            try:
+                await asyncio.to_thread(self._write, data)
+            except OSError as e:
+                for _, _, done in group:
+                    done.set_exception(e)
+                continue
+            segment_no = self._segment_no
+            self._segment_size += len(data)
+            self._unflushed[segment_no] += sum(n for _, n, _ in group)
+            for _, _, done in group:
+                done.set_result(segment_no)
+            self._spool_wake.set()  # re-check pending / closing
+            if self._segment_size >= self.segment_bytes:
+                self._segment.close()
+                self._open_segment()
+                self._drop_flushed_segments()
+
+    def _drop_flushed_segments(self) -> None:
+        for segment_no, left in list(self._unflushed.items()):
+            if left == 0 and segment_no != self._segment_no:
+                (self._dir / f"{segment_no:08d}.bson").unlink(missing_ok=True)
+                del self._unflushed[segment_no]
+
+    # ------------------------------------------------------------------
+    # Flush
+    # ------------------------------------------------------------------
+    async def _flush_loop(self) -> None:
+        queue = self._queue
+        while True:
+            try:
+                # a held batch is retried every cycle, even with nothing new queued
+                first = await (asyncio.wait_for(queue.get(), self.flush_interval_seconds) if self._held else queue.get())
+            except asyncio.TimeoutError:
+                await self._flush([])
+                continue
+            if first is None:
+                return
+            batch = [first]
+            closing = False
+            deadline = time.monotonic() + self.flush_interval_seconds
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+            if closing:
+                return
+
+    async def _flush(self, batch: List[Tuple[int, Dict[str, Any]]]) -> None:
+        batch, self._held = self._held + batch, []
+        if not batch:
+            return
+        started = time.perf_counter()
+        for attempt in range(5):
+            try:
+                rejected = await self._insert([doc for _, doc in batch])
+                break
+            except PyMongoError as e:
+                self.flush_errors += 1
+                logger.error("SpinLog flush of %s logs failed (attempt %s): %s", len(batch), attempt + 1, e)
+                await asyncio.sleep(0.1 * 2 ** attempt)
+        else:
+            # still spooled on disk: retried with the next batch, or replayed by the next start
+            self._hold(batch)
+            return
+        self._latencies.append((time.perf_counter() - started) * 1000)
+        self._last_flush_at = time.monotonic()
+
+        retry, dead = [], []
+        for i in rejected:
+            segment_no, doc = batch[i]
+            failures = self._doc_failures.get(doc["_id"], 0) + 1
+            if failures < self.max_doc_failures:
+                self._doc_failures[doc["_id"]] = failures
+                retry.append(batch[i])
+            else:
+                self._doc_failures.pop(doc["_id"], None)
+                dead.append(batch[i])
+        if dead:
+            try:
+                await asyncio.to_thread(self._dead_letter, [doc for _, doc in dead])
+            except OSError as e:
+                logger.error("Could not dead-letter %s spin logs: %s", len(dead), e)
+                retry += dead
+                dead = []
+        self._hold(retry)
+
+        done = set(rejected)
+        stored = [item for i, item in enumerate(batch) if i not in done]
+        self.flushed += len(stored)
+        for segment_no, doc in stored + dead:
+            self._doc_failures.pop(doc["_id"], None)
+            self._unflushed[segment_no] -= 1
+        self._drop_flushed_segments()
+
+    def _hold(self, batch: List[Tuple[int, Dict[str, Any]]]) -> None:
+        if len(batch) > self.max_held:
+            # the rest stays in its spool segment until the next start replays it
+            logger.error("Holding %s of %s unflushed spin logs for the next start", len(batch) - self.max_held, len(batch))
+            batch = batch[:self.max_held]
+        self._held = batch
+
+    def _dead_letter(self, docs: List[Dict[str, Any]]) -> None:
+        path = self.spool_dir / DEAD_LETTER_FILE
+        with open(path, "ab") as f:
+            f.write(b"".join(bson.encode(doc, codec_options=codec_options) for doc in docs))
+            f.flush()
+            os.fsync(f.fileno())
+        self.dead_lettered += len(docs)
+        logger.error("Moved %s spin logs Mongo keeps rejecting to %s", len(docs), path)
+
+    async def _insert(self, docs: List[Dict[str, Any]]) -> List[int]:
+        """
+        Insert `docs`; returns the indexes of the ones Mongo rejected. Logs that
+        are already stored count as inserted; errors of the whole write raise.
+        """
+        try:
+            await SpinLog.get_motor_collection().insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            if e.details.get("writeConcernErrors"):
+                raise
+            return sorted(
+                err["index"] for err in e.details.get("writeErrors", []) if err.get("code") != DUPLICATE_KEY
+            )
+        return []
+
+
+spin_log_writer = SpinLogWriter(
+    spool_dir=settings.SPIN_LOG_SPOOL_DIR,
+    batch_size=settings.SPIN_LOG_BATCH_SIZE,
+    flush_interval_seconds=settings.SPIN_LOG_FLUSH_SECONDS,
+    max_queue=settings.SPIN_LOG_QUEUE_MAX,
+)
@@ -0,0 +1,140 @@
+# services/spin_sampler.py
+from bisect import bisect_right
+from decimal import Decimal, ROUND_CEILING
+from fractions import Fraction
+from itertools import accumulate
+from math import ceil
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.models.case_config import TierConfig
+from app.utils.money import Money
+
+ROLL_SPACE = 2**32
+
+ZERO = Decimal("0")
+STEP = Decimal("0.02")
+MAX_BONUS = Decimal("0.20")
+PITY_LEVELS = int((MAX_BONUS / STEP).to_integral_value(rounding=ROUND_CEILING))
+
+
+def pity_bonus(fail_streak: int, pity_after: int) -> Decimal:
+    """
+    Soft-pity shift subtracted from the roll for the given fail streak.
+    """
+    if fail_streak >= pity_after:
+        diff = fail_streak - pity_after + 1
+        return min(diff * STEP, MAX_BONUS)
+    return ZERO
+
+
+def pity_level(fail_streak: int, pity_after: int) -> int:
+    """
+    Index of the precompiled threshold table matching `pity_bonus`.
+    """
+    if fail_streak < pity_after:
+        return 0
+    return min(fail_streak - pity_after + 1, PITY_LEVELS)
+
+
+def _threshold(bound: Decimal, bonus: Decimal) -> int:
+    """
+    Smallest integer roll that no longer satisfies `max(0, roll/2^32 - bonus) < bound`.
+    Computed with exact rationals, so `roll_int < threshold` is the same test the
+    Decimal path performs on `roll_adj`.
+    """
+    value = Fraction(bound)
+    if value <= 0:
+        return 0
+    return ceil((value + Fraction(bonus)) * ROLL_SPACE)
+
+
+class SpinSampler:
+    """
+    Odds table of one (case_id, odds_version) compiled to integer thresholds
+    over the 2^32 roll space, one table per soft-pity level, plus the reward
+    amounts as `Money`.
+    """
+    __slots__ = ("case_id", "odds_version", "_tier_bounds", "_reward_bounds", "_amounts", "_offsets", "_flat")
+
+    def __init__(self, tiers: Sequence[TierConfig], case_id: str = "", odds_version: str = ""):
+        self.case_id = case_id
+        self.odds_version = odds_version
+
+        cum_t = list(accumulate(t.chance for t in tiers))
+        lower_t = [ZERO] + cum_t[:-1]
+        cum_r = [list(accumulate(r.sub_chance for r in t.rewards)) for t in tiers]
+
+        self._tier_bounds: List[List[int]] = []
+        self._reward_bounds: List[List[List[int]]] = []
+        for level in range(PITY_LEVELS + 1):
+            bonus = min(level * STEP, MAX_BONUS)
+            self._tier_bounds.append([_threshold(p, bonus) for p in cum_t])
+            self._reward_bounds.append([
+                [_threshold(lower_t[i] + p * tier.chance, bonus) for p in cum_r[i]]
+                for i, tier in enumerate(tiers)
+            ])
+        self._amounts: List[List[Money]] = [
+            [Money.from_decimal(Decimal(r.amount)) for r in tier.rewards] for tier in tiers
+        ]
+        # rewards numbered across tiers, for integer-keyed tallies
+        self._offsets: List[int] = [0] + list(accumulate(len(t.rewards) for t in tiers))[:-1]
+        self._flat: List[Tuple[str, Money]] = [
+            (r.coin_id, self._amounts[i][j]) for i, tier in enumerate(tiers) for j, r in enumerate(tier.rewards)
+        ]
+
+    def tier_bounds(self, level: int) -> List[int]:
+        return self._tier_bounds[level]
+
+    def reward_bounds(self, level: int) -> List[List[int]]:
+        return self._reward_bounds[level]
+
+    def reward_amount(self, idx_t: int, idx_r: int) -> Money:
+        return self._amounts[idx_t][idx_r]
+
+    def reward_index(self, idx_t: int, idx_r: int) -> int:
+        return self._offsets[idx_t] + idx_r
+
+    def flat_rewards(self) -> List[Tuple[str, Money]]:
+        """(coin_id, amount) of every reward, by `reward_index`."""
+        return self._flat
+
+    def sample(self, roll_int: int, level: int = 0) -> Tuple[int, int]:
+        """
+        Return (tier index, reward index) for a 32-bit roll at the given pity level.
+        Raises ValueError if the roll falls outside the configured chances.
+        """
+        tier_bounds = self._tier_bounds[level]
+        idx_t = bisect_right(tier_bounds, roll_int)
+        if idx_t == len(tier_bounds):
+            raise ValueError(f"roll {roll_int} is outside tier chances of {self.case_id}")
+        reward_bounds = self._reward_bounds[level][idx_t]
+        idx_r = bisect_right(reward_bounds, roll_int)
+        if idx_r == len(reward_bounds):
+            raise ValueError(f"roll {roll_int} is outside reward chances of {self.case_id}")
+        return idx_t, idx_r
+
+
+class SamplerCache:
+    """
+    Process-wide compiled samplers, one per case. An entry is rebuilt as soon as
+    the case config carries a newer odds version.
+    """
+    def __init__(self):
+        self._samplers: Dict[str, SpinSampler] = {}
+
+    def get(self, cfg) -> SpinSampler:
+        version = cfg.odds_versions[-1].version
+        sampler = self._samplers.get(cfg.case_id)
+        if sampler is None or sampler.odds_version != version:
+            sampler = SpinSampler(cfg.tiers, case_id=cfg.case_id, odds_version=version)
+            self._samplers[cfg.case_id] = sampler
+        return sampler
+
+    def invalidate(self, case_id: Optional[str] = None) -> None:
+        if case_id is None:
+            self._samplers.clear()
+        else:
+            self._samplers.pop(case_id, None)
+
+
+sampler_cache = SamplerCache()
@@ -0,0 +1,164 @@
+# services/wallet_view.py
+import logging
+
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorClientSession
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config.coin_registry import CoinRegistry
+from app.core.config.settings import Settings, get_settings
+from app.db.models.balance_ledger import LedgerHead
+from app.db.models.internal_balance import InternalBalance
+from app.db.models.wallet_view import WalletView
+from app.schemas.wallet import UserTokenWallet, UserWalletsGrouped
+from app.utils.coin_keys import to_symbol
+
+logger = logging.getLogger(__name__)
+settings: Settings = get_settings()
+
+ZERO = Decimal("0")
+
+
+def row_key(coin: str, network: Optional[str]) -> str:
+    return f"{coin}|{network or ''}"
+
+
+def group_wallets(rows: Dict[str, Decimal]) -> UserWalletsGrouped:
+    """
+    Group `row_key -> balance` by coin, one balance per network. Coins missing
+    from the registry and balances that round to zero are left out.
+    """
+    result: Dict[str, UserTokenWallet] = {}
+    for key in sorted(rows):
+        coin, _, network = key.partition("|")
+        balance = rows[key]
+        meta = CoinRegistry.get(to_symbol(coin))
+        if not meta or round(balance) == 0:
+            continue
+        if coin in result:
+            result[coin].balance[network or None] = balance
+        else:
+            result[coin] = UserTokenWallet(coin=meta, balance={network or None: balance})
+    return UserWalletsGrouped(result)
+
+
+class WalletViews:
+    """
+    The grouped /wallet/all response of each user, maintained rather than
+    rebuilt. The balance ledger hands every journaled batch to `apply`, which
+    adds the deltas to the user's `WalletView` in the same transaction, but
+    only if the view is at the batch's previous sequence number. A view that
+    missed a write (or predates the ledger) is rebuilt from `InternalBalance`
+    on the next read.
+
+    The ledger sequence number is the ETag, so an unchanged wallet costs one
+    primary-key read and a 304. This worker also keeps the rendered body of
+    its `max_users` most recent users.
+    """
+    def __init__(self, max_users: int = 10_000):
+        self.max_users = max_users
+        self._bodies: "OrderedDict[int, Tuple[int, bytes]]" = OrderedDict()
+        self.hits = {"not_modified": 0, "memory": 0, "view": 0, "rebuilt": 0}
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    async def apply(
+        self,
+        user_id: int,
+        first_seq: int,
+        deltas: List[Tuple[str, Optional[str], Decimal]],
+        session: Optional[AsyncIOMotorClientSession] = None,
+    ) -> bool:
+        """Add ledger entries `first_seq`.. to the view; False if the view was not at `first_seq - 1`."""
+        inc: Dict[str, Decimal] = {}
+        for coin, network, delta in deltas:
+            field = f"rows.{row_key(coin, network)}"
+            inc[field] = inc.get(field, ZERO) + delta
+        result = await WalletView.get_motor_collection().update_one(
+            {"_id": user_id, "seq": first_seq - 1},
+            {"$inc": inc, "$set": {"seq": first_seq + len(deltas) - 1}},
+            session=session,
+        )
+        return result.modified_count == 1
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    @staticmethod
+    async def seq(user_id: int) -> int:
+        head = await LedgerHead.get_motor_collection().find_one({"_id": user_id}, {"seq": 1})
+        return head["seq"] if head else 0
+
+    @staticmethod
+    def etag(user_id: int, seq: int) -> str:
+        return f'"{user_id}.{seq}"'
+
+    def not_modified(self, if_none_match: Optional[str], etag: str) -> bool:
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in tags or etag in tags:
+            self.hits["not_modified"] += 1
+            return True
+        return False
+
+    async def body(self, user_id: int, seq: int) -> Tuple[int, bytes]:
+        """(seq, JSON body) of the user's wallets as of `seq` or later."""
+        cached = self._bodies.get(user_id)
+        if cached is not None and cached[0] == seq:
+            self._bodies.move_to_end(user_id)
+            self.hits["memory"] += 1
+            return cached
+
+        view = await WalletView.get_motor_collection().find_one({"_id": user_id})
+        if view is not None and view["seq"] >= seq:
+            # a newer view means a write landed after `seq` was read; serve it
+            seq, rows = view["seq"], view["rows"]
+            self.hits["view"] += 1
+        else:
+            seq, rows = await self.rebuild(user_id)
+            self.hits["rebuilt"] += 1
+        body = group_wallets(rows).model_dump_json().encode()
+        self._bodies[user_id] = (seq, body)
+        self._bodies.move_to_end(user_id)
+        while len(self._bodies) > self.max_users:
+            self._bodies.popitem(last=False)
+        return seq, body
+
+    async def rebuild(self, user_id: int, attempts: int = 3) -> Tuple[int, Dict[str, Decimal]]:
+        """
+        Recompute the view from `InternalBalance` and store it. The sequence
+        number is read before and after; a write in between means another
+        attempt, and the view is not stored if the balances never hold still.
+        """
+        for _ in range(attempts):
+            seq = await self.seq(user_id)
+            rows = {
+                row_key(b["coin"], b.get("network")): Decimal(b["balance"])
+                async for b in InternalBalance.get_motor_collection().find(
+                    {"user_id": user_id}, {"_id": 0, "coin": 1, "network": 1, "balance": 1})
+            }
+            if await self.seq(user_id) == seq:
+                break
+        else:
+            logger.warning("Wallet view of user %s not stored: balances kept changing", user_id)
+            return seq, rows
+        try:
+            await WalletView.get_motor_collection().update_one(
+                {"_id": user_id, "seq": {"$lt": seq}},
+                {"$set": {"seq": seq, "rows": rows}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            pass  # the view is already at `seq` or later
+        return seq, rows
+
+    def stats(self) -> Dict[str, Any]:
+        return {"users": len(self._bodies), **self.hits}
+
+
+wallet_views = WalletViews(max_users=settings.WALLET_VIEW_CACHE_SIZE)
@@ -1,6 +1,7 @@
 from decimal import Decimal
 from fastapi import Depends, HTTPException, status
-from typing import Optional
+from datetime import datetime
+from typing import Optional, Tuple
 
 from app.services.internal_balance_service import InternalBalanceService
 from app.services.rate_cache import rate_cache
@@ -37,6 +38,7 @@ class WithdrawalService:
         status_str: str,
         network: str,
         rate: Optional[Decimal] = None,
+        rate_snapshot: Tuple[Optional[int], Optional[datetime]] = (None, None),
     ) -> WithdrawalLog:
         log = WithdrawalLog(
             user_id=user_id,
@@ -45,6 +47,8 @@ class WithdrawalService:
             to_address=to_address,
             amount_usdt=amount_usdt,
             conversion_rate=rate or Decimal("0"),
+            rate_snapshot_id=rate_snapshot[0],
+            rate_snapshot_at=rate_snapshot[1],
             status=status_str,
         )
         await log.insert()
@@ -101,7 +105,8 @@ class WithdrawalService:
         await self.deduct_internal_balance(user_id, amount_usd)
 
         # 4) fetch conversion rate
-        rate = await rate_cache.get_rate(coin)
+        rate = rate_cache.get_rate(coin)
+        rate_snapshot = rate_cache.snapshot_id
 
         # 5) create log in pending_review
         log = await self.create_withdrawal_log(
@@ -112,6 +117,7 @@ class WithdrawalService:
             status_str="pending_review",
             network=network,
             rate=rate,
+            rate_snapshot=rate_snapshot,
         )
         return log
 
@@ -166,7 +172,8 @@ class WithdrawalService:
         await self.deduct_internal_balance(user_id, amount_usd)
 
         # 4) rate
-        rate = await rate_cache.get_rate(coin)
+        rate = rate_cache.get_rate(coin)
+        rate_snapshot = rate_cache.snapshot_id
 
         # 5) log pending
         log = await self.create_withdrawal_log(
@@ -177,6 +184,7 @@ class WithdrawalService:
             status_str='pending',
             network=network,
             rate=rate,
+            rate_snapshot=rate_snapshot,
         )
 
         # 6) execute transaction
@@ -10,7 +10,7 @@ from app.services.blockchain.factory import BlockchainClientFactory
 from app.api.deps import get_network_registry
 from app.services.rate_cache import rate_cache
 from app.services.internal_balance_service import InternalBalanceService
-from app.services.deposit_service import DepositService
+from app.services.deposit_service import DepositService, publish_status
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +20,8 @@ async def monitor_deposits():
     Моніторинг депозитів для всіх мереж
     """
     try:
+        # курси з Redis (або з файлу знімка): у воркері Celery немає підписки на оновлення
+        await rate_cache.warm_start()
         # Використовуємо кешований NetworkRegistry
         registry = get_network_registry()
         factory = BlockchainClientFactory(registry)
@@ -52,7 +54,7 @@ async def monitor_deposits():
                             continue
                             
                         # Отримуємо курс конвертації в USD
-                        usd_rate = await rate_cache.get_rate(wallet.coin)
+                        usd_rate = rate_cache.get_rate(wallet.coin)
                         amount_usd = Decimal(tx['value']) * usd_rate
                         
                         # Створюємо запис в DepositLog через сервіс
@@ -110,6 +112,9 @@ async def confirm_deposits():
                 if client.is_transaction_confirmed(deposit.tx_hash, required_confirmations):
                     deposit.status = 'confirmed'
                     await deposit.save()
+                    wallet = await ExternalWallet.get(deposit.external_wallet_id)
+                    if wallet:
+                        await publish_status(wallet.user_id, deposit)
                     
                     logger.info(f"Deposit {deposit.tx_hash} confirmed")
                     
@@ -4,7 +4,7 @@ from decimal import Decimal
 import logging
 import asyncio
 
-from app.db.init_db import init_db
+from app.workers.init_worker import init_worker_db
 from app.db.models.external_wallet import ExternalWallet
 from app.db.models.deposit_log import DepositLog
 from app.services.blockchain.factory import BlockchainClientFactory
@@ -19,7 +19,9 @@ def monitor_deposits():
     asyncio.run(_monitor_deposits())
 
 async def _monitor_deposits():
-    await init_db()
+    await init_worker_db()
+    # курси з Redis (або з файлу знімка): у воркері Celery немає підписки на оновлення
+    await rate_cache.warm_start()
     registry = NetworkRegistry()
     factory = BlockchainClientFactory(registry)
 
@@ -48,7 +50,7 @@ async def _monitor_deposits():
                 network = wallet.network
 
                 # 6. Курс до USD
-                usd_rate = await rate_cache.get_rate(coin)
+                usd_rate = rate_cache.get_rate(coin)
                 amount_usd = Decimal(tx['value']) * usd_rate
 
                 # 7. Створити DepositLog
@@ -66,7 +68,9 @@ async def _monitor_deposits():
                 await deposit.insert()
 
                 # 8. Оновити внутрішній баланс
-                await InternalBalanceService.adjust_balance(wallet.user_id, coin, Decimal(tx['value']))
+                await InternalBalanceService.adjust_balance(
+                    wallet.user_id, coin, network, Decimal(tx['value']), reason="deposit"
+                )
 
                 logger.info(f"Deposit {tx['hash']} for user {wallet.user_id} ({coin}) на {tx['value']} (${amount_usd})")
         except Exception as e:
@@ -0,0 +1,195 @@
+# src/app/utils/money.py
+from decimal import (
+    Decimal,
+    ROUND_CEILING,
+    ROUND_DOWN,
+    ROUND_FLOOR,
+    ROUND_HALF_DOWN,
+    ROUND_HALF_EVEN,
+    ROUND_HALF_UP,
+    ROUND_UP,
+)
+from typing import Optional, Tuple, Union
+
+_POW10 = [10 ** i for i in range(64)]
+
+
+def _pow10(n: int) -> int:
+    return _POW10[n] if n < 64 else 10 ** n
+
+
+def _round_div(n: int, d: int, rounding: str) -> int:
+    """
+    n / d rounded to an integer with a `decimal` rounding mode; d > 0.
+    """
+    q, r = divmod(n, d)  # floor
+    if not r:
+        return q
+    if rounding == ROUND_FLOOR:
+        return q
+    if rounding == ROUND_CEILING:
+        return q + 1
+    if rounding == ROUND_DOWN:
+        return q if n >= 0 else q + 1
+    if rounding == ROUND_UP:
+        return q + 1 if n >= 0 else q
+    twice = 2 * r
+    if twice != d:
+        return q + 1 if twice > d else q
+    # exactly half way between q and q + 1
+    if rounding == ROUND_HALF_EVEN:
+        return q + (q & 1)
+    if rounding == ROUND_HALF_UP:
+        return q + 1 if n >= 0 else q
+    if rounding == ROUND_HALF_DOWN:
+        return q if n >= 0 else q + 1
+    raise ValueError(f"unsupported rounding mode: {rounding}")
+
+
+class Money:
+    """
+    Fixed-point amount: `units` atomic units of 10**-scale.
+
+    Addition, subtraction and multiplication are exact integer operations (the
+    scale of a product is the sum of the scales); rounding only happens in
+    `rescale`, `mul` and `div`, with an explicit `decimal` rounding mode.
+    Convert from and to `Decimal` at the API / DB boundary only.
+    """
+    __slots__ = ("units", "scale")
+
+    def __init__(self, units: int = 0, scale: int = 0):
+        self.units = units
+        self.scale = scale
+
+    # ------------------------------------------------------------------
+    # Decimal boundary
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_decimal(
+        cls,
+        value: Union[Decimal, int, str],
+        scale: Optional[int] = None,
+        rounding: str = ROUND_HALF_EVEN,
+    ) -> "Money":
+        """
+        Exact when `scale` is None (the scale of `value` is kept), otherwise
+        rounded to `scale` places.
+        """
+        if not isinstance(value, Decimal):
+            value = Decimal(value)
+        text = str(value)
+        if "E" not in text:
+            # plain notation: the digits are the units, the fraction length is the scale
+            whole, _, frac = text.partition(".")
+            money = cls(int(whole + frac), len(frac))
+            return money if scale is None or scale == money.scale else money.rescale(scale, rounding)
+        if not value.is_finite():
+            raise ValueError(f"not a finite amount: {value}")
+        if scale is None:
+            scale = max(-value.as_tuple().exponent, 0)
+        n, d = value.as_integer_ratio()
+        return cls(_round_div(n * _pow10(scale), d, rounding), scale)
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(f"{self.units}E-{self.scale}")
+
+    # ------------------------------------------------------------------
+    # Rounding
+    # ------------------------------------------------------------------
+    def rescale(self, scale: int, rounding: str = ROUND_HALF_EVEN) -> "Money":
+        if scale >= self.scale:
+            return Money(self.units * _pow10(scale - self.scale), scale)
+        return Money(_round_div(self.units, _pow10(self.scale - scale), rounding), scale)
+
+    def mul(self, other: "Money", scale: int, rounding: str = ROUND_HALF_EVEN) -> "Money":
+        """Product rounded to `scale` places."""
+        units = self.units * other.units
+        shift = self.scale + other.scale - scale
+        if shift <= 0:
+            return Money(units * _pow10(-shift), scale)
+        return Money(_round_div(units, _pow10(shift), rounding), scale)
+
+    def div(self, other: "Money", scale: int, rounding: str = ROUND_HALF_EVEN) -> "Money":
+        """Quotient rounded to `scale` places."""
+        if not other.units:
+            raise ZeroDivisionError("Money division by zero")
+        n = self.units * _pow10(other.scale + scale)
+        d = other.units * _pow10(self.scale)
+        if d < 0:
+            n, d = -n, -d
+        return Money(_round_div(n, d, rounding), scale)
+
+    # ------------------------------------------------------------------
+    # Exact arithmetic
+    # ------------------------------------------------------------------
+    def _aligned(self, other: "Money") -> Tuple[int, int, int]:
+        if self.scale == other.scale:
+            return self.units, other.units, self.scale
+        if self.scale > other.scale:
+            return self.units, other.units * _pow10(self.scale - other.scale), self.scale
+        return self.units * _pow10(other.scale - self.scale), other.units, other.scale
+
+    def __add__(self, other: "Money") -> "Money":
+        if isinstance(other, int):
+            if other:
+                return Money(self.units + other * _pow10(self.scale), self.scale)
+            return self
+        a, b, scale = self._aligned(other)
+        return Money(a + b, scale)
+
+    __radd__ = __add__  # sum() starts from 0
+
+    def __sub__(self, other: "Money") -> "Money":
+        a, b, scale = self._aligned(other)
+        return Money(a - b, scale)
+
+    def __neg__(self) -> "Money":
+        return Money(-self.units, self.scale)
+
+    def __mul__(self, other: Union["Money", int]) -> "Money":
+        if isinstance(other, int):
+            return Money(self.units * other, self.scale)
+        return Money(self.units * other.units, self.scale + other.scale)
+
+    __rmul__ = __mul__
+
+    # ------------------------------------------------------------------
+    # Comparison
+    # ------------------------------------------------------------------
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Money):
+            return NotImplemented
+        a, b, _ = self._aligned(other)
+        return a == b
+
+    def __lt__(self, other: "Money") -> bool:
+        a, b, _ = self._aligned(other)
+        return a < b
+
+    def __le__(self, other: "Money") -> bool:
+        a, b, _ = self._aligned(other)
+        return a <= b
+
+    def __gt__(self, other: "Money") -> bool:
+        a, b, _ = self._aligned(other)
+        return a > b
+
+    def __ge__(self, other: "Money") -> bool:
+        a, b, _ = self._aligned(other)
+        return a >= b
+
+    def __hash__(self) -> int:
+        units, scale = self.units, self.scale
+        while scale and not units % 10:
+            units //= 10
+            scale -= 1
+        return hash((units, scale))
+
+    def __bool__(self) -> bool:
+        return self.units != 0
+
+    def __repr__(self) -> str:
+        return f"Money({self.to_decimal()})"
+
+    def __str__(self) -> str:
+        return str(self.to_decimal())
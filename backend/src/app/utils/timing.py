@@ -0,0 +1,38 @@
+# src/app/utils/timing.py
+import time
+
+from typing import Dict
+
+
+class StageTimer:
+    """
+    Wall-clock duration of the consecutive stages of one request, in ms.
+    """
+    __slots__ = ("_start", "_last", "stages")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """Start over, e.g. when a transaction is retried."""
+        self._start = self._last = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def mark(self, stage: str) -> None:
+        """Close the stage running since the previous mark."""
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last) * 1000
+        self._last = now
+
+    @property
+    def total_ms(self) -> float:
+        return (self._last - self._start) * 1000
+
+    def server_timing(self) -> str:
+        """Value for the `Server-Timing` response header."""
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.stages.items()]
+        parts.append(f"total;dur={self.total_ms:.1f}")
+        return ", ".join(parts)
+
+    def __str__(self) -> str:
+        return " ".join(f"{name}={ms:.1f}ms" for name, ms in self.stages.items()) + f" total={self.total_ms:.1f}ms"
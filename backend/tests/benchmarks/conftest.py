@@ -0,0 +1,263 @@
+# tests/benchmarks/conftest.py
+"""
+Hot-path benchmarks: stand-ins, seeded data and the baseline report.
+
+Mongo is mongomock-motor unless `--bench-mongo-url` (or BENCH_MONGO_URL) points
+at a local mongod; Redis is always fakeredis. Every benchmark records
+p50/p95/p99 and ops/sec, and the session compares them with the baseline of
+the same backend in tests/benchmarks/baseline_<backend>.json. A benchmark
+without a baseline entry counts as a regression; saving updates the entries
+of the benchmarks that ran and keeps the others.
+
+    pytest tests/benchmarks
+    pytest tests/benchmarks -k wallet_view --bench-save-baseline
+    pytest tests/benchmarks --bench-mongo-url mongodb://localhost:27017 --bench-fail-on-regression
+"""
+import asyncio
+import json
+import os
+import platform
+import statistics
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import pytest
+
+BENCH_DIR = Path(__file__).resolve().parent
+BENCH_DB = "cryptocases_bench"
+
+# name -> {"p50_us", "p95_us", "p99_us", "ops", "rounds"}
+_results: Dict[str, Dict[str, float]] = {}
+_report: Dict[str, Any] = {}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("bench", "hot-path benchmarks")
+    group.addoption("--bench-mongo-url", default=os.getenv("BENCH_MONGO_URL"),
+                    help="run against this mongod instead of mongomock-motor")
+    group.addoption("--bench-rounds", type=int, default=200, help="timed rounds per benchmark")
+    group.addoption("--bench-baseline", default=None, help="baseline JSON (default: baseline_<backend>.json)")
+    group.addoption("--bench-save-baseline", action="store_true",
+                    help="write the benchmarks of this run into the baseline")
+    group.addoption("--bench-tolerance", type=float, default=0.5,
+                    help="allowed p95 slowdown against the baseline (0.5 = 50%%)")
+    group.addoption("--bench-fail-on-regression", action="store_true",
+                    help="fail the run on a regression or a benchmark missing from the baseline")
+
+
+def pytest_collection_modifyitems(config, items):
+    targets = [(config.invocation_params.dir / arg.split("::")[0]).resolve() for arg in config.args]
+    if any(path == BENCH_DIR or BENCH_DIR in path.parents for path in targets):
+        return
+    # a plain `pytest` run: keep the correctness suite fast
+    skip = pytest.mark.skip(reason="benchmarks run with `pytest tests/benchmarks`")
+    for item in items:
+        if BENCH_DIR in item.path.parents:
+            item.add_marker(skip)
+
+
+def mongo_url(config) -> Optional[str]:
+    return config.getoption("--bench-mongo-url", os.getenv("BENCH_MONGO_URL"))
+
+
+def backend_name(config) -> str:
+    return "mongod" if mongo_url(config) else "mongomock"
+
+
+def percentiles(data) -> Dict[str, float]:
+    cuts = statistics.quantiles(data, n=100, method="inclusive")
+    mean = statistics.fmean(data)
+    return {
+        "p50_us": round(cuts[49] * 1e6, 1),
+        "p95_us": round(cuts[94] * 1e6, 1),
+        "p99_us": round(cuts[98] * 1e6, 1),
+        "ops": round(1 / mean, 1) if mean else 0.0,
+        "rounds": len(data),
+    }
+
+# ---------------------------------------------------------------------------
+# stand-ins
+# ---------------------------------------------------------------------------
+
+@pytest.fixture(scope="session")
+def bench_loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def stand_ins(request, bench_loop):
+    """Beanie on mongomock-motor (or a local mongod) and fakeredis."""
+    from app.dev.standins import StandIns
+
+    stand_ins = StandIns(mongo_url=mongo_url(request.config), db_name=BENCH_DB)
+    yield bench_loop.run_until_complete(stand_ins.start())
+    bench_loop.run_until_complete(stand_ins.stop())
+
+# ---------------------------------------------------------------------------
+# seeded data
+# ---------------------------------------------------------------------------
+
+BENCH_USER = 1001
+HISTORY_USERS = 20
+HISTORY_PER_USER = 100
+
+
+async def seed(db) -> Dict[str, Any]:
+    from app.db.models.deposit_log import DepositLog
+    from app.db.models.internal_balance import InternalBalance
+    from app.db.models.player import ServerSeed
+    from app.db.models.withdrawal_log import WithdrawalLog
+    from app.dev.standins import seed_reference_data
+    from app.services.spin_controller import build_spin_log, pick_reward
+
+    cases = await seed_reference_data(odds_version="bench")
+
+    await InternalBalance.get_motor_collection().insert_many([
+        {"user_id": BENCH_USER, "coin": coin, "network": network, "balance": Decimal(balance),
+         "updated_at": datetime.now(timezone.utc)}
+        for coin, network, balance in [("usdt", None, "1000000000"), ("bitcoin", None, "1000"),
+                                       ("ethereum", None, "1000"), ("tron", None, "1000")]
+    ])
+
+    # history: HISTORY_PER_USER spins, deposits and withdrawals for each of HISTORY_USERS users
+    cfg = cases[0]
+    started = datetime.now(timezone.utc) - timedelta(days=30)
+    seed_doc = ServerSeed(seed="00" * 32, hash="", owner_id="0")
+    spins, deposits, withdrawals = [], [], []
+    for user_id in range(BENCH_USER, BENCH_USER + HISTORY_USERS):
+        for i in range(HISTORY_PER_USER):
+            at = started + timedelta(minutes=i, seconds=user_id)
+            pick = pick_reward(cfg, seed_doc.seed, "bench", i, 0)
+            log = build_spin_log(user_id, cfg, seed_doc, "bench", i, pick, Decimal("1.5"), Decimal("0.9"))
+            log.created_at = at
+            spins.append(log)
+            deposits.append(DepositLog(user_id=user_id, external_wallet_id="w", tx_hash=f"0x{user_id}{i}",
+                                       coin="usdt", amount=Decimal("10"), status="confirmed", created_at=at))
+            withdrawals.append(WithdrawalLog(user_id=user_id, external_wallet_id="w", network="TRC20",
+                                             to_address="T" * 34, amount_coin=Decimal("5"),
+                                             amount_usdt=Decimal("5"), conversion_rate=Decimal("1"),
+                                             created_at=at))
+    for docs in (spins, deposits, withdrawals):
+        await type(docs[0]).insert_many(docs)
+    return {"user_id": BENCH_USER, "case_id": cfg.case_id, "cases": cases}
+
+
+@pytest.fixture(scope="session")
+def seeded(stand_ins, bench_loop) -> Dict[str, Any]:
+    return bench_loop.run_until_complete(seed(stand_ins))
+
+
+@pytest.fixture
+def fresh_ledger(bench_loop) -> Callable[[], tuple]:
+    """
+    Setup of the balance-write benchmarks: empty the balance ledger before
+    every round. Each write inserts entries under a unique index, and
+    mongomock checks it by scanning the collection, so without this a round
+    costs more the more rounds ran before it.
+    """
+    from app.db.models.balance_ledger import BalanceEntry
+
+    def truncate() -> tuple:
+        bench_loop.run_until_complete(BalanceEntry.get_motor_collection().delete_many({}))
+        return ()
+
+    return truncate
+
+# ---------------------------------------------------------------------------
+# benchmark runner
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def bench(benchmark, bench_loop, request):
+    """
+    `bench(coro_fn, setup=None)`: time `coro_fn(*setup())` for `--bench-rounds`
+    rounds and record its latency percentiles.
+    """
+    rounds = request.config.getoption("--bench-rounds", 200)
+
+    def run(fn: Callable[..., Any], setup: Optional[Callable[[], tuple]] = None):
+        result = benchmark.pedantic(
+            lambda *args: bench_loop.run_until_complete(fn(*args)),
+            setup=(lambda: (setup(), {})) if setup else None,
+            rounds=rounds,
+            warmup_rounds=min(10, rounds),
+            iterations=1,
+        )
+        if benchmark.stats:  # None with --benchmark-disable
+            summary = percentiles(benchmark.stats.stats.data)
+            benchmark.extra_info.update(summary)
+            _results[request.node.name] = summary
+        return result
+
+    return run
+
+# ---------------------------------------------------------------------------
+# baseline
+# ---------------------------------------------------------------------------
+
+def baseline_path(config) -> Path:
+    path = config.getoption("--bench-baseline")
+    return Path(path) if path else BENCH_DIR / f"baseline_{backend_name(config)}.json"
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_sessionfinish(session, exitstatus):
+    if not _results:
+        return
+    config = session.config
+    path = baseline_path(config)
+    tolerance = config.getoption("--bench-tolerance", 0.5)
+    baseline = json.loads(path.read_text()).get("benchmarks", {}) if path.exists() else {}
+
+    rows, regressions, missing = [], [], []
+    for name, now in sorted(_results.items()):
+        base = baseline.get(name)
+        change = (now["p95_us"] / base["p95_us"] - 1) if base and base["p95_us"] else None
+        if base is None:
+            missing.append(name)
+        elif change is not None and change > tolerance:
+            regressions.append(name)
+        rows.append((name, now, base, change))
+    _report.update(path=path, rows=rows, regressions=regressions, missing=missing, tolerance=tolerance)
+
+    if config.getoption("--bench-save-baseline"):
+        path.write_text(json.dumps({
+            "backend": backend_name(config),
+            "machine": f"{platform.machine()} {platform.python_implementation()} {platform.python_version()}",
+            "saved_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "benchmarks": dict(sorted({**baseline, **_results}.items())),
+        }, indent=2) + "\n")
+        _report["saved"] = True
+    elif (regressions or missing) and config.getoption("--bench-fail-on-regression"):
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if not _report:
+        return
+    tr = terminalreporter
+    tr.section(f"hot paths ({backend_name(config)}) vs {_report['path'].name}")
+    tr.write_line(f"{'benchmark':<34}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}{'ops/s':>10}{'base p95':>10}{'change':>9}")
+    for name, now, base, change in _report["rows"]:
+        flag = "  REGRESSION" if name in _report["regressions"] else "  NO BASELINE" if base is None else ""
+        tr.write_line(
+            f"{name:<34}{now['p50_us']:>10.1f}{now['p95_us']:>10.1f}{now['p99_us']:>10.1f}{now['ops']:>10.1f}"
+            f"{base['p95_us'] if base else '-':>10}{f'{change:+.0%}' if change is not None else '-':>9}{flag}"
+        )
+    if _report.get("saved"):
+        tr.write_line(f"baseline written to {_report['path']}")
+        return
+    if _report["regressions"]:
+        tr.write_line(
+            f"{len(_report['regressions'])} benchmark(s) slower than the baseline p95 by more than "
+            f"{_report['tolerance']:.0%}", yellow=True,
+        )
+    if _report["missing"]:
+        tr.write_line(
+            f"{len(_report['missing'])} benchmark(s) missing from the baseline: {', '.join(_report['missing'])}",
+            yellow=True,
+        )
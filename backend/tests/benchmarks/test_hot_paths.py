@@ -0,0 +1,136 @@
+import itertools
+from decimal import Decimal
+
+import pytest
+
+from app.db.models.player import ServerSeed
+from app.schemas.case import CaseOpenRequest
+from app.services import spin_controller
+from app.services.exchange_service import ExchangeService
+from app.services.history_service import HistoryService
+from app.services.internal_balance_service import InternalBalanceService
+from app.services.seed_pool import new_seed_doc
+
+pytestmark = pytest.mark.benchmark(group="hot-paths")
+
+
+def test_spin(bench, seeded, bench_loop, fresh_ledger):
+    user_id, case_id = seeded["user_id"], seeded["case_id"]
+    seeds = ServerSeed.get_motor_collection()
+    nonces = itertools.count()
+    spent = []
+
+    def setup():
+        # one unrevealed seed per round, the last one removed: the seed lookup
+        # scans the same number of documents however many rounds run
+        fresh_ledger()
+        doc = new_seed_doc(str(user_id))
+        bench_loop.run_until_complete(seeds.delete_many({"_id": {"$in": spent}}))
+        bench_loop.run_until_complete(seeds.insert_one(doc))
+        spent[:] = [doc["_id"]]
+        return (CaseOpenRequest(case_id=case_id, server_seed_id=str(doc["_id"]), client_seed="bench", nonce=next(nonces)),)
+
+    response, _, spin_log = bench(lambda data: spin_controller.spin(user_id, data), setup=setup)
+    assert spin_log.case_id == case_id and response.server_seed
+
+
+def test_try_charge_user_for_case(bench, seeded, fresh_ledger):
+    charged = bench(lambda: InternalBalanceService.try_charge_user_for_case(seeded["user_id"], seeded["case_id"]),
+                    setup=fresh_ledger)
+    assert charged
+
+
+def test_adjust_balance_credit(bench, seeded, fresh_ledger):
+    bench(lambda: InternalBalanceService.adjust_balance(seeded["user_id"], "bitcoin", None, Decimal("0.00001")),
+          setup=fresh_ledger)
+
+
+def test_adjust_balance_debit(bench, seeded, fresh_ledger):
+    bench(lambda: InternalBalanceService.adjust_balance(seeded["user_id"], "ethereum", None, Decimal("-0.00001")),
+          setup=fresh_ledger)
+
+
+def test_exchange_quote(bench, seeded):
+    to_amount = bench(lambda: ExchangeService.quote("ETH", None, "USDT", "TRC20", Decimal("0.5")))
+    assert to_amount > 0
+
+
+def test_usd_balance_cached(bench, seeded):
+    # the balance writes above leave one miss, then memory hits
+    total = bench(lambda: InternalBalanceService.get_overall_balance_by_usd(seeded["user_id"]))
+    assert Decimal(total) > 0
+
+
+def test_wallets_grouped_from_balances(bench, seeded):
+    from app.utils.user import group_wallets_by_coin
+
+    assert bench(lambda: group_wallets_by_coin(seeded["user_id"])).root
+
+
+def test_wallet_view_after_write(bench, seeded, bench_loop, fresh_ledger):
+    # a balance write before every round: the stored view is read, never rebuilt
+    from app.services.wallet_view import wallet_views
+
+    user_id = seeded["user_id"]
+
+    def write():
+        fresh_ledger()
+        bench_loop.run_until_complete(
+            InternalBalanceService.adjust_balance(user_id, "ethereum", None, Decimal("0.00001"))
+        )
+        return ()
+
+    async def read():
+        return await wallet_views.body(user_id, await wallet_views.seq(user_id))
+
+    _, body = bench(read, setup=write)
+    assert body and wallet_views.hits["rebuilt"] <= 1
+
+
+WIDE_USER = 2001
+
+
+def test_deduct_usd_amount_wide_wallet(bench, seeded, bench_loop, fresh_ledger):
+    # every priced coin on two networks, $10 each: the deduction empties 20 of them and dips into one more
+    from app.db.models.internal_balance import InternalBalance
+    from app.services.rate_cache import rate_cache
+
+    collection = InternalBalance.get_motor_collection()
+    docs = [
+        {"user_id": WIDE_USER, "coin": coin, "network": network, "balance": Decimal(10) / rate}
+        for coin, rate in rate_cache.table.by_coin.items() if rate > 0
+        for network in (None, "ERC20")
+    ]
+    assert len(docs) >= 50
+
+    def reset():
+        fresh_ledger()
+
+        async def refill():
+            await collection.delete_many({"user_id": WIDE_USER})
+            await collection.insert_many([dict(doc) for doc in docs])
+        bench_loop.run_until_complete(refill())
+        return ()
+
+    debits = bench(lambda: InternalBalanceService.deduct_usd_amount(WIDE_USER, Decimal("205")), setup=reset)
+    assert len(debits) == 21
+
+
+def test_history_spins(bench, seeded):
+    assert len(bench(lambda: HistoryService.get_spins(seeded["user_id"], limit=20, offset=0))) == 20
+
+
+def test_history_spins_deep_page(bench, seeded):
+    assert len(bench(lambda: HistoryService.get_spins(seeded["user_id"], limit=20, offset=4))) == 20
+
+
+def test_history_deposits(bench, seeded):
+    assert len(bench(lambda: HistoryService.get_deposits(seeded["user_id"], limit=20, offset=0))) == 20
+
+
+def test_history_withdrawals(bench, seeded):
+    assert len(bench(lambda: HistoryService.get_withdrawals(seeded["user_id"], limit=20, offset=0))) == 20
+
+
+def test_history_spins_admin(bench, seeded):
+    assert len(bench(lambda: HistoryService.get_spins_admin(limit=20, offset=0))) == 20
@@ -40,6 +40,9 @@ async def db():
         document_models=[
         user.User,
         player.CapPool,
+        player.CapPoolShard,
+        player.HashChain,
+        player.HashChainLinks,
         player.PlayerStat,
         player.ServerSeed,
         player.SpinLog,
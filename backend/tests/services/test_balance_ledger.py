@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+import pytest
+
+from src.app.dev.standins import StandIns
+from src.app.services import internal_balance_service as service_module
+from src.app.services.balance_ledger import BalanceLedger
+
+InternalBalanceService = service_module.InternalBalanceService
+
+
+@pytest.fixture
+async def stand_ins():
+    stand_ins = StandIns(db_name="ledger")
+    await stand_ins.start()
+    yield stand_ins
+    await stand_ins.stop()
+
+
+@pytest.mark.asyncio
+async def test_writes_are_journaled_compacted_and_verified(stand_ins):
+    await InternalBalanceService.credit_many(7, [("tether", None, Decimal("10")), ("tron", None, Decimal("50"))])
+    assert await InternalBalanceService.charge_usd(7, Decimal("4"))
+    await InternalBalanceService.adjust_balance(7, "tron", None, Decimal("-20"), reason="swap")
+    await InternalBalanceService.adjust_balance(8, "tron", None, Decimal("1"))
+
+    ledger = BalanceLedger(compact_every=3, concurrency=4)
+    entries = await ledger.entries(7)
+    assert [(e["seq"], e["coin"], e["delta"], e["reason"]) for e in entries] == [
+        (1, "tether", Decimal("10"), "case_reward"),
+        (2, "tron", Decimal("50"), "case_reward"),
+        (3, "tether", Decimal("-4"), "case_open"),
+        (4, "tron", Decimal("-20"), "swap"),
+    ]
+
+    # only user 7 has enough new entries; more of them land on top of the snapshot
+    assert await ledger.compact_due() == 1
+    await InternalBalanceService.adjust_balance(7, "tether", None, Decimal("1"))
+    assert await ledger.balances(7) == (5, {("tether", None): Decimal("7"), ("tron", None): Decimal("30")})
+    assert all(check.ok for check in await ledger.verify())
+
+    # a write that bypassed the ledger
+    await service_module.InternalBalance.get_motor_collection().update_one(
+        {"user_id": 8, "coin": "tron"}, {"$inc": {"balance": Decimal("5")}}
+    )
+    check = await ledger.verify_user(8)
+    assert not check.ok and check.mismatches == {"tron@None": ("1", "6")}
+
+
+@pytest.mark.asyncio
+async def test_balances_older_than_the_ledger_get_opening_entries(stand_ins):
+    balances = service_module.InternalBalance.get_motor_collection()
+    await balances.insert_many([
+        {"user_id": 9, "coin": "tron", "network": None, "balance": Decimal("40")},
+        {"user_id": 9, "coin": "tether", "network": "TRC20", "balance": Decimal("2.5")},
+    ])
+    await InternalBalanceService.adjust_balance(9, "tron", None, Decimal("-15"))
+
+    ledger = BalanceLedger()
+    check = await ledger.verify_user(9)
+    assert not check.ok and check.mismatches == {"tether@TRC20": ("0", "2.5"), "tron@None": ("-15", "25")}
+
+    assert await ledger.open_missing() == 2
+    assert [(e["seq"], e["coin"], e["delta"], e["reason"]) for e in await ledger.entries(9)] == [
+        (1, "tron", Decimal("-15"), "adjust"),
+        (2, "tether", Decimal("2.5"), "opening"),
+        (3, "tron", Decimal("40"), "opening"),
+    ]
+    assert (await ledger.verify_user(9)).ok
+    # once per user
+    await InternalBalanceService.adjust_balance(9, "tron", None, Decimal("1"))
+    assert await ledger.open_missing() == 0
+    assert (await ledger.verify_user(9)).ok
@@ -8,7 +8,7 @@ from unittest.mock import AsyncMock, patch
 from src.app.services.exchange_service import ExchangeService
 
 class DummyRateCache:
-    async def get_rate(self, coin_id):
+    def get_rate(self, coin_id):
         return Decimal('2') if coin_id == 'btc' else Decimal('0')
 
 @pytest.mark.asyncio
@@ -0,0 +1,121 @@
+import hashlib
+
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from src.app.models.case_config import TierConfig, RewardItem, OddsVersion
+from src.app.dev.standins import StandIns
+from src.app.services import fairness_verifier as fairness_verifier_module
+from src.app.services.fairness_verifier import FairnessVerifier, OddsTable, verify_many
+from src.app.services.hash_chain import block_links, generate_chain
+from src.app.services.spin_controller import hmac_roll, pick_from_roll
+from src.app.services.spin_sampler import SpinSampler
+
+
+def make_table():
+    tiers = [
+        TierConfig(name="jackpot", chance=Decimal("0.1"), rewards=[
+            RewardItem(coin_id="c", amount=Decimal("20"), network=None, sub_chance=Decimal("1")),
+        ]),
+        TierConfig(name="common", chance=Decimal("0.9"), rewards=[
+            RewardItem(coin_id="a", amount=Decimal("1"), network=None, sub_chance=Decimal("0.9995")),
+            RewardItem(coin_id="b", amount=Decimal("3"), network=None, sub_chance=Decimal("0.0005")),
+        ]),
+    ]
+    return OddsTable(tiers=tiers, sampler=SpinSampler(tiers, "case_t", "v1"))
+
+
+def make_spin(table, nonce, fail_streak, seed=None, seed_id=None):
+    seed = seed or hashlib.sha256(str(nonce).encode()).hexdigest()
+    seed_id = seed_id or str(ObjectId())
+    cfg = SimpleNamespace(tiers=table.tiers, pity_after=3, case_id="case_t", odds_versions=[OddsVersion(version="v1")])
+    pick = pick_from_roll(cfg, hmac_roll(seed, "client", nonce), fail_streak)
+    doc = {
+        "_id": ObjectId(), "user_id": 5, "case_id": "case_t", "odds_version": "v1",
+        "server_seed_id": seed_id, "server_seed_hash": hashlib.sha256(bytes.fromhex(seed)).hexdigest(),
+        "server_seed_seed": seed, "client_seed": "client", "nonce": nonce,
+        "hmac_value": pick.hmac_value, "raw_roll": pick.roll, "pity_before": pick.pity_before,
+        "case_tier": pick.tier.name, "prize_id": pick.reward.coin_id, "payout": Decimal(pick.reward.amount),
+    }
+    seed_doc = {"_id": ObjectId(seed_id), "seed": seed, "hash": doc["server_seed_hash"], "owner_id": "5", "used": True}
+    return doc, seed_doc
+
+
+def test_recomputes_spins_and_flags_tampering():
+    table = make_table()
+    spins = [make_spin(table, nonce, fail_streak) for nonce, fail_streak in enumerate([0, 2, 3, 6, 12] * 20)]
+    docs = [doc for doc, _ in spins]
+    seeds = {str(seed["_id"]): seed for _, seed in spins}
+    tables = {("case_t", "v1"): table}
+    assert all(r["ok"] for r in verify_many(docs, seeds, tables))
+
+    docs[0]["case_tier"] = "jackpot" if docs[0]["case_tier"] != "jackpot" else "common"
+    docs[1]["nonce"] += 1
+    seeds[docs[2]["server_seed_id"]]["owner_id"] = "6"
+    docs[3]["odds_version"] = "v0"
+    results = verify_many(docs, seeds, tables)
+    assert results[0]["failed"] == ["tier"]
+    assert "hmac" in results[1]["failed"]
+    assert results[2]["failed"] == ["seed_commitment"]
+    assert results[3]["failed"] == ["odds_unavailable"]
+    assert all(r["ok"] for r in results[4:])
+
+
+def make_chain_spins(table, length=8):
+    """A chain of `length` links, all revealed: its HashChain doc and one spin per link."""
+    terminal, checkpoints = generate_chain(length, 4)
+    links = b"".join(block_links(checkpoints, 4, length, block) for block in range(2))
+    chain = {"_id": ObjectId(), "terminal_hash": terminal, "owner_id": "5", "cursor": length}
+    docs = []
+    for index in range(length):
+        doc, _ = make_spin(table, index, 0, seed=links[index * 32:(index + 1) * 32].hex(), seed_id=str(chain["_id"]))
+        doc.update(fairness_mode="chain", chain_index=index)
+        docs.append(doc)
+    return chain, docs
+
+
+def tamper_link(doc):
+    """Log a seed/hash pair of the server's choosing: consistent with itself, not with the chain."""
+    doc["server_seed_seed"] = hashlib.sha256(b"chosen").hexdigest()
+    doc["server_seed_hash"] = hashlib.sha256(bytes.fromhex(doc["server_seed_seed"])).hexdigest()
+
+
+def test_chain_spins_follow_the_committed_chain():
+    table = make_table()
+    chain, docs = make_chain_spins(table)
+    chains = {str(chain["_id"]): chain}
+    links = {(doc["server_seed_id"], doc["chain_index"]): doc["server_seed_seed"] for doc in docs}
+    tables = {("case_t", "v1"): table}
+    assert all(r["ok"] for r in verify_many(docs, {}, tables, chains, links))
+
+    tamper_link(docs[0])
+    tamper_link(docs[5])
+    links = {(doc["server_seed_id"], doc["chain_index"]): doc["server_seed_seed"] for doc in docs}
+    results = verify_many(docs, {}, tables, chains, links)
+    # link 0 misses the terminal hash, link 5 its predecessor; links 1 and 6 no longer follow them
+    assert [i for i, r in enumerate(results) if "seed_commitment" in r["failed"]] == [0, 1, 5, 6]
+    assert "seed_hash" not in results[5]["failed"]
+    # a chain that does not exist commits to nothing
+    assert not any(r["ok"] for r in verify_many(docs[2:4], {}, tables, {}, links))
+
+
+@pytest.mark.asyncio
+async def test_chain_links_are_checked_across_batches(tmp_path):
+    stand_ins = StandIns(db_name="fairness_verifier")
+    await stand_ins.start()
+    try:
+        table = make_table()
+        chain, docs = make_chain_spins(table)
+        tamper_link(docs[3])
+        await fairness_verifier_module.HashChain.get_motor_collection().insert_one(chain)
+        await fairness_verifier_module.SpinLog.get_motor_collection().insert_many(docs)
+
+        verifier = FairnessVerifier(odds_dir=tmp_path, batch_size=3)
+        verifier._tables[("case_t", "v1")] = table
+        results = [r async for r in verifier.stream({"user_id": 5})]
+        assert [r["nonce"] for r in results if not r["ok"]] == [3, 4]
+    finally:
+        await stand_ins.stop()
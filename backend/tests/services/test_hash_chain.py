@@ -0,0 +1,70 @@
+import hashlib
+
+import pytest
+from fastapi import HTTPException
+
+from src.app.dev.standins import StandIns
+from src.app.services import hash_chain as hash_chain_module
+from src.app.services.hash_chain import HashChainService, block_links, generate_chain, verify_links
+
+
+@pytest.fixture
+async def stand_ins():
+    stand_ins = StandIns(db_name="hash_chain")
+    await stand_ins.start()
+    yield stand_ins
+    await stand_ins.stop()
+
+
+def test_checkpoints_rebuild_links_backwards():
+    terminal, checkpoints = generate_chain(1000, 64)
+    assert len(checkpoints) == 16 * 32
+
+    data = b"".join(block_links(checkpoints, 64, 1000, block) for block in range(16))
+    links = [data[i:i + 32] for i in range(0, len(data), 32)]
+    assert len(links) == 1000
+    assert hashlib.sha256(links[0]).hexdigest() == terminal
+    assert verify_links(bytes.fromhex(terminal), links)
+    # every link is checked against its predecessor alone
+    assert verify_links(links[499], links[500:503])
+    assert not verify_links(links[10], links[500:501])
+
+
+@pytest.mark.asyncio
+async def test_advance_moves_head_and_cursor(stand_ins):
+    service = HashChainService(length=10, checkpoint_every=4, spares=0)
+    chain = await service.commit(7)
+    chain_id = str(chain.id)
+
+    first, = await service.advance(7, chain_id)
+    batch = await service.advance(7, chain_id, 3)  # crosses into the second block
+    # another host: nothing cached, same links
+    later = await HashChainService().advance(7, chain_id, 2)
+    revealed = [first] + batch + later
+    assert [link.index for link in revealed] == [0, 1, 2, 3, 4, 5]
+    assert first.hash == chain.terminal_hash
+    for prev, link in zip(revealed, revealed[1:]):
+        assert link.hash == prev.seed
+        assert hashlib.sha256(bytes.fromhex(link.seed)).hexdigest() == link.hash
+
+    with pytest.raises(HTTPException) as exc:
+        await service.advance(7, chain_id, 5)
+    assert exc.value.detail == "hash_chain_exhausted"
+    assert await hash_chain_module.HashChainLinks.get(chain.id) is None
+    with pytest.raises(HTTPException) as exc:
+        await service.advance(7, chain_id)
+    assert exc.value.detail == "hash_chain_not_committed"
+
+
+@pytest.mark.asyncio
+async def test_one_worker_at_a_time_refills(stand_ins):
+    # one spare: mongomock ignores the partial filter of the one-active-chain index
+    first, second = HashChainService(length=8, spares=1), HashChainService(length=8, spares=1)
+    redis = hash_chain_module.redis_client.get_redis()
+    await redis.set(hash_chain_module.REFILL_LEASE_KEY, "other worker")
+    assert await first.refill() == 0
+
+    await redis.delete(hash_chain_module.REFILL_LEASE_KEY)
+    assert await first.refill() == 1
+    assert await second.refill() == 0  # the spares are there and the lease was released
+    assert await redis.get(hash_chain_module.REFILL_LEASE_KEY) is None
@@ -20,4 +20,61 @@ class TestInternalBalanceService:
         res = AsyncMock(matched_count=0)
         monkeypatch.setattr(InternalBalance.get_motor_collection(), 'update_one', AsyncMock(return_value=res))
         with pytest.raises(Exception):
-            await InternalBalanceService.adjust_balance(1, 'usdt', None, Decimal('-10'))
\ No newline at end of file
+            await InternalBalanceService.adjust_balance(1, 'usdt', None, Decimal('-10'))
+
+@pytest.fixture
+def registries():
+    from src.app.dev.standins import data_dir
+    from src.app.models import coin as coin_module
+
+    # the registries `Coin` reads precisions from
+    coin_module.CoinRegistry.load_from_file(data_dir() / "coin_registry.json")
+    coin_module.AssetRegistry.load_from_file(data_dir() / "asset_registry.json")
+
+
+def test_allocate_usd_debit_takes_the_largest_balances_first(registries):
+    from src.app.services.internal_balance_service import BalanceTooLow, allocate_usd_debit
+
+    balances = [
+        {"_id": 1, "coin": "tether", "network": None, "balance": Decimal("30")},
+        {"_id": 2, "coin": "ethereum", "network": None, "balance": Decimal("0.02")},
+        {"_id": 3, "coin": "tron", "network": None, "balance": Decimal("100")},
+        {"_id": 4, "coin": "delisted", "network": None, "balance": Decimal("5")},
+    ]
+    rates = {"tether": Decimal("1"), "ethereum": Decimal("2000"), "tron": Decimal("0.25")}
+
+    # ethereum $40 whole, then $10 of the $30 in tether
+    debits = allocate_usd_debit(balances, rates, Decimal("50"))
+    assert [(d.balance_id, d.amount, d.usd) for d in debits] == [
+        (2, Decimal("0.02"), Decimal("40")),
+        (1, Decimal("10"), Decimal("10")),
+    ]
+    with pytest.raises(BalanceTooLow):
+        allocate_usd_debit(balances, rates, Decimal("95.01"))
+
+
+@pytest.mark.asyncio
+async def test_deduct_usd_amount_debits_only_this_user(registries, monkeypatch):
+    import time
+    from src.app.dev.standins import StandIns
+    from src.app.services import internal_balance_service as service_module
+    from src.app.services.rate_cache import RateCache
+
+    rates = RateCache()
+    rates._set_local({"tether": Decimal("1"), "tron": Decimal("0.25")}, 1, time.time(), record=False)
+    monkeypatch.setattr(service_module, "rate_cache", rates)
+    stand_ins = StandIns(db_name="deduct")
+    await stand_ins.start()
+    try:
+        collection = service_module.InternalBalance.get_motor_collection()
+        await collection.insert_many([
+            {"user_id": 1, "coin": "tether", "network": None, "balance": Decimal("3")},
+            {"user_id": 1, "coin": "tron", "network": None, "balance": Decimal("40")},
+            {"user_id": 2, "coin": "tron", "network": None, "balance": Decimal("40")},
+        ])
+        debits = await InternalBalanceService.deduct_usd_amount(1, Decimal("12"))
+        assert [(d.coin, d.amount) for d in debits] == [("tron", Decimal("40")), ("tether", Decimal("2"))]
+        left = {(b["user_id"], b["coin"]): b["balance"] for b in await collection.find({}).to_list(None)}
+        assert left == {(1, "tether"): Decimal("1"), (1, "tron"): Decimal("0"), (2, "tron"): Decimal("40")}
+    finally:
+        await stand_ins.stop()
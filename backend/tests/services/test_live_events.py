@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+import fakeredis
+import pytest
+
+from src.app.services import live_events as live_events_module
+from src.app.services.live_events import BROADCAST_CHANNEL, RESYNC, HubFull, LiveConnection, LiveHub, publish
+
+
+@pytest.fixture
+async def hub(monkeypatch):
+    # the Redis client module the hub itself imported
+    monkeypatch.setattr(live_events_module.redis_client, "_redis", fakeredis.FakeAsyncRedis(decode_responses=True))
+    hub = LiveHub(max_connections=3, queue_size=4)
+    hub.start()
+    while hub._pubsub is None:
+        await asyncio.sleep(0.01)
+    yield hub
+    await hub.stop()
+
+
+@pytest.mark.asyncio
+async def test_events_reach_only_the_users_connections(hub):
+    first, second, other = await hub.connect(1), await hub.connect(1), await hub.connect(2)
+
+    await publish(1, [{"type": "balance", "delta": "1.5"}])
+    for conn in (first, second):
+        assert json.loads(await asyncio.wait_for(conn.queue.get(), 2)) == {"type": "balance", "delta": "1.5"}
+    await live_events_module.redis_client.get_redis().publish(BROADCAST_CHANNEL, "hello")
+    assert await asyncio.wait_for(other.queue.get(), 2) == "hello"
+    assert other.queue.empty()
+
+    # the channel is dropped with the user's last connection
+    await hub.disconnect(first)
+    await hub.disconnect(second)
+    await publish(1, [{"type": "balance"}])
+    await live_events_module.redis_client.get_redis().publish(BROADCAST_CHANNEL, "again")
+    assert await asyncio.wait_for(other.queue.get(), 2) == "again"
+    assert hub.stats()["delivered"] == 2 + 3 + 1
+    assert hub.stats()["users"] == 1
+
+
+@pytest.mark.asyncio
+async def test_connections_are_capped(hub):
+    conns = [await hub.connect(user_id) for user_id in (1, 2, 3)]
+    with pytest.raises(HubFull):
+        await hub.connect(4)
+    await hub.disconnect(conns[0])
+    await hub.connect(4)
+    assert hub.stats()["connections"] == 3
+    assert hub.stats()["rejected"] == 1
+
+
+def test_full_queue_collapses_into_resync():
+    conn = LiveConnection(1, queue_size=2)
+    for message in ("a", "b", "c"):
+        conn.offer(message)
+    assert conn.queue.qsize() == 1
+    assert conn.queue.get_nowait() == RESYNC
+    assert conn.resyncs == 1
+
+
+class RefusedSocket:
+    """Just enough of a WebSocket for the handler to turn it away."""
+    def __init__(self):
+        self.headers = {}
+        self.accepted = False
+        self.close_code = None
+
+    async def accept(self):
+        self.accepted = True
+
+    async def close(self, code):
+        self.close_code = code
+
+
+@pytest.mark.asyncio
+async def test_unknown_user_is_refused_before_accept():
+    from src.app.api.routers.live import live
+    from src.app.core.auth_jwt import JWTManager
+    from src.app.dev.standins import StandIns
+
+    stand_ins = StandIns(db_name="live_auth")
+    await stand_ins.start()
+    try:
+        for token in (None, "garbage", JWTManager.create_access_token(404)):
+            websocket = RefusedSocket()
+            await live(websocket, token)
+            assert (websocket.accepted, websocket.close_code) == (False, 1008)
+    finally:
+        await stand_ins.stop()
@@ -0,0 +1,55 @@
+import random
+
+from decimal import (
+    Decimal, ROUND_CEILING, ROUND_DOWN, ROUND_FLOOR, ROUND_HALF_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_UP,
+    localcontext,
+)
+
+import pytest
+
+from src.app.utils.money import Money
+
+MODES = [ROUND_CEILING, ROUND_DOWN, ROUND_FLOOR, ROUND_HALF_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_UP]
+
+
+def random_decimal(rng):
+    return Decimal(rng.randint(-10**12, 10**12)).scaleb(-rng.randint(0, 12))
+
+
+@pytest.mark.parametrize("rounding", MODES)
+def test_rounding_matches_decimal_quantize(rounding):
+    rng = random.Random(rounding)
+    for _ in range(2000):
+        value = random_decimal(rng)
+        places = rng.randint(0, 8)
+        # halves and exact values are the interesting cases
+        if rng.random() < 0.3:
+            value = value.quantize(Decimal(1).scaleb(-places)) + Decimal(5).scaleb(-places - 1)
+        expected = value.quantize(Decimal(1).scaleb(-places), rounding=rounding)
+        assert Money.from_decimal(value).rescale(places, rounding).to_decimal() == expected
+        assert Money.from_decimal(value, places, rounding).to_decimal() == expected
+
+
+def test_exact_arithmetic_keeps_decimal_results():
+    rng = random.Random(7)
+    for _ in range(2000):
+        a, b = random_decimal(rng), random_decimal(rng)
+        ma, mb = Money.from_decimal(a), Money.from_decimal(b)
+        with localcontext() as ctx:
+            ctx.prec = 60
+            assert str((ma + mb).to_decimal()) == str(a + b)
+            assert str((ma - mb).to_decimal()) == str(a - b)
+            assert str((ma * mb).to_decimal()) == str(a * b)
+            assert (ma < mb) == (a < b) and (ma == mb) == (a == b)
+            if b:
+                assert ma.div(mb, 10, ROUND_DOWN).to_decimal() == (a / b).quantize(Decimal("1E-10"), rounding=ROUND_DOWN)
+    assert Money(150, 2) == Money(15, 1) and hash(Money(150, 2)) == hash(Money(15, 1))
+
+
+def test_products_match_quantized_decimals():
+    rng = random.Random(3)
+    holdings = [(abs(random_decimal(rng)), abs(random_decimal(rng))) for _ in range(500)]
+    with localcontext() as ctx:
+        ctx.prec = 60
+        expected = [(a * r).quantize(Decimal("0.000001")) for a, r in holdings]
+    assert [Money.from_decimal(a).mul(Money.from_decimal(r), 6).to_decimal() for a, r in holdings] == expected
\ No newline at end of file
@@ -0,0 +1,110 @@
+import asyncio
+import copy
+import hashlib
+
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from src.app.models.case_config import TierConfig, RewardItem, OddsVersion
+from src.app.db.models.player import PlayerStat
+from src.app.services import spin_controller
+from src.app.services.spin_controller import apply_player_stat, hmac_roll
+
+
+def evaluate(expr, doc):
+    """Just enough of the aggregation language for player_stat_pipeline."""
+    if isinstance(expr, str) and expr.startswith("$"):
+        return doc.get(expr[1:])
+    if isinstance(expr, list):
+        return [evaluate(e, doc) for e in expr]
+    if not isinstance(expr, dict):
+        return expr
+    (op, args), = expr.items()
+    args = evaluate(args, doc)
+    if op == "$ifNull":
+        return args[0] if args[0] is not None else args[1]
+    if op == "$min":
+        return min(args)
+    if op == "$add":
+        return sum(args[1:], args[0])
+    if op == "$arrayElemAt":
+        return args[0][args[1]]
+    if op == "$cond":
+        return args[1] if args[0] else args[2]
+    raise NotImplementedError(op)
+
+
+class FakePlayerStats:
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one_and_update(self, query, pipeline, projection, upsert, return_document, session):
+        before = self.docs.get(query["user_id"])
+        doc = copy.deepcopy(before) if before else dict(query)
+        for stage in pipeline:
+            (op, fields), = stage.items()
+            if op == "$set":
+                doc.update({k: evaluate(v, doc) for k, v in fields.items()})
+            else:
+                doc.pop(fields)
+        self.docs[query["user_id"]] = doc
+        return before
+
+
+@pytest.fixture
+def case_cfg():
+    tiers = [
+        TierConfig(name="jackpot", chance=Decimal("0.1"), rewards=[
+            RewardItem(coin_id="c", amount=Decimal("20"), network=None, sub_chance=Decimal("1")),
+        ]),
+        TierConfig(name="common", chance=Decimal("0.9"), rewards=[
+            RewardItem(coin_id="a", amount=Decimal("1"), network=None, sub_chance=Decimal("0.9995")),
+            RewardItem(coin_id="b", amount=Decimal("3"), network=None, sub_chance=Decimal("0.0005")),
+        ]),
+    ]
+    return SimpleNamespace(
+        case_id="case_t", tiers=tiers, pity_after=3, price_usd=Decimal("4"),
+        odds_versions=[OddsVersion(version="v1")],
+    )
+
+
+@pytest.mark.asyncio
+async def test_pipeline_matches_sequential_spins(case_cfg, monkeypatch):
+    stats = FakePlayerStats()
+    monkeypatch.setattr(spin_controller.PlayerStat, "get_motor_collection", classmethod(lambda cls: stats))
+    monkeypatch.setattr(spin_controller.rate_cache, "get_rate", lambda coin: Decimal("1"))
+
+    seed = hashlib.sha256(b"seed").hexdigest()
+    raws = [hmac_roll(seed, "client", nonce) for nonce in range(40)]
+    last_state = case_cfg.pity_after + spin_controller.PITY_LEVELS - 1
+    for start in [0, 1, 2, 3, 7, last_state, last_state + 25]:
+        stats.docs = {1: {"user_id": 1, "fail_streak": start, "rtp_session": Decimal("0"), "net_loss": Decimal("0")}}
+        for chunk in (raws[:1], raws[1:6], raws[6:]):
+            picks, payouts, _ = await apply_player_stat(1, case_cfg, chunk)
+            for raw, pick, payout in zip(chunk, picks, payouts):
+                expected = spin_controller.pick_from_roll(case_cfg, raw, start)
+                assert (pick.tier.name, pick.reward.coin_id, pick.fail_streak) == (
+                    expected.tier.name, expected.reward.coin_id, expected.fail_streak
+                ), start
+                assert payout == Decimal(expected.reward.amount)
+                start = expected.fail_streak
+        assert stats.docs[1]["fail_streak"] == start
+
+
+@pytest.mark.asyncio
+async def test_concurrent_spins_of_one_user_lose_no_updates(db, case_cfg, monkeypatch):
+    monkeypatch.setattr(spin_controller.rate_cache, "get_rate", lambda coin: Decimal("1"))
+    await PlayerStat.get_motor_collection().delete_many({"user_id": 77})
+    seed = hashlib.sha256(b"stress").hexdigest()
+    results = await asyncio.gather(*(
+        apply_player_stat(77, case_cfg, [hmac_roll(seed, "client", nonce)]) for nonce in range(200)
+    ))
+
+    ps = await PlayerStat.find_one(PlayerStat.user_id == 77)
+    payouts = [payout for _, (payout,), _ in results]
+    assert ps.net_loss == sum(case_cfg.price_usd - p for p in payouts)
+    assert ps.rtp_session == sum(p / case_cfg.price_usd for p in payouts)
+    # every payout is positive, so each update must have seen a different pre-image
+    assert len({rtp_before for _, _, rtp_before in results}) == len(results)
@@ -0,0 +1,38 @@
+import time
+from decimal import Decimal
+
+import pytest
+
+from src.app.dev.standins import StandIns
+from src.app.services import portfolio_cache as portfolio_cache_module
+from src.app.services.internal_balance_service import InternalBalanceService
+from src.app.services.portfolio_cache import PortfolioCache
+from src.app.services.rate_cache import RateCache
+
+
+@pytest.fixture
+async def stand_ins():
+    stand_ins = StandIns(db_name="portfolio")
+    await stand_ins.start()
+    yield stand_ins
+    await stand_ins.stop()
+
+
+@pytest.mark.asyncio
+async def test_total_is_cached_until_rates_or_balances_change(stand_ins, monkeypatch):
+    rates = RateCache()
+    monkeypatch.setattr(portfolio_cache_module, "rate_cache", rates)
+    rates._set_local({"bitcoin": Decimal("60000"), "tether": Decimal("1")}, 1, time.time(), record=False)
+    await InternalBalanceService.credit_many(7, [("bitcoin", None, Decimal("0.5")), ("tether", None, Decimal("10"))])
+
+    worker, other_worker = PortfolioCache(), PortfolioCache()
+    assert await worker.usd_total(7) == Decimal("30010")
+    assert await worker.usd_total(7) == Decimal("30010")
+    assert await other_worker.usd_total(7) == Decimal("30010")
+    assert (worker.hits, other_worker.hits["redis"]) == ({"memory": 1, "redis": 0, "computed": 1}, 1)
+
+    await InternalBalanceService.adjust_balance(7, "tether", None, Decimal("-4"))
+    assert await worker.usd_total(7) == Decimal("30006")
+    rates._set_local({"bitcoin": Decimal("50000"), "tether": Decimal("1")}, 2, time.time(), record=False)
+    assert await worker.usd_total(7) == Decimal("25006")
+    assert worker.hits["computed"] == 3
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import os
+import time
+
+from decimal import Decimal
+from unittest.mock import AsyncMock
+
+import fakeredis
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.app.services import rate_cache as rate_cache_module
+from src.app.services.rate_cache import RateCache
+from src.app.services.rate_table import RateTable
+from src.app.utils.rate_limit import TokenBucket
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(rate_cache_module.redis_client, "_redis", fake)
+    return fake
+
+
+@pytest.mark.asyncio
+async def test_one_updater_holds_the_lease(redis):
+    first, second = RateCache(interval_seconds=60), RateCache(interval_seconds=60)
+    assert await first._hold_lease()
+    assert not await second._hold_lease()
+    # the holder renews, the other stays a follower
+    assert await first._hold_lease()
+    await first._release_lease()
+    assert await second._hold_lease()
+
+
+@pytest.mark.asyncio
+async def test_published_snapshot_reaches_other_workers(redis):
+    updater, worker = RateCache(), RateCache()
+    listener = asyncio.create_task(worker._listen())
+    try:
+        await asyncio.sleep(0.05)
+        version = await updater.publish({"bitcoin": Decimal("65000.5")})
+        for _ in range(50):
+            if worker.version == version:
+                break
+            await asyncio.sleep(0.01)
+        assert worker.get_rate("bitcoin") == Decimal("65000.5")
+        assert worker.get_rate("unknown") == Decimal("0")
+        assert worker.stats()["version"] == version and not worker.is_stale()
+    finally:
+        listener.cancel()
+
+
+@pytest.mark.asyncio
+async def test_refresh_reads_the_current_snapshot(redis):
+    await RateCache().publish({"tether": Decimal("1")})
+    await RateCache().publish({"tether": Decimal("1.001")})
+    celery_worker = RateCache()
+    assert celery_worker.is_stale()
+    assert await celery_worker.refresh()
+    assert celery_worker.version == 2 and celery_worker.get_rate("tether") == Decimal("1.001")
+    assert not await celery_worker.refresh()
+
+
+class CoinGeckoStandIn:
+    """/simple/price on a local port: `down` coins always fail, `flaky` ones get a 429 first."""
+    def __init__(self, delay: float = 0.02):
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.throttled = set()
+
+    async def simple_price(self, request):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            ids = request.query["ids"].split(",")
+            if any(coin.startswith("down") for coin in ids):
+                return web.Response(status=502)
+            batch = tuple(ids)
+            if any(coin.startswith("flaky") for coin in ids) and batch not in self.throttled:
+                self.throttled.add(batch)
+                return web.Response(status=429, headers={"Retry-After": "0"})
+            return web.json_response({coin: {"usd": 1.5} for coin in ids})
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+async def coingecko():
+    stand_in = CoinGeckoStandIn()
+    app = web.Application()
+    app.router.add_get("/simple/price", stand_in.simple_price)
+    server = TestServer(app)
+    await server.start_server()
+    stand_in.url = str(server.make_url("")).rstrip("/")
+    yield stand_in
+    await server.close()
+
+
+def fetcher(coingecko, tmp_path, **kwargs) -> RateCache:
+    return RateCache(base_url=coingecko.url, batch_size=2, concurrency=2, rate_per_minute=6000,
+                     retries=2, backoff_seconds=0.01, snapshot_path=tmp_path / "rates.json", **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_fetch_is_concurrent_bounded_and_retried(coingecko, tmp_path):
+    cache = fetcher(coingecko, tmp_path)
+    ids = [f"coin{i}" for i in range(7)] + ["flaky1", "down1"]
+    rates = await cache._fetch_rates(ids)
+    await cache.close()
+
+    # batches of 2: [coin6, flaky1] succeeds after a 429, [down1] fails all 3 attempts
+    assert set(rates) == set(ids) - {"down1"}
+    assert coingecko.max_in_flight == 2
+    assert coingecko.calls == 3 + 2 + 3
+
+
+@pytest.mark.asyncio
+async def test_failed_batches_keep_previous_rates_flagged_stale(redis, coingecko, tmp_path, monkeypatch):
+    cache = fetcher(coingecko, tmp_path)
+    monkeypatch.setattr(rate_cache_module.rate_history, "persist", AsyncMock())
+    monkeypatch.setattr(rate_cache_module.CoinRegistry, "list_ids", lambda: ["a", "b", "down1"])
+    cache._table = RateTable({"down1": Decimal("7"), "a": Decimal("1")})
+
+    assert await cache.force_update()
+    await cache.close()
+    assert cache.get_rate("down1") == Decimal("7") and cache.get_rate("b") == Decimal("1.5")
+    assert cache.is_stale("down1") and not cache.is_stale("a")
+    assert json.loads((tmp_path / "rates.json").read_text()) == {"a": "1.5", "b": "1.5", "down1": "7"}
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_spaces_requests():
+    bucket = TokenBucket(rate=50, capacity=1)
+    started = time.monotonic()
+    for _ in range(6):
+        await bucket.acquire()
+    assert time.monotonic() - started >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_warm_start_prefers_redis_then_the_snapshot_file(redis, tmp_path):
+    path = tmp_path / "rate_cache.json"
+    path.write_text(json.dumps({"bitcoin": "60000", "tether": "1"}))
+    os.utime(path, (time.time() - 120, time.time() - 120))
+
+    cold = RateCache(snapshot_path=path)
+    assert not cold.is_ready(3600)
+    age = await cold.warm_start()
+    assert cold.source == "disk" and 119 < age < 130
+    assert cold.get_rate("bitcoin") == Decimal("60000") and cold.is_ready(3600) and not cold.is_ready(60)
+
+    await RateCache().publish({"bitcoin": Decimal("61000")})
+    warm = RateCache(snapshot_path=path)
+    assert await warm.warm_start() < 5
+    assert warm.source == "redis" and warm.get_rate("bitcoin") == Decimal("61000")
+
+
+@pytest.mark.asyncio
+async def test_snapshot_ids_stay_unique_across_redis_flushes_and_local_snapshots(redis, tmp_path):
+    path = tmp_path / "rate_cache.json"
+    path.write_text(json.dumps({"bitcoin": "60000"}))
+    os.utime(path, (time.time() - 120, time.time() - 120))
+    cache = RateCache(snapshot_path=path)
+    await cache.warm_start()
+    from_disk = cache.snapshot_id
+    assert from_disk[0] == rate_cache_module.LOCAL_VERSION and from_disk[1] is not None
+
+    await cache.publish({"bitcoin": Decimal("61000")})
+    published = cache.snapshot_id
+    await redis.flushall()
+    await asyncio.sleep(0.01)
+    await cache.publish({"bitcoin": Decimal("62000")})
+    # the flush restarts the version, the timestamp still tells the snapshots apart
+    assert cache.snapshot_id[0] == published[0] == 1
+    assert len({from_disk, published, cache.snapshot_id}) == 3
+
+    # an older shared copy does not replace a fresher local snapshot
+    cache._set_local({"bitcoin": Decimal("63000")}, rate_cache_module.LOCAL_VERSION, time.time(), record=False)
+    assert not await cache.refresh()
+    assert cache.get_rate("bitcoin") == Decimal("63000")
@@ -0,0 +1,36 @@
+from decimal import Decimal
+
+import pytest
+
+from src.app.services.rate_history import RateHistory, RateSeries
+
+
+def test_ring_buffer_keeps_the_latest_samples_in_order():
+    series = RateSeries(capacity=4)
+    for i in range(10):
+        assert series.append(100.0 + i, Decimal(f"1.{i}"), i)
+    assert not series.append(105.0, Decimal("9"), 99)  # out of order
+
+    assert series.size == 4 and series.oldest() == 106.0
+    assert [p.version for p in series.between(0, 1000)] == [6, 7, 8, 9]
+    assert series.index_at(105.9) == -1
+    assert series.point(series.index_at(107.5)).rate == Decimal("1.7")
+    assert series.point(series.index_at(500)).version == 9
+
+
+@pytest.mark.asyncio
+async def test_rate_at_and_ohlc_from_memory():
+    history = RateHistory(capacity=100)
+    # a snapshot every 5 minutes from t=0
+    for i, rate in enumerate(["10", "12", "9", "11", "20", "18"]):
+        history.record({"bitcoin": Decimal(rate), "tether": Decimal("1")}, i + 1, i * 300.0)
+
+    point = await history.rate_at("bitcoin", 899.0)
+    assert (point.rate, point.version, point.ts) == (Decimal("9"), 3, 600.0)
+    assert (await history.rate_at("bitcoin", 900.0)).rate == Decimal("11")
+
+    candles = await history.ohlc("bitcoin", 0, 1800, 900)
+    assert [(c.start, c.open, c.high, c.low, c.close, c.samples) for c in candles] == [
+        (0, Decimal("10"), Decimal("12"), Decimal("9"), Decimal("9"), 3),
+        (900, Decimal("11"), Decimal("20"), Decimal("11"), Decimal("18"), 3),
+    ]
@@ -0,0 +1,27 @@
+from decimal import Decimal
+
+import numpy as np
+
+from src.app.services.rate_cache import RateCache
+from src.app.services.rate_table import RateTable
+
+
+def test_cross_rates_from_one_gather():
+    table = RateTable({"bitcoin": Decimal("60000"), "tether": Decimal("1"), "delisted": Decimal("0")})
+
+    assert table.cross[table.index["bitcoin"], table.index["tether"]] == 60000.0
+    rates = table.cross_rates(["tether", "bitcoin", "delisted", "unknown"],
+                              ["bitcoin", "bitcoin", "tether", "tether"])
+    np.testing.assert_allclose(rates, [1 / 60000, 1.0, 0.0, 0.0])
+    assert table.get_many(["tether", "unknown"]) == {"tether": Decimal("1"), "unknown": Decimal("0")}
+
+
+def test_reads_keep_the_snapshot_they_started_with():
+    cache = RateCache()
+    cache._set_local({"bitcoin": Decimal("60000"), "tether": Decimal("1")}, 1, 0.0, record=False)
+    before = cache.table
+    cache._set_local({"bitcoin": Decimal("61000"), "tether": Decimal("1")}, 2, 1.0, record=False)
+
+    assert before.get_many(["bitcoin"]) == {"bitcoin": Decimal("60000")}
+    assert cache.get_rates(["bitcoin", "tether"]) == {"bitcoin": Decimal("61000"), "tether": Decimal("1")}
+    assert cache.stats()["coins"] == 2
@@ -0,0 +1,86 @@
+import asyncio
+
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+
+from src.app.db.models.player import CapPool, CapPoolShard
+from src.app.dev.standins import StandIns
+from src.app.services import risk_guard
+from src.app.services.risk_guard import HOUSE_SHARE, _requirement
+
+
+def test_requirement_of_sequential_spins():
+    spins = [(Decimal("5"), Decimal("1")), (Decimal("5"), Decimal("10")), (Decimal("5"), Decimal("0"))]
+    required, delta = _requirement(spins, Decimal("2"))
+    # the third spin still needs the floor after the first two moved the balance by -10.5
+    assert required == Decimal("2") - (Decimal("10") * HOUSE_SHARE - 11)
+    assert _requirement(spins[:2], Decimal("2"))[0] == Decimal("10") - (Decimal("5") * HOUSE_SHARE - 1)
+    assert delta == Decimal("15") * HOUSE_SHARE - 11
+
+
+@pytest.mark.asyncio
+async def test_parallel_spins_lose_no_updates(db):
+    await CapPool.get_motor_collection().delete_many({})
+    await CapPoolShard.get_motor_collection().delete_many({})
+    await CapPool(balance=Decimal("10000"), sigma_buffer=Decimal("100"), max_payout=Decimal("250")).insert()
+    risk_guard.case_cache.invalidate()
+    reserve = risk_guard.ShardedReserve()
+    await reserve.ensure_shards(8)
+
+    payouts = [Decimal(p) for p in ("0", "1", "2.5", "4")] * 125
+    results = await asyncio.gather(
+        *(reserve.reserve([(Decimal("5"), p)]) for p in payouts), return_exceptions=True
+    )
+    assert not [r for r in results if isinstance(r, HTTPException)]
+
+    expected = Decimal("10000") + sum(Decimal("5") * HOUSE_SHARE - p for p in payouts)
+    assert await reserve.total() == expected
+    assert await reserve.rebalance() == expected
+    assert (await CapPool.get("main")).balance == expected
+
+
+@pytest.mark.asyncio
+async def test_floor_applies_to_the_total_of_all_shards():
+    stand_ins = StandIns(db_name="risk_guard")
+    await stand_ins.start()
+    try:
+        # the models the service itself imported
+        await risk_guard.CapPool(balance=Decimal("1100"), sigma_buffer=Decimal("1000"), max_payout=Decimal("500")).insert()
+        risk_guard.case_cache.invalidate()
+        reserve = risk_guard.ShardedReserve()
+        await reserve.ensure_shards(4)
+
+        # every shard covers a 200 payout, but after one spin the total is below sigma_buffer
+        await reserve.reserve([(Decimal("5"), Decimal("200"))])
+        with pytest.raises(HTTPException) as e:
+            await reserve.reserve([(Decimal("5"), Decimal("200"))])
+        assert e.value.detail == "maintenance"
+        assert await reserve.total() == Decimal("1100") + Decimal("5") * HOUSE_SHARE - Decimal("200")
+    finally:
+        await stand_ins.stop()
+
+
+@pytest.mark.asyncio
+async def test_reserve_low_is_reported_before_payout_exceeds_max():
+    stand_ins = StandIns(db_name="risk_guard_order")
+    await stand_ins.start()
+    try:
+        await risk_guard.CapPool(balance=Decimal("400"), sigma_buffer=Decimal("100"), max_payout=Decimal("300")).insert()
+        risk_guard.case_cache.invalidate()
+        reserve = risk_guard.ShardedReserve()
+        await reserve.ensure_shards(4)
+
+        # the same order as the single-document pool: the reserve first, then the max payout
+        for spins, detail in (
+            ([(Decimal("5"), Decimal("500"))], "reserve_low"),
+            ([(Decimal("5"), Decimal("350"))], "payout_exceeds_max"),
+            ([(Decimal("5"), Decimal("250")), (Decimal("5"), Decimal("350"))], "reserve_low"),
+        ):
+            with pytest.raises(HTTPException) as e:
+                await reserve.reserve(spins)
+            assert e.value.detail == detail
+        assert await reserve.total() == Decimal("400")
+    finally:
+        await stand_ins.stop()
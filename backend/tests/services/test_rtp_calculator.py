@@ -0,0 +1,89 @@
+import random
+
+from decimal import Decimal
+from fractions import Fraction
+
+import pytest
+
+from src.app.core.config.start_cases_config import START_CASES
+from src.app.models.case_config import TierConfig, RewardItem
+from src.app.services.spin_sampler import SpinSampler, pity_level
+from src.app.services.rtp_calculator import compute_rtp, check_rtp_bounds
+
+
+def tiers_of(*spec) -> list[TierConfig]:
+    return [
+        TierConfig(
+            name=name,
+            chance=Decimal(chance),
+            rewards=[
+                RewardItem(coin_id=coin, amount=Decimal(amount), network=None, sub_chance=Decimal(sub))
+                for coin, amount, sub in rewards
+            ],
+        )
+        for name, chance, rewards in spec
+    ]
+
+
+def test_rtp_without_pity_is_weighted_payout():
+    case = next(c for c in START_CASES if c["case_id"] == "case_5")
+    tiers = tiers_of(*[
+        (t["name"], t["chance"], [
+            (r["coin_amount"]["coin"]["id"], r["coin_amount"]["amount"], r["sub_chance"]) for r in t["rewards"]
+        ])
+        for t in case["tiers"]
+    ])
+    rates = {r.coin_id: Decimal("1.5") for t in tiers for r in t.rewards}
+    report = compute_rtp(tiers, case["pity_after"], Decimal(str(case["price_usd"])), rates)
+
+    naive = sum(
+        Fraction(t.chance) * Fraction(r.sub_chance) * Fraction(r.amount) * Fraction("1.5")
+        for t in tiers for r in t.rewards
+    ) / Fraction(str(case["price_usd"]))
+    assert report.pity_engaged == 0
+    assert report.gap_probability == 0
+    # integer thresholds move each boundary by less than one roll in 2^32
+    assert abs(report.rtp - naive) < Fraction(1, 2**20)
+
+
+def test_pity_chain_matches_simulation():
+    # every reward is "common" except the jackpot, so the streak and pity engage constantly;
+    # the pity shift lowers the roll, which favours the first tier
+    tiers = tiers_of(
+        ("jackpot", "0.15", [("c", "20", "1")]),
+        ("common", "0.85", [("a", "1", "0.9995"), ("b", "3", "0.0005")]),
+    )
+    rates = {"a": Decimal("1"), "b": Decimal("1"), "c": Decimal("1")}
+    pity_after = 3
+    report = compute_rtp(tiers, pity_after, Decimal("4"), rates)
+    assert sum(report.stationary) == 1
+    assert report.pity_engaged > 0
+
+    sampler = SpinSampler(tiers)
+    payouts = [[Decimal(r.amount) for r in t.rewards] for t in tiers]
+    rng = random.Random(5)
+    n, total, total_sq, fail_streak = 200_000, 0.0, 0.0, 0
+    for _ in range(n):
+        idx_t, idx_r = sampler.sample(rng.randrange(2**32), pity_level(fail_streak, pity_after))
+        x = float(payouts[idx_t][idx_r])
+        total += x
+        total_sq += x * x
+        fail_streak = fail_streak + 1 if tiers[idx_t].rewards[idx_r].sub_chance >= Decimal("0.999") else 0
+
+    mean = total / n
+    se = ((total_sq / n - mean * mean) / n) ** 0.5
+    assert float(report.expected_payout) == pytest.approx(mean, abs=4 * se)
+    assert float(report.variance) == pytest.approx(total_sq / n - mean * mean, rel=0.05)
+
+
+def test_gate_rejects_gaps_missing_rates_and_high_rtp():
+    tiers = tiers_of(("only", "1", [("a", "1", "0.99")]))
+    gappy = compute_rtp(tiers, 20, Decimal("1"), {"a": Decimal("0.5")})
+    assert "without a reward" in check_rtp_bounds(gappy, Decimal("0"), Decimal("0.95"))
+
+    tiers = tiers_of(("only", "1", [("a", "1", "1")]))
+    assert "no rate" in check_rtp_bounds(compute_rtp(tiers, 20, Decimal("1"), {}), Decimal("0"), Decimal("0.95"))
+    rich = compute_rtp(tiers, 20, Decimal("1"), {"a": Decimal("2")})
+    assert "outside" in check_rtp_bounds(rich, Decimal("0"), Decimal("0.95"))
+    fair = compute_rtp(tiers, 20, Decimal("1"), {"a": Decimal("0.9")})
+    assert check_rtp_bounds(fair, Decimal("0"), Decimal("0.95")) is None
@@ -0,0 +1,67 @@
+import hashlib
+
+import pytest
+from bson import ObjectId
+
+from src.app.services import seed_pool as seed_pool_module
+from src.app.services.seed_pool import SeedPool
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs
+
+    def __aiter__(self):
+        async def gen():
+            for doc in self.docs:
+                yield doc
+        return gen()
+
+
+class FakeSeeds:
+    def __init__(self):
+        self.docs = []
+
+    def find(self, query, sort, limit):
+        docs = [d for d in self.docs if d["owner_id"] == query["owner_id"] and d["used"] == query["used"]]
+        return FakeCursor(sorted(docs, key=lambda d: d["created_at"])[:limit])
+
+    async def insert_many(self, docs, ordered=True):
+        for doc in docs:
+            doc["_id"] = ObjectId()
+        self.docs += docs
+        return type("Result", (), {"inserted_ids": [d["_id"] for d in docs]})
+
+    def aggregate(self, pipeline):
+        match = pipeline[0]["$match"]
+        counts = {}
+        for d in self.docs:
+            if d["owner_id"] in match["owner_id"]["$in"] and d["used"] == match["used"]:
+                counts[d["owner_id"]] = counts.get(d["owner_id"], 0) + 1
+        return FakeCursor([{"_id": k, "n": n} for k, n in counts.items()])
+
+
+@pytest.mark.asyncio
+async def test_refill_keeps_pool_of_active_users(monkeypatch):
+    seeds = FakeSeeds()
+    monkeypatch.setattr(seed_pool_module.ServerSeed, "get_motor_collection", classmethod(lambda cls: seeds))
+    pool = SeedPool(pool_size=3)
+
+    first, = await pool.take(42)
+    assert pool.misses == 1
+    assert await pool.refill() == 2
+    assert await pool.refill() == 0
+
+    # commit is idempotent until the seed is revealed
+    again, = await pool.take(42)
+    assert again.id == first.id and pool.misses == 1
+    assert hashlib.sha256(bytes.fromhex(again.seed)).hexdigest() == again.hash
+
+    batch = await pool.take(42, 5)
+    assert len({s.id for s in batch}) == 5 and pool.misses == 3
+    next(d for d in seeds.docs if d["_id"] == first.id)["used"] = True
+    assert await pool.refill() == 0
+    assert len([d for d in seeds.docs if not d["used"]]) == 4
@@ -0,0 +1,136 @@
+import asyncio
+import os
+
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import AutoReconnect
+
+from src.app.services.spin_log_writer import DEAD_LETTER_FILE, SpinLogWriter, read_segment
+
+
+class RecordingWriter(SpinLogWriter):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stored = {}
+
+    async def _insert(self, docs):
+        for doc in docs:
+            self.stored[doc["_id"]] = doc
+        return []
+
+
+class FlakyWriter(RecordingWriter):
+    def __init__(self, *args, failures: int, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failures = failures
+
+    async def _insert(self, docs):
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect("primary stepped down")
+        return await super()._insert(docs)
+
+
+class RejectingWriter(RecordingWriter):
+    """Mongo refuses the logs of user 3 (a validation error in the BulkWriteError) and stores the rest."""
+    async def _insert(self, docs):
+        await super()._insert([doc for doc in docs if doc["user_id"] != 3])
+        return [i for i, doc in enumerate(docs) if doc["user_id"] == 3]
+
+
+def fake_log(i: int):
+    doc = {"_id": ObjectId(), "user_id": i, "payout_usd": Decimal("1.25"), "hmac_value": b"\x01\x02"}
+    return SimpleNamespace(model_dump=lambda by_alias: dict(doc), doc=doc)
+
+
+@pytest.mark.asyncio
+async def test_submit_flushes_in_batches_and_cleans_spool(tmp_path):
+    writer = RecordingWriter(tmp_path, batch_size=16, flush_interval_seconds=0.01)
+    await writer.start()
+    logs = [fake_log(i) for i in range(100)]
+    await asyncio.gather(*(writer.submit([log]) for log in logs))
+    await writer.stop()
+
+    assert set(writer.stored) == {log.doc["_id"] for log in logs}
+    assert writer.stored[logs[0].doc["_id"]]["payout_usd"] == Decimal("1.25")
+    assert writer.stats()["flushed"] == 100
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_spool_of_crashed_process_is_replayed(tmp_path):
+    crashed = RecordingWriter(tmp_path, batch_size=1000, flush_interval_seconds=3600)
+    await crashed.start()
+    logs = [fake_log(i) for i in range(10)]
+    await crashed.submit(logs)
+    assert crashed.stored == {}
+
+    # the process dies: its flock goes away, a half-written record is left behind
+    crashed._flusher.cancel()
+    crashed._spooler.cancel()
+    with open(next(crashed._dir.glob("*.bson")), "ab") as f:
+        f.write(b"\x40\x00\x00\x00\x02half")
+    os.close(crashed._lock_fd)
+
+    # a writer still between mkdir and flock is left alone
+    (tmp_path / ".starting").mkdir()
+
+    restarted = RecordingWriter(tmp_path)
+    assert await restarted.replay() == 10
+    assert set(restarted.stored) == {log.doc["_id"] for log in logs}
+    assert list(tmp_path.iterdir()) == [tmp_path / ".starting"]
+
+
+@pytest.mark.asyncio
+async def test_batch_that_failed_every_attempt_is_retried(tmp_path, monkeypatch):
+    sleep = asyncio.sleep
+    monkeypatch.setattr(asyncio, "sleep", lambda seconds: sleep(0))  # no backoff
+    writer = FlakyWriter(tmp_path, failures=6, batch_size=16, flush_interval_seconds=0.01)
+    await writer.start()
+    logs = [fake_log(i) for i in range(10)]
+    await writer.submit(logs)
+
+    # all five attempts of the first flush fail; a later cycle stores the batch
+    for _ in range(100):
+        if writer.flushed == 10:
+            break
+        await sleep(0.01)
+    assert set(writer.stored) == {log.doc["_id"] for log in logs}
+    assert writer.flush_errors == 6
+    await writer.stop()
+    assert list(tmp_path.iterdir()) == []
+
+
+async def test_rejected_log_is_dead_lettered_without_holding_the_batch(tmp_path):
+    writer = RejectingWriter(tmp_path, batch_size=16, flush_interval_seconds=0.01, max_doc_failures=3)
+    await writer.start()
+    logs = [fake_log(i) for i in range(10)]
+    await writer.submit(logs)
+
+    for _ in range(100):
+        if writer.dead_lettered:
+            break
+        await asyncio.sleep(0.01)
+    # the other logs were stored by the first flush and never sent again
+    assert writer.flushed == 9 and len(writer.stored) == 9
+    assert writer.stats()["held"] == 0 and writer.stats()["unflushed"] == 0
+    await writer.stop()
+    assert [p.name for p in tmp_path.iterdir()] == [DEAD_LETTER_FILE]
+    assert [doc["_id"] for doc in read_segment(tmp_path / DEAD_LETTER_FILE)] == [logs[3].doc["_id"]]
+
+
+async def test_held_logs_are_capped(tmp_path, monkeypatch):
+    sleep = asyncio.sleep
+    monkeypatch.setattr(asyncio, "sleep", lambda seconds: sleep(0))
+    writer = FlakyWriter(tmp_path, failures=1000, batch_size=4, flush_interval_seconds=0.01, max_held=6)
+    await writer.start()
+    for i in range(5):
+        await writer.submit([fake_log(i * 2), fake_log(i * 2 + 1)])
+        await sleep(0.02)
+    assert writer.stats()["held"] == 6
+    assert writer.stats()["unflushed"] == 10  # the rest is still spooled for the next start
+    await writer.stop()
+    assert len(list(tmp_path.iterdir())) == 1  # kept for the replay
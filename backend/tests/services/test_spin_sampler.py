@@ -0,0 +1,92 @@
+import random
+
+from decimal import Decimal
+from itertools import accumulate
+from types import SimpleNamespace
+
+import pytest
+
+from src.app.core.config.start_cases_config import START_CASES
+from src.app.models.case_config import TierConfig, RewardItem, OddsVersion
+from src.app.services.spin_sampler import (
+    SpinSampler,
+    SamplerCache,
+    PITY_LEVELS,
+    ZERO,
+    pity_bonus,
+    pity_level,
+)
+
+
+def build_tiers(case: dict) -> list[TierConfig]:
+    return [
+        TierConfig(
+            name=tier["name"],
+            chance=tier["chance"],
+            rewards=[
+                RewardItem(
+                    coin_id=reward["coin_amount"]["coin"]["id"],
+                    amount=reward["coin_amount"]["amount"],
+                    network=reward["coin_amount"]["network"],
+                    sub_chance=reward["sub_chance"],
+                )
+                for reward in tier["rewards"]
+            ],
+        )
+        for tier in case["tiers"]
+    ]
+
+
+def reference_pick(tiers, roll_int: int, bonus_before: Decimal):
+    """Decimal code path that spin() used before the compiled sampler."""
+    roll = Decimal.from_float(roll_int / 2**32)
+    roll_adj = max(ZERO, roll - bonus_before)
+    cum_t = list(accumulate(t.chance for t in tiers))
+    idx_t = next(i for i, p in enumerate(cum_t) if roll_adj < p)
+    tier = tiers[idx_t]
+    sub_roll = (roll_adj - (cum_t[idx_t - 1] if idx_t > 0 else ZERO)) / tier.chance
+    cum_r = list(accumulate(r.sub_chance for r in tier.rewards))
+    idx_r = next(i for i, p in enumerate(cum_r) if sub_roll < p)
+    return idx_t, idx_r
+
+
+def outcome(fn, *args):
+    try:
+        return fn(*args)
+    except (StopIteration, ValueError):
+        return "gap"
+
+
+@pytest.mark.parametrize("case", START_CASES, ids=lambda c: c["case_id"])
+def test_sampler_matches_decimal_path(case):
+    tiers = build_tiers(case)
+    sampler = SpinSampler(tiers, case_id=case["case_id"])
+    rng = random.Random(case["case_id"])
+
+    pity_after = case["pity_after"]
+    for fail_streak in [0, *range(pity_after, pity_after + PITY_LEVELS + 2)]:
+        bonus = pity_bonus(fail_streak, pity_after)
+        level = pity_level(fail_streak, pity_after)
+        rolls = {0, 2**32 - 1}
+        rolls.update(rng.randrange(2**32) for _ in range(2000))
+        # probe both sides of every compiled boundary
+        for bound in sampler.tier_bounds(level) + [b for t in sampler.reward_bounds(level) for b in t]:
+            rolls.update(r for r in (bound - 1, bound, bound + 1) if 0 <= r < 2**32)
+        for roll_int in rolls:
+            assert outcome(sampler.sample, roll_int, level) == outcome(reference_pick, tiers, roll_int, bonus), (
+                fail_streak, roll_int
+            )
+
+
+def test_sampler_cache_rebuilds_on_new_odds_version():
+    cache = SamplerCache()
+    tiers = build_tiers(START_CASES[0])
+    cfg = SimpleNamespace(case_id="case_5", tiers=tiers, odds_versions=[OddsVersion(version="v1")])
+
+    first = cache.get(cfg)
+    assert cache.get(cfg) is first
+
+    cfg.odds_versions.append(OddsVersion(version="v2"))
+    second = cache.get(cfg)
+    assert second is not first
+    assert second.odds_version == "v2"
@@ -0,0 +1,72 @@
+import pytest
+
+from contextlib import asynccontextmanager
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from src.app.db.init_db import DataBase
+from src.app.utils.timing import StageTimer
+
+
+@pytest.fixture
+def fake_transactions(monkeypatch):
+    sessions = []
+
+    @asynccontextmanager
+    async def start_transaction():
+        sessions.append(object())
+        yield sessions[-1]
+
+    monkeypatch.setattr(DataBase, "start_transaction", start_transaction)
+    return sessions
+
+
+@pytest.mark.asyncio
+async def test_run_transaction_retries_transient_errors(fake_transactions):
+    timer = StageTimer()
+    calls = []
+
+    async def pipeline(tx):
+        timer.reset()
+        calls.append(tx.session)
+        timer.mark("charge")
+        if len(calls) == 1:
+            raise PyMongoError("write conflict", error_labels=["TransientTransactionError"])
+        timer.mark("spin")
+        return "ok"
+
+    assert await DataBase.run_transaction(pipeline) == "ok"
+    # every attempt gets a fresh session, and the timer only reflects the last one
+    assert calls == fake_transactions and len(calls) == 2
+    assert list(timer.stages) == ["charge", "spin"]
+
+
+@pytest.mark.asyncio
+async def test_run_transaction_does_not_retry_other_errors(fake_transactions):
+    async def pipeline(tx):
+        raise OperationFailure("duplicate key", code=11000)
+
+    with pytest.raises(OperationFailure):
+        await DataBase.run_transaction(pipeline)
+    assert len(fake_transactions) == 1
+
+
+
+@pytest.mark.asyncio
+async def test_after_commit_runs_only_for_the_committed_attempt(fake_transactions):
+    published = []
+
+    async def pipeline(tx):
+        attempt = len(fake_transactions)
+
+        async def publish():
+            published.append(attempt)
+
+        tx.after_commit(publish)
+        assert published == []
+        if attempt == 1:
+            raise PyMongoError("write conflict", error_labels=["TransientTransactionError"])
+        return attempt
+
+    assert await DataBase.run_transaction(pipeline) == 2
+    assert published == [2]
@@ -0,0 +1,63 @@
+import json
+from decimal import Decimal
+
+import pytest
+
+from src.app.dev.standins import StandIns, data_dir
+from src.app.services import internal_balance_service as service_module
+from src.app.services import wallet_view as wallet_view_module
+from src.app.services.wallet_view import WalletViews
+
+InternalBalanceService = service_module.InternalBalanceService
+
+
+@pytest.fixture
+async def stand_ins():
+    stand_ins = StandIns(db_name="wallet_view")
+    await stand_ins.start()
+    # the registry the view looks coins up in
+    wallet_view_module.CoinRegistry.load_from_file(data_dir() / "coin_registry.json")
+    yield stand_ins
+    await stand_ins.stop()
+
+
+def balances(body: bytes) -> dict:
+    return {coin: wallet["balance"] for coin, wallet in json.loads(body).items()}
+
+
+@pytest.mark.asyncio
+async def test_view_follows_balance_writes(stand_ins):
+    views = WalletViews()
+    await InternalBalanceService.credit_many(
+        7, [("tether", None, Decimal("10")), ("tether", "TRC20", Decimal("3")), ("tron", None, Decimal("50"))]
+    )
+
+    # no view yet: built from the balances, one entry per coin with every network
+    seq, body = await views.body(7, await views.seq(7))
+    assert seq == 3
+    assert balances(body) == {"tether": {"None": "10", "TRC20": "3"}, "tron": {"None": "50"}}
+
+    # later writes are applied to the stored view, not rebuilt
+    await InternalBalanceService.adjust_balance(7, "tron", None, Decimal("-20"))
+    await InternalBalanceService.adjust_balance(7, "tether", "TRC20", Decimal("-3"))
+    seq, body = await views.body(7, await views.seq(7))
+    assert seq == 5
+    assert balances(body) == {"tether": {"None": "10"}, "tron": {"None": "30"}}
+    assert await views.body(7, 5) == (5, body)
+    assert views.hits == {"not_modified": 0, "memory": 1, "view": 1, "rebuilt": 1}
+
+    assert views.not_modified('W/"7.5", "other"', views.etag(7, 5))
+    assert not views.not_modified(views.etag(7, 4), views.etag(7, 5))
+
+
+@pytest.mark.asyncio
+async def test_view_that_missed_a_write_is_rebuilt(stand_ins):
+    views = WalletViews()
+    await InternalBalanceService.adjust_balance(8, "tron", None, Decimal("5"))
+    await views.body(8, await views.seq(8))
+
+    await wallet_view_module.WalletView.get_motor_collection().update_one({"_id": 8}, {"$set": {"seq": 0}})
+    await InternalBalanceService.adjust_balance(8, "tron", None, Decimal("2"))
+    seq, body = await views.body(8, await views.seq(8))
+    assert (seq, balances(body)) == (2, {"tron": {"None": "7"}})
+    assert views.hits["rebuilt"] == 2
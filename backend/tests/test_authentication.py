@@ -165,3 +165,12 @@ class TestProtectedRoutesWithRole:
     #     assert resp.status_code == 200
     #     msg = resp.json().get("msg", "")
     #     assert "admin" in msg.lower()
+
+
+def test_standin_init_data_passes_validator():
+    from src.app.core.auth import TelegramAuthValidator
+    from src.app.dev.standins import sign_init_data
+
+    init_data = sign_init_data({"id": 42, "first_name": "Load"}, "000000:test")
+    auth = TelegramAuthValidator.verify_telegram_auth(init_data, "000000:test")
+    assert auth.user["id"] == 42